@@ -0,0 +1,120 @@
+"""
+Single-buffer audio assembly
+
+Chunks are normalized to 1D and copied straight into one preallocated CPU
+buffer as they are produced; pauses are just zero-filled ranges. Peak memory
+stays close to the size of the final audio instead of holding every chunk,
+every pause tensor and the concatenated result at the same time, and the
+device→host copy happens per chunk rather than all at once at the end.
+"""
+
+import os
+
+import torch
+
+# Rough speaking rate used to size the initial buffer (seconds of audio per character)
+SECONDS_PER_CHAR = 0.07
+GROWTH_FACTOR = 1.25
+
+
+def normalize_wav_dims(wav):
+    """Ensure an audio tensor is 1D"""
+    if wav.dim() == 2:
+        # If 2D, take the first channel or flatten
+        if wav.shape[0] == 1:
+            wav = wav.squeeze(0)  # Remove channel dimension
+        elif wav.shape[1] == 1:
+            wav = wav.squeeze(1)  # Remove channel dimension
+        else:
+            wav = wav.mean(dim=0)  # Average channels if multiple
+    elif wav.dim() > 2:
+        # Flatten higher dimensional tensors
+        wav = wav.flatten()
+    return wav
+
+
+def estimate_samples(text_length: int, sample_rate: int) -> int:
+    """Initial buffer size for a script of ``text_length`` characters"""
+    return max(sample_rate, int(text_length * SECONDS_PER_CHAR * sample_rate))
+
+
+class AudioAssembler:
+    """Growable float32 CPU buffer that chunks and pauses are written into in order"""
+
+    def __init__(self, sample_rate: int, initial_samples: int, pin_memory: bool = None):
+        if pin_memory is None:
+            pin_memory = (
+                torch.cuda.is_available()
+                and os.environ.get("CHATTERBOX_PIN_ASSEMBLY", "1") != "0"
+            )
+        self.sample_rate = sample_rate
+        self.pin_memory = pin_memory
+        self.length = 0
+        self.grow_count = 0
+        self._copy_done = None
+        self._buffer = self._allocate(max(1, int(initial_samples)))
+
+    def _allocate(self, samples: int):
+        return torch.empty(samples, dtype=torch.float32, pin_memory=self.pin_memory)
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.numel()
+
+    def _reserve(self, extra: int):
+        needed = self.length + extra
+        if needed <= self.capacity:
+            return
+        new_buffer = self._allocate(max(needed, int(self.capacity * GROWTH_FACTOR)))
+        new_buffer[:self.length].copy_(self._buffer[:self.length])
+        self._buffer = new_buffer
+        self.grow_count += 1
+
+    def append(self, wav) -> int:
+        """Copy a chunk into the buffer and return its sample offset"""
+        wav = normalize_wav_dims(wav).detach()
+        n = wav.numel()
+        self._reserve(n)
+        offset = self.length
+        # Pinned destinations let CUDA chunks copy asynchronously
+        non_blocking = self.pin_memory and wav.is_cuda
+        self._buffer[offset:offset + n].copy_(wav, non_blocking=non_blocking)
+        if non_blocking:
+            # Lets readers wait for this copy alone, not for kernels another
+            # thread has queued since (the next chunk's generation)
+            self._copy_done = torch.cuda.Event()
+            self._copy_done.record()
+        self.length += n
+        return offset
+
+    def append_silence(self, samples: int) -> int:
+        """Zero-fill ``samples`` samples and return their offset"""
+        self._reserve(samples)
+        offset = self.length
+        self._buffer[offset:offset + samples].zero_()
+        self.length += samples
+        return offset
+
+    def view(self, offset: int, samples: int):
+        """Return a view of already-written samples (synchronizing pending copies)"""
+        self._synchronize()
+        return self._buffer[offset:offset + samples]
+
+    def _synchronize(self):
+        if self._copy_done is not None:
+            self._copy_done.synchronize()
+            self._copy_done = None
+
+    def finish(self):
+        """Return the assembled audio as a 1D CPU tensor"""
+        self._synchronize()
+        return self._buffer[:self.length]
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.length,
+            "capacity": self.capacity,
+            "buffer_bytes": self.capacity * 4,
+            "grow_count": self.grow_count,
+            "pinned": self.pin_memory,
+        }
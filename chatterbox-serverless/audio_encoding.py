@@ -0,0 +1,255 @@
+"""
+Output audio encodings
+
+``output_format`` selects how the final audio is encoded:
+
+- ``wav``   - 32-bit float WAV (previous behavior)
+- ``pcm16`` - 16-bit PCM WAV, half the size of ``wav``
+- ``flac``  - lossless FLAC (16-bit)
+- ``opus``  - Opus in an Ogg container, ``bitrate_kbps`` (default 64)
+- ``mp3``   - MP3, ``bitrate_kbps`` (default 128)
+
+``IncrementalEncoder`` is fed each chunk (and pause) as soon as it has been
+assembled and encodes on a background thread (or an ffmpeg process for the
+lossy formats), so by the time generation finishes only the trailer is left.
+With ``stream_to`` the encoded bytes go to an output sink writer instead of
+memory; Ogg/MP3 bytes are forwarded as ffmpeg produces them, WAV/FLAC (whose
+headers are rewritten on close) in one piece at the end.
+"""
+
+import io
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+OUTPUT_FORMATS = {
+    "wav": {"mime_type": "audio/wav", "extension": "wav"},
+    "pcm16": {"mime_type": "audio/wav", "extension": "wav"},
+    "flac": {"mime_type": "audio/flac", "extension": "flac"},
+    "opus": {"mime_type": "audio/ogg", "extension": "ogg"},
+    "mp3": {"mime_type": "audio/mpeg", "extension": "mp3"},
+}
+
+# soundfile (format, subtype) for the formats libsndfile writes directly
+_SOUNDFILE_FORMATS = {
+    "wav": ("WAV", "FLOAT"),
+    "pcm16": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+}
+
+# ffmpeg codec/container and default bitrate for the lossy formats
+_FFMPEG_FORMATS = {
+    "opus": ("libopus", "ogg", 64),
+    "mp3": ("libmp3lame", "mp3", 128),
+}
+
+
+def validate_output_format(output_format: str, bitrate_kbps=None):
+    """Raise ValueError for unknown formats or bitrates"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unsupported output_format '{output_format}'. "
+            f"Choose one of: {', '.join(OUTPUT_FORMATS)}"
+        )
+    if bitrate_kbps is not None:
+        if output_format not in _FFMPEG_FORMATS:
+            raise ValueError(f"bitrate_kbps only applies to {' and '.join(_FFMPEG_FORMATS)}")
+        if not 6 <= int(bitrate_kbps) <= 320:
+            raise ValueError("bitrate_kbps must be between 6 and 320")
+    if output_format in _FFMPEG_FORMATS and shutil.which("ffmpeg") is None:
+        raise ValueError(f"output_format '{output_format}' requires ffmpeg in the container")
+
+
+def _to_numpy(wav):
+    """1D float32 numpy array from a tensor or array"""
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+
+def _ffmpeg_command(output_format: str, sample_rate: int, bitrate_kbps=None) -> list:
+    codec, container, default_bitrate = _FFMPEG_FORMATS[output_format]
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-c:a", codec, "-b:a", f"{int(bitrate_kbps or default_bitrate)}k",
+        "-f", container, "pipe:1",
+    ]
+
+
+def encode_audio(wav, sample_rate: int, output_format: str = "wav", bitrate_kbps=None) -> bytes:
+    """Encode a complete 1D clip in one go"""
+    validate_output_format(output_format, bitrate_kbps)
+    samples = _to_numpy(wav)
+
+    if output_format in _SOUNDFILE_FORMATS:
+        import soundfile as sf
+
+        container, subtype = _SOUNDFILE_FORMATS[output_format]
+        out = io.BytesIO()
+        sf.write(out, samples, sample_rate, format=container, subtype=subtype)
+        return out.getvalue()
+
+    result = subprocess.run(
+        _ffmpeg_command(output_format, sample_rate, bitrate_kbps),
+        input=samples.tobytes(), capture_output=True, check=True
+    )
+    return result.stdout
+
+
+class IncrementalEncoder:
+    """Encodes audio blocks on a background thread as they are written"""
+
+    def __init__(self, output_format: str, sample_rate: int, bitrate_kbps=None, stream_to=None, max_pending: int = 0):
+        validate_output_format(output_format, bitrate_kbps)
+        self.output_format = output_format
+        self.sample_rate = sample_rate
+        self.bitrate_kbps = bitrate_kbps
+        self.mime_type = OUTPUT_FORMATS[output_format]["mime_type"]
+        # Bounded when the caller wants backpressure from a slow encoder/upload
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._busy_s = 0.0
+        self._idle_s = 0.0
+        self._blocked_s = 0.0
+        self._finish_wait_s = 0.0
+        self._out = io.BytesIO()
+        self._proc = None
+        self._reader = None
+        self._closed = False
+        self._stream_to = stream_to
+        self.encoded_bytes = 0
+
+        if output_format in _SOUNDFILE_FORMATS:
+            import soundfile as sf
+
+            container, subtype = _SOUNDFILE_FORMATS[output_format]
+            self._sink = sf.SoundFile(
+                self._out, mode="w", samplerate=sample_rate, channels=1,
+                format=container, subtype=subtype
+            )
+        else:
+            self._sink = None
+            self._proc = subprocess.Popen(
+                _ffmpeg_command(output_format, sample_rate, bitrate_kbps),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            # Drain stdout concurrently so ffmpeg never blocks on a full pipe
+            self._reader = threading.Thread(target=self._read_ffmpeg, daemon=True)
+            self._reader.start()
+
+        self._worker = threading.Thread(target=self._run, name="audio-encoder", daemon=True)
+        self._worker.start()
+
+    def _read_ffmpeg(self):
+        for block in iter(lambda: self._proc.stdout.read(65536), b""):
+            self._emit(block)
+
+    def _emit(self, data: bytes):
+        self.encoded_bytes += len(data)
+        if self._stream_to is None:
+            self._out.write(data)
+            return
+        try:
+            self._stream_to.write(data)
+        except Exception as e:
+            # Keep draining ffmpeg; the error surfaces from finish()
+            if self._error is None:
+                self._error = e
+
+    def _run(self):
+        while True:
+            wait_start = time.perf_counter()
+            wav = self._queue.get()
+            self._idle_s += time.perf_counter() - wait_start
+            if wav is None:
+                break
+            if self._error is not None:
+                continue
+            start = time.perf_counter()
+            try:
+                samples = _to_numpy(wav)
+                if self._sink is not None:
+                    self._sink.write(samples)
+                else:
+                    self._proc.stdin.write(samples.tobytes())
+            except Exception as e:
+                self._error = e
+            self._busy_s += time.perf_counter() - start
+
+    def write(self, wav):
+        """Queue a block of samples; the caller must not modify it afterwards"""
+        start = time.perf_counter()
+        self._queue.put(wav)
+        self._blocked_s += time.perf_counter() - start
+
+    def finish(self):
+        """
+        Flush remaining blocks and finalize the container.
+
+        Returns the encoded bytes, or None when they were written to ``stream_to``.
+        """
+        start = time.perf_counter()
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+        finalize_start = time.perf_counter()
+        if self._sink is not None:
+            self._sink.close()
+            if self._stream_to is not None:
+                data = self._out.getvalue()
+                self._out = io.BytesIO()
+                self._emit(data)
+            else:
+                self.encoded_bytes = len(self._out.getvalue())
+        else:
+            self._proc.stdin.close()
+            self._reader.join()
+            stderr = self._proc.stderr.read()
+            if self._proc.wait() != 0 and self._error is None:
+                self._error = RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+        self._busy_s += time.perf_counter() - finalize_start
+        self._finish_wait_s = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+        return None if self._stream_to is not None else self._out.getvalue()
+
+    def abort(self):
+        """Stop encoding after a failed job (no-op once finished)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+        self._worker.join(timeout=5)
+        if self._sink is not None and not self._worker.is_alive():
+            # Close now rather than at interpreter exit, after the buffer is gone
+            try:
+                self._sink.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "output_format": self.output_format,
+            "bitrate_kbps": self.bitrate_kbps,
+            "encode_ms": round(self._busy_s * 1000, 1),
+            "encode_wait_ms": round(self._finish_wait_s * 1000, 1),
+        }
+
+    def stage_stats(self) -> dict:
+        """Busy/idle times of the encoder thread and how long writers were held back"""
+        total = self._busy_s + self._idle_s
+        return {
+            "busy_ms": round(self._busy_s * 1000, 1),
+            "idle_ms": round(self._idle_s * 1000, 1),
+            "utilization": round(self._busy_s / total, 3) if total else None,
+            "backpressure_ms": round(self._blocked_s * 1000, 1),
+        }
@@ -0,0 +1,128 @@
+"""
+Multi-script batch jobs
+
+One job can carry a list of scripts as ``input.items``. Each item is a normal
+job input (``text``, ``voice_file`` or ``voice_id``, ``settings``). Two more
+fields help batches share work:
+
+- ``input.voices`` maps names to base64 voices, and items can name one with
+  ``"voice": "<name>"`` instead of repeating the payload
+- ``input.settings`` holds defaults that each item's ``settings`` overrides
+
+Every distinct voice payload is decoded once, however many items use it.
+Items run concurrently through the shared chunk scheduler, submitted grouped
+by voice and settings, so chunks from different scripts with the same voice
+share batches. The model, conditioning and synthesis caches stay warm across
+the whole batch, and cold-start and queue latency are paid once per batch
+instead of once per script.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MAX_ITEMS = int(os.environ.get("CHATTERBOX_BATCH_MAX_ITEMS", "100"))
+DEFAULT_ITEM_CONCURRENCY = int(os.environ.get("CHATTERBOX_BATCH_ITEM_CONCURRENCY", "4"))
+# Item ids are echoed back in results; keep them short and path-safe
+_ITEM_ID_RE = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}")
+
+
+def item_concurrency(value) -> int:
+    """Validate ``input.concurrency``; values above ``MAX_ITEMS`` are clamped to it"""
+    if value is None:
+        value = DEFAULT_ITEM_CONCURRENCY
+    elif isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"'concurrency' must be an integer, got {value!r}")
+    elif value < 1:
+        raise ValueError("'concurrency' must be at least 1")
+    return max(1, min(value, MAX_ITEMS))
+
+
+def expand_items(input_data: dict, decode) -> tuple:
+    """
+    Validate ``input.items`` and return ``(items, voice_stats)``.
+
+    Each returned item is a self-contained job input with the shared settings
+    merged in. Inline and named voices are decoded with ``decode`` once per
+    distinct payload and passed on as bytes. A payload that fails to decode is
+    left as it is, so the item reports the usual decode error.
+    """
+    items = input_data.get("items")
+    if not isinstance(items, list) or not items:
+        raise ValueError("'items' must be a non-empty list")
+    if len(items) > MAX_ITEMS:
+        raise ValueError(f"Too many items: {len(items)} (at most {MAX_ITEMS} per job)")
+    voices = input_data.get("voices") or {}
+    shared_settings = input_data.get("settings") or {}
+
+    decoded = {}
+    inline_items = 0
+    expanded = []
+    seen_ids = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {index} must be an object")
+        if "id" in item:
+            item_id = item["id"]
+            if isinstance(item_id, bool) or not isinstance(item_id, (str, int)) or not _ITEM_ID_RE.fullmatch(str(item_id)):
+                raise ValueError(
+                    f"Item {index} has an invalid id {item_id!r} "
+                    "(use up to 64 letters, digits, '_', '-' or '.', not starting with '.')"
+                )
+            if str(item_id) in seen_ids:
+                raise ValueError(f"Item {index} repeats id {item_id!r}")
+            seen_ids.add(str(item_id))
+        item = dict(item)
+        item["settings"] = {**shared_settings, **(item.get("settings") or {})}
+        voice_name = item.pop("voice", None)
+        if voice_name is not None and not item.get("voice_file"):
+            if voice_name not in voices:
+                raise ValueError(f"Item {index} uses unknown voice '{voice_name}'")
+            item["voice_file"] = voices[voice_name]
+
+        payload = item.get("voice_file")
+        if isinstance(payload, str) and payload:
+            inline_items += 1
+            if payload not in decoded:
+                try:
+                    decoded[payload] = decode(payload)
+                except ValueError:
+                    decoded[payload] = None
+            if decoded[payload] is not None:
+                item["voice_file"] = decoded[payload]
+        expanded.append(item)
+
+    return expanded, {"inline_voice_items": inline_items, "voices_decoded": len(decoded)}
+
+
+def item_job_id(job_id: str, index: int) -> str:
+    """
+    Names the item's output object and checkpoint, e.g. ``<job id>-3``.
+
+    Built from the position, never the caller's ``id``, so it is always a safe
+    file name and unique within the job.
+    """
+    return f"{job_id}-{index}" if job_id else None
+
+
+def grouping_key(item: dict) -> tuple:
+    """Items with equal keys can share chunk batches (same voice and settings)"""
+    voice = item.get("voice_file") or item.get("voice_id") or ""
+    voice_key = hash(voice) if isinstance(voice, (str, bytes)) else id(voice)
+    return voice_key, repr(sorted(item["settings"].items()))
+
+
+def iter_item_results(items: list, run_item, concurrency: int = None):
+    """
+    Run ``run_item(index, item)`` for every item, ``concurrency`` at a time,
+    and yield ``(index, result)`` as each one finishes.
+
+    Items are submitted grouped by ``grouping_key`` so the ones running at the
+    same time are the ones whose chunks can be batched together.
+    """
+    concurrency = max(1, min(len(items), concurrency or DEFAULT_ITEM_CONCURRENCY))
+    order = sorted(range(len(items)), key=lambda i: grouping_key(items[i]))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-item") as executor:
+        futures = {executor.submit(run_item, index, items[index]): index for index in order}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,149 @@
+"""
+Batched multi-chunk generation
+
+Chunks are grouped by length so each batch carries as little padding as
+possible and handed back in the original chunk order, so concatenation and
+pause insertion are unchanged.
+
+This is scaffolding: stock ``ChatterboxTTS`` (0.1.x) has no batched entry
+point. Its T3 decoding loop is written for exactly one text, with the
+conditional/unconditional CFG pair as the batch, so every chunk of a stock
+model is generated on its own. Batching only happens when the loaded model
+exposes ``generate_batch(texts, seeds=..., **kwargs)``. Each chunk is sampled
+from its own seed either way, so its audio never depends on which other
+chunks share its batch (the synthesis cache and checkpoints rely on that).
+That also makes it safe to rerun a batch that runs out of memory one chunk
+at a time, as the scheduler does.
+"""
+
+import os
+
+from precision import device_type, generation_context
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get("CHATTERBOX_MAX_BATCH_SIZE", "1"))
+
+
+def group_chunks_by_length(chunks: list, max_batch_size: int) -> list:
+    """Return batches of chunk indices, each holding chunks of similar length"""
+    max_batch_size = max(1, int(max_batch_size))
+    order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+    return [order[i:i + max_batch_size] for i in range(0, len(order), max_batch_size)]
+
+
+def supports_batching(model) -> bool:
+    return callable(getattr(model, "generate_batch", None))
+
+
+def is_out_of_memory(error: Exception) -> bool:
+    """True for CUDA/CPU allocator failures we can recover from by shrinking the batch"""
+    if isinstance(error, MemoryError):
+        return True
+    try:
+        import torch
+        oom_type = getattr(torch.cuda, "OutOfMemoryError", None)
+        if oom_type is not None and isinstance(error, oom_type):
+            return True
+    except ImportError:
+        pass
+    return isinstance(error, RuntimeError) and "out of memory" in str(error).lower()
+
+
+def release_memory():
+    """Hand cached CUDA allocator blocks back to the driver"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def seed_generation(seed):
+    """Seed every RNG the sampler uses so a chunk can be regenerated identically"""
+    if seed is None:
+        return
+    import torch
+    torch.manual_seed(seed)
+
+
+def _generate_one(model, chunks, index, gen_kwargs, seeds, precision=None):
+    print(f"Processing chunk {index+1}/{len(chunks)}: {len(chunks[index])} chars")
+    seed_generation(seeds[index] if seeds else None)
+    try:
+        with generation_context(precision, device_type(model), model):
+            wav = model.generate(chunks[index], **gen_kwargs)
+    except Exception as chunk_error:
+        print(f"Chunk {index+1} failed: {chunk_error}")
+        raise
+    print(f"Chunk {index+1} completed successfully")
+    return wav
+
+
+def _run_batch(model, chunks, indices, gen_kwargs, stats, seeds, precision=None):
+    """Yield ``(index, wav)`` for every chunk in the batch"""
+    if len(indices) == 1 or not supports_batching(model):
+        for index in indices:
+            yield index, _generate_one(model, chunks, index, gen_kwargs, seeds, precision)
+        return
+
+    print(f"Processing batch of {len(indices)} chunks: {[i+1 for i in indices]}")
+    try:
+        with generation_context(precision, device_type(model), model):
+            wavs = model.generate_batch(
+                [chunks[i] for i in indices], seeds=[seeds[i] for i in indices] if seeds else None, **gen_kwargs
+            )
+    except Exception as batch_error:
+        if not is_out_of_memory(batch_error):
+            raise
+        # Every chunk has its own seed, so generating them one by one gives the same audio
+        stats["oom_fallbacks"] += 1
+        print(f"Batch of {len(indices)} ran out of memory, running sequentially")
+        release_memory()
+        for index in indices:
+            yield index, _generate_one(model, chunks, index, gen_kwargs, seeds, precision)
+        return
+    stats["batched_calls"] += 1
+    yield from zip(indices, wavs)
+
+
+def iter_generate_chunks(model, chunks: list, gen_kwargs: dict, max_batch_size: int = None, stats: dict = None,
+                         seeds: list = None, precision: str = None):
+    """
+    Yield ``(index, wav)`` in original chunk order as soon as each prefix is ready.
+
+    Batches finish out of order, so completed chunks are held back until every
+    earlier chunk is done; callers can rely on contiguous indices 0..N-1.
+    ``stats`` (if given) is filled in with the batching summary; ``seeds``
+    (one per chunk) makes sampling reproducible; ``precision`` selects the
+    autocast mode (see precision.py).
+    """
+    if max_batch_size is None:
+        max_batch_size = DEFAULT_MAX_BATCH_SIZE
+    max_batch_size = max(1, int(max_batch_size))
+
+    batched = max_batch_size > 1 and supports_batching(model)
+    if batched:
+        batches = group_chunks_by_length(chunks, max_batch_size)
+    else:
+        # Keep the natural order so logs read chunk 1..N
+        batches = [[i] for i in range(len(chunks))]
+
+    if stats is None:
+        stats = {}
+    stats.update({
+        "mode": "batched" if batched else "sequential",
+        "max_batch_size": max_batch_size,
+        "batches": len(batches),
+        "batched_calls": 0,
+        "oom_fallbacks": 0,
+    })
+
+    pending = {}
+    next_index = 0
+    for indices in batches:
+        for index, wav in _run_batch(model, chunks, indices, gen_kwargs, stats, seeds, precision):
+            pending[index] = wav
+            while next_index in pending:
+                yield next_index, pending.pop(next_index)
+                next_index += 1
+
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-buffer audio assembly against the old list + torch.cat path
+
+Simulates a 10-minute script (~10 s chunks with 0.2 s pauses at 24 kHz). Each
+approach runs in a fresh subprocess so peak RSS is measured independently.
+
+Usage:
+    python benchmarks/bench_audio_assembly.py [--minutes 10] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SAMPLE_RATE = 24000
+PAUSE_SAMPLES = int(0.2 * SAMPLE_RATE)
+
+
+def chunk_lengths(minutes: float):
+    """Deterministic chunk lengths between 8 and 12 seconds"""
+    total = int(minutes * 60 * SAMPLE_RATE)
+    lengths, produced, i = [], 0, 0
+    while produced < total:
+        n = int((8 + (i * 7919 % 400) / 100) * SAMPLE_RATE)
+        lengths.append(n)
+        produced += n + PAUSE_SAMPLES
+        i += 1
+    return lengths
+
+
+def iter_chunks(lengths):
+    import torch
+    for n in lengths:
+        # Model output shape is (1, samples)
+        yield torch.randn(1, n) * 0.1
+
+
+def legacy_assembly(lengths):
+    import torch
+    from audio_assembly import normalize_wav_dims
+
+    all_wavs = []
+    for i, chunk_wav in enumerate(iter_chunks(lengths)):
+        all_wavs.append(chunk_wav)
+        if i < len(lengths) - 1:
+            all_wavs.append(torch.zeros(PAUSE_SAMPLES, device=chunk_wav.device))
+    processed_wavs = [normalize_wav_dims(wav) for wav in all_wavs]
+    final_wav = torch.cat(processed_wavs, dim=0)
+    return final_wav.cpu()
+
+
+def assembler_assembly(lengths):
+    from audio_assembly import AudioAssembler, estimate_samples
+
+    # ~150 chars per 10 s chunk, as produced by the chunker
+    assembler = AudioAssembler(SAMPLE_RATE, estimate_samples(len(lengths) * 150, SAMPLE_RATE))
+    for i, chunk_wav in enumerate(iter_chunks(lengths)):
+        assembler.append(chunk_wav)
+        if i < len(lengths) - 1:
+            assembler.append_silence(PAUSE_SAMPLES)
+    return assembler.finish()
+
+
+APPROACHES = {"legacy": legacy_assembly, "assembler": assembler_assembly}
+
+
+def run_one(approach: str, minutes: float, repeat: int):
+    import torch
+    lengths = chunk_lengths(minutes)
+    torch.manual_seed(0)
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    samples = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        final_wav = APPROACHES[approach](lengths)
+        timings.append((time.perf_counter() - start) * 1000)
+        samples = len(final_wav)
+        del final_wav
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "approach": approach,
+        "chunks": len(lengths),
+        "samples": samples,
+        "final_mb": round(samples * 4 / 1e6, 1),
+        "best_ms": round(min(timings), 1),
+        "peak_rss_delta_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--approach", choices=sorted(APPROACHES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.approach:
+        print(json.dumps(run_one(args.approach, args.minutes, args.repeat)))
+        return
+
+    print(f"Assembling {args.minutes:g} minutes of audio ({args.repeat} runs each)\n")
+    for approach in ("legacy", "assembler"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--approach", approach,
+             "--minutes", str(args.minutes), "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        print(f"{approach:>10}: {result['best_ms']:8.1f} ms   "
+              f"peak RSS +{result['peak_rss_delta_mb']:7.1f} MB   "
+              f"(final audio {result['final_mb']} MB, {result['chunks']} chunks)")
+
+
+if __name__ == "__main__":
+    main()
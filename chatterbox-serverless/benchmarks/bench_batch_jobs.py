@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark one multi-script batch job against the same scripts as separate jobs
+
+Generates N short scripts (default 20) with one voice, first as N separate
+jobs and then as a single ``items`` batch job, and reports wall time and
+audio seconds per wall second for both. The synthesis cache is off so
+neither run reuses the other's audio.
+
+By default both runs call the handler in-process after loading the model and
+doing one untimed warm-up job. That shows the worker-side gain: shared
+conditioning, voice decoding and cross-script chunk batching. With
+``--endpoint`` the jobs go to a deployed RunPod endpoint through ``/runsync``
+instead, so queue latency and cold starts are included too.
+
+Requires ChatterboxTTS and its weights for the in-process run, or a deployed
+endpoint and API key for ``--endpoint``.
+
+Usage:
+    python benchmarks/bench_batch_jobs.py --voice voice.wav [--scripts 20] [--concurrency 4]
+    python benchmarks/bench_batch_jobs.py --voice voice.wav --endpoint ENDPOINT_ID --api-key KEY [--parallel-calls 1]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SENTENCES = [
+    "Most creators never notice the moment their audience stops listening.",
+    "It happens in the first ten seconds, long before the real story starts.",
+    "So open with the result, then show how you got there.",
+    "Keep every sentence short enough to say in a single breath.",
+    "My neighbor swore the package on my porch was addressed to him.",
+    "It wasn't, and the security camera saw the whole thing.",
+]
+
+SETTINGS = {"synthesis_cache": "off"}
+
+
+def make_scripts(count: int) -> list:
+    # Three sentences each, rotated so no two scripts are identical
+    return [
+        f"Story {i + 1}. " + " ".join(SENTENCES[(i + k) % len(SENTENCES)] for k in range(3))
+        for i in range(count)
+    ]
+
+
+def local_runner(concurrency: int):
+    import rp_handler
+
+    def run(input_data, job_id):
+        if "items" in input_data:
+            input_data = {**input_data, "concurrency": concurrency}
+        return rp_handler.handler({"id": job_id, "input": input_data})
+    return run
+
+
+def endpoint_runner(endpoint_id: str, api_key: str, concurrency: int):
+    import requests
+
+    url = f"https://api.runpod.ai/v2/{endpoint_id}/runsync"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+    def run(input_data, job_id):
+        if "items" in input_data:
+            input_data = {**input_data, "concurrency": concurrency}
+        response = requests.post(url, json={"input": input_data}, headers=headers, timeout=3600)
+        response.raise_for_status()
+        return response.json().get("output") or {"error": response.text[:200]}
+    return run
+
+
+def audio_seconds(result: dict) -> float:
+    items = result.get("items", [result])
+    return sum(item.get("duration", 0) for item in items if "error" not in item)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voice", required=True, help="Reference voice file")
+    parser.add_argument("--scripts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="Items generated at once inside the batch job")
+    parser.add_argument("--endpoint", help="RunPod endpoint id (default: call the handler in-process)")
+    parser.add_argument("--api-key", default=os.environ.get("RUNPOD_API_KEY"))
+    parser.add_argument("--parallel-calls", type=int, default=1, help="Separate jobs in flight at once")
+    args = parser.parse_args()
+
+    with open(args.voice, "rb") as f:
+        voice_b64 = base64.b64encode(f.read()).decode()
+    scripts = make_scripts(args.scripts)
+
+    if args.endpoint:
+        run = endpoint_runner(args.endpoint, args.api_key, args.concurrency)
+        print(f"Endpoint {args.endpoint}: {len(scripts)} scripts\n")
+    else:
+        from model_registry import registry
+
+        _, load_ms = registry.get()
+        run = local_runner(args.concurrency)
+        run({"text": SENTENCES[0], "voice_file": voice_b64, "settings": SETTINGS}, "warm-up")
+        print(f"Model loaded in {load_ms:.0f} ms; {len(scripts)} scripts in-process\n")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel_calls)) as executor:
+        separate = list(executor.map(
+            lambda i: run({"text": scripts[i], "voice_file": voice_b64, "settings": SETTINGS}, f"separate-{i}"),
+            range(len(scripts))
+        ))
+    separate_s = time.perf_counter() - start
+    separate_audio = sum(audio_seconds(result) for result in separate)
+    separate_failed = sum(1 for result in separate if "error" in result)
+
+    start = time.perf_counter()
+    batch = run({
+        "voices": {"narrator": voice_b64},
+        "settings": SETTINGS,
+        "items": [{"id": str(i), "text": text, "voice": "narrator"} for i, text in enumerate(scripts)],
+    }, "batch")
+    batch_s = time.perf_counter() - start
+    batch_audio = audio_seconds(batch)
+    if "error" in batch:
+        sys.exit(f"Batch job failed: {batch['error']}")
+
+    print(f"{len(scripts)} separate jobs: {separate_s:7.2f} s   {separate_audio / separate_s:5.2f} audio s/s   "
+          f"({separate_failed} failed, {args.parallel_calls} in flight)")
+    print(f"1 batch job:      {batch_s:7.2f} s   {batch_audio / batch_s:5.2f} audio s/s   "
+          f"({batch['failed_count']} failed, {args.concurrency} items at a time)   "
+          f"{separate_s / batch_s:.2f}x")
+    scheduler = batch["batch"].get("scheduler")
+    if scheduler:
+        print(f"Scheduler: {scheduler['batch_size']['count']} batched calls "
+              f"(mean size {scheduler['batch_size']['mean']}), {scheduler['sequential_chunks']} chunks one at a time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the token-aware chunk planner against the old character splitter
+
+Builds a deterministic script of mixed short and long sentences and reports
+planning time, chunk count and the spread of chunk sizes (in estimated text
+tokens) for both. Also times the planner at doubling input sizes to show it
+scales linearly.
+
+Usage:
+    python benchmarks/bench_chunk_planner.py [--chars 50000] [--max-tokens 50] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from chunk_planner import estimate_tokens, plan_chunks, CHARS_PER_TOKEN
+
+WORDS = (
+    "the a our your this every most new quick simple creator audience channel video "
+    "growth engagement story hook moment question answer idea reason result week "
+    "builds shares watches keeps finds learns makes grows tells changes starts "
+    "really always often never quickly slowly clearly honestly"
+).split()
+
+
+def make_script(chars: int, seed: int = 0) -> str:
+    """Mixed sentence lengths, some long enough to need clause/word splits"""
+    rng = random.Random(seed)
+    sentences, total = [], 0
+    while total < chars:
+        n = rng.choice([3, 5, 8, 12, 16, 24, 40, 70])
+        words = [rng.choice(WORDS) for _ in range(n)]
+        if n >= 16:
+            words[n // 2] += ","
+        sentence = " ".join(words).capitalize() + rng.choice(".!?")
+        sentences.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(sentences)[:chars].rsplit(" ", 1)[0]
+
+
+def legacy_split(text: str, max_length: int = 150) -> list:
+    """The previous ``split_text_into_chunks`` from rp_handler.py"""
+    if len(text) <= max_length:
+        return [text]
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    chunks = []
+    for sentence in sentences:
+        if len(sentence) <= max_length:
+            if chunks and len(chunks[-1] + " " + sentence) <= max_length:
+                chunks[-1] += " " + sentence
+            else:
+                chunks.append(sentence)
+        else:
+            words = sentence.split()
+            current_chunk = ""
+            for word in words:
+                test_chunk = current_chunk + (" " if current_chunk else "") + word
+                if len(test_chunk) <= max_length:
+                    current_chunk = test_chunk
+                else:
+                    if current_chunk:
+                        chunks.append(current_chunk.strip())
+                    current_chunk = word
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def best_ms(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def describe(name, ms, chunks, max_tokens):
+    sizes = [estimate_tokens(chunk) for chunk in chunks]
+    short = sum(size < max_tokens / 3 for size in sizes)
+    sentence_ends = sum(chunk.endswith((".", "!", "?")) for chunk in chunks)
+    print(f"{name:>8}: {ms:7.2f} ms  {len(chunks):5d} chunks  "
+          f"tokens min/mean/max {min(sizes):5.1f}/{statistics.mean(sizes):5.1f}/{max(sizes):5.1f}  "
+          f"stdev {statistics.pstdev(sizes):5.1f}  short(<1/3 max) {short:4d}  "
+          f"sentence-final {100 * sentence_ends / len(chunks):5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=50000)
+    parser.add_argument("--max-tokens", type=int, default=50,
+                        help="planner budget; the legacy splitter gets the same budget in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_script(args.chars)
+    max_chars = args.max_tokens * CHARS_PER_TOKEN
+    print(f"Planning {len(text)} characters, budget {args.max_tokens} tokens / {max_chars} chars "
+          f"(best of {args.repeat})\n")
+
+    legacy_ms, legacy_chunks = best_ms(lambda: legacy_split(text, max_chars), args.repeat)
+    planner_ms, planner_chunks = best_ms(lambda: plan_chunks(text, args.max_tokens), args.repeat)
+    assert " ".join(planner_chunks).split() == text.split(), "planner dropped or reordered words"
+    describe("legacy", legacy_ms, legacy_chunks, args.max_tokens)
+    describe("planner", planner_ms, planner_chunks, args.max_tokens)
+
+    print("\nPlanner scaling:")
+    for factor in (0.25, 0.5, 1, 2, 4):
+        scaled = make_script(int(args.chars * factor))
+        ms, _ = best_ms(lambda: plan_chunks(scaled, args.max_tokens), args.repeat)
+        print(f"  {len(scaled):>7} chars: {ms:7.2f} ms  ({1000 * ms / len(scaled):.2f} us/char)")
+
+
+if __name__ == "__main__":
+    main()
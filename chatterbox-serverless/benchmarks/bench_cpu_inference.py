@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark CPU inference modes by real-time factor on a fixed script
+
+Each variant loads the model on CPU in a fresh subprocess (thread pools are
+process-wide and can only be sized once) with the deployment settings from
+cpu_inference.py, runs one untimed warm-up generation (which also triggers
+``torch.compile``), then generates every sentence of the script with a fixed
+seed. RTF = generation seconds / audio seconds; lower is better. Any variant
+that fails is reported with its stderr and the run exits non-zero.
+
+Variants:
+    baseline  float32, torch's default threading
+    threads   float32, --threads intra-op / 1 inter-op thread
+    int8      dynamic int8 T3 linears, --threads
+    bfloat16  bf16 autocast for T3 (falls back to float32 without native bf16), --threads
+    compile   float32 + torch.compile, --threads
+
+Requires ChatterboxTTS and its weights (CHATTERBOX_CKPT_DIR or hub access).
+
+Usage:
+    python benchmarks/bench_cpu_inference.py [--threads 4] [--repeat 2] [--variants baseline int8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SCRIPT = [
+    "Most creators never notice the moment their audience stops listening.",
+    "It happens in the first ten seconds, long before the real story starts.",
+    "So open with the result, then show how you got there.",
+    "Keep every sentence short enough to say in a single breath.",
+]
+
+VARIANTS = {
+    "baseline": {"CHATTERBOX_DTYPE": "float32"},
+    "threads": {"CHATTERBOX_DTYPE": "float32"},
+    "int8": {"CHATTERBOX_DTYPE": "int8"},
+    "bfloat16": {"CHATTERBOX_DTYPE": "bfloat16"},
+    "compile": {"CHATTERBOX_DTYPE": "float32", "CHATTERBOX_CPU_COMPILE": "1"},
+}
+
+
+def run_variant(repeat: int):
+    from batched_generation import seed_generation
+    from model_registry import registry
+
+    model, load_ms = registry.get("cpu")
+    phases = registry.health()["models"][0]["load_phases"]
+
+    start = time.perf_counter()
+    model.generate(SCRIPT[0])
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    best_s, audio_s = None, 0.0
+    for _ in range(repeat):
+        elapsed, audio_s = 0.0, 0.0
+        for i, sentence in enumerate(SCRIPT):
+            seed_generation(i)
+            start = time.perf_counter()
+            wav = model.generate(sentence)
+            elapsed += time.perf_counter() - start
+            audio_s += wav.shape[-1] / model.sr
+        best_s = elapsed if best_s is None else min(best_s, elapsed)
+
+    return {
+        "load_ms": round(load_ms, 1),
+        "warmup_ms": round(warmup_ms, 1),
+        "generate_s": round(best_s, 2),
+        "audio_s": round(audio_s, 2),
+        "rtf": round(best_s / audio_s, 3),
+        "threads": phases.get("cpu_threads"),
+        "applied": phases.get("cpu_optimizations"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_variant(args.repeat)))
+        return
+
+    print(f"{len(SCRIPT)} sentences, best of {args.repeat}, {args.threads} threads for tuned variants\n")
+    baseline_rtf = None
+    failed = []
+    for name in args.variants:
+        env = {**os.environ, "CHATTERBOX_DEVICE": "cpu", **VARIANTS[name]}
+        if name != "baseline":
+            env["CHATTERBOX_CPU_THREADS"] = str(args.threads)
+            env["CHATTERBOX_CPU_INTEROP_THREADS"] = "1"
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", "--repeat", str(args.repeat)],
+            env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{name:>9}: FAILED (exit {proc.returncode})\n{proc.stderr.strip()[-2000:]}")
+            failed.append(name)
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if name == "baseline":
+            baseline_rtf = result["rtf"]
+        speedup = f"{baseline_rtf / result['rtf']:.2f}x" if baseline_rtf else "-"
+        print(f"{name:>9}: RTF {result['rtf']:6.3f} ({speedup} vs baseline)   "
+              f"{result['generate_s']:.2f}s for {result['audio_s']:.2f}s audio   "
+              f"load {result['load_ms']:.0f} ms, warm-up {result['warmup_ms']:.0f} ms   "
+              f"threads {result['threads']}   {result['applied']}")
+
+    if failed:
+        sys.exit(f"\n{len(failed)} variant(s) failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
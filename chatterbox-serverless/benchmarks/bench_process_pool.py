@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark throughput scaling of the multi-process CPU pool from 1 to N processes
+
+Loads ChatterboxTTS once on CPU, then for each pool size starts a fresh
+``ProcessPool`` with the cores split evenly between its processes. Each pool
+generates the same fixed set of sentences with the built-in voice and fixed
+seeds. Throughput is reported as audio seconds generated per wall second,
+together with per-process RSS/PSS. If the weights are shared, total PSS grows
+by much less than the weight size per extra process.
+
+Requires ChatterboxTTS and its weights (CHATTERBOX_CKPT_DIR or hub access).
+
+Usage:
+    python benchmarks/bench_process_pool.py [--max-processes 4] [--cores 8] [--chunks 16]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SENTENCES = [
+    "Most creators never notice the moment their audience stops listening.",
+    "It happens in the first ten seconds, long before the real story starts.",
+    "So open with the result, then show how you got there.",
+    "Keep every sentence short enough to say in a single breath.",
+]
+
+
+def run_pool(model, processes: int, cores: int, chunks: list):
+    from process_pool import ProcessPool
+
+    pool = ProcessPool(model, processes, threads_per_process=max(1, cores // processes))
+    try:
+        # One untimed chunk per process so start-up isn't counted
+        list(pool.iter_generate_chunks(chunks[:processes], {}, model.conds, seeds=list(range(processes))))
+        start = time.perf_counter()
+        audio_samples = sum(
+            wav.shape[-1]
+            for _, wav in pool.iter_generate_chunks(chunks, {}, model.conds, seeds=list(range(len(chunks))))
+        )
+        elapsed = time.perf_counter() - start
+        return elapsed, audio_samples / model.sr, pool.memory_report()
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-processes", type=int, default=4)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--chunks", type=int, default=16)
+    args = parser.parse_args()
+
+    from model_registry import registry
+
+    model, load_ms = registry.get("cpu", "float32")
+    chunks = [SENTENCES[i % len(SENTENCES)] for i in range(args.chunks)]
+    print(f"Model loaded in {load_ms:.0f} ms; {args.chunks} chunks on {args.cores} cores\n")
+
+    baseline = None
+    for processes in range(1, args.max_processes + 1):
+        elapsed, audio_s, memory = run_pool(model, processes, args.cores, chunks)
+        throughput = audio_s / elapsed
+        baseline = baseline or throughput
+        workers = memory["workers"].values()
+        print(f"{processes} x {max(1, args.cores // processes)} threads: "
+              f"{throughput:6.2f} audio s/s ({throughput / baseline:.2f}x)   "
+              f"worker RSS max {max(w.get('rss_mb', 0) for w in workers):.0f} MB   "
+              f"total PSS {memory['total_pss_mb']:.0f} MB "
+              f"(shared weights {memory['shared_weights_mb']:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark staged T3/S3Gen generation against ChatterboxTTS.generate
+
+Loads the model once, then generates the same fixed sentences with the
+built-in voice and fixed seeds, first through ``generate`` one chunk at a time
+and then through ``staged_generation.iter_generate_chunks`` at each vocoder
+batch size. Reports wall time, audio seconds per wall second and the per-stage
+busy/idle split. A vocoder that is mostly idle means T3 is the bottleneck and
+overlapping the stages can't save more than the vocoder's busy time.
+
+Requires ChatterboxTTS and its weights (CHATTERBOX_CKPT_DIR or hub access).
+
+Usage:
+    python benchmarks/bench_staged_generation.py [--device cpu] [--chunks 8] [--vocoder-batch-sizes 1,2,4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SENTENCES = [
+    "Most creators never notice the moment their audience stops listening.",
+    "It happens in the first ten seconds, long before the real story starts.",
+    "So open with the result, then show how you got there.",
+    "Keep every sentence short enough to say in a single breath.",
+]
+
+
+def run_generate(model, chunks: list):
+    from batched_generation import seed_generation
+    from precision import device_type, generation_context
+
+    start = time.perf_counter()
+    samples = 0
+    for index, text in enumerate(chunks):
+        seed_generation(index)
+        with generation_context(None, device_type(model)):
+            samples += model.generate(text).shape[-1]
+    return time.perf_counter() - start, samples / model.sr
+
+
+def run_staged(model, chunks: list, vocoder_batch_size: int):
+    from staged_generation import iter_generate_chunks
+
+    stats = {}
+    start = time.perf_counter()
+    samples = sum(
+        wav.shape[-1]
+        for _, wav in iter_generate_chunks(
+            model, chunks, {}, seeds=list(range(len(chunks))), vocoder_batch_size=vocoder_batch_size, stats=stats
+        )
+    )
+    return time.perf_counter() - start, samples / model.sr, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--vocoder-batch-sizes", default="1,2,4")
+    args = parser.parse_args()
+
+    from model_registry import registry
+    from staged_generation import supports_staged
+
+    model, load_ms = registry.get(args.device)
+    if not supports_staged(model):
+        sys.exit("This chatterbox-tts build doesn't expose the T3/S3Gen internals staged generation needs")
+    chunks = [SENTENCES[i % len(SENTENCES)] for i in range(args.chunks)]
+    print(f"Model loaded on {args.device} in {load_ms:.0f} ms; {args.chunks} chunks\n")
+
+    # Untimed warm-up so first-call overhead isn't counted
+    run_generate(model, chunks[:1])
+
+    elapsed, audio_s = run_generate(model, chunks)
+    baseline = elapsed
+    print(f"generate:          {elapsed:7.2f} s   {audio_s / elapsed:5.2f} audio s/s")
+    for size in (int(s) for s in args.vocoder_batch_sizes.split(",")):
+        elapsed, audio_s, stats = run_staged(model, chunks, size)
+        t3, vocoder = stats["t3"], stats["vocoder"]
+        print(f"staged (batch {size}):  {elapsed:7.2f} s   {audio_s / elapsed:5.2f} audio s/s   "
+              f"({baseline / elapsed:.2f}x)   t3 busy {t3['busy_ms']:.0f} ms idle {t3['idle_ms']:.0f} ms   "
+              f"vocoder busy {vocoder['busy_ms']:.0f} ms idle {vocoder['idle_ms']:.0f} ms   "
+              f"{stats['vocoder_calls']} calls, max batch {stats['max_vocoder_batch']}")
+
+
+if __name__ == "__main__":
+    main()
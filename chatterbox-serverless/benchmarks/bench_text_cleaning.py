@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass script cleaner against the previous implementation
+
+Times both cleaners over a corpus of stored-script-sized inputs, as in a
+batch backfill. That the two produce identical output is checked by
+tests/test_text_cleaning.py, which also holds the previous implementation.
+
+Usage:
+    python benchmarks/bench_text_cleaning.py [--scripts 2000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from test_text_cleaning import legacy_clean
+from text_cleaning import clean_script_for_tts
+
+
+def make_corpus(scripts: int):
+    rng = random.Random(1)
+    words = "the creator audience video story hook moment idea result growth".split()
+    corpus = []
+    for _ in range(scripts):
+        lines = []
+        for _ in range(rng.randint(20, 60)):
+            kind = rng.random()
+            if kind < 0.1:
+                lines.append(f"[{rng.choice(words).upper()}] ({rng.choice(words)})")
+            elif kind < 0.15:
+                lines.append(f"{rng.choice(['Views', 'Engagement', 'Metrics'])}: {rng.randint(1, 99999)}")
+            elif kind < 0.25:
+                lines.append(f"- {rng.choice(words)} {rng.randint(1, 100)}%")
+            elif kind < 0.3:
+                lines.append("")
+            else:
+                lines.append(" ".join(rng.choice(words) for _ in range(rng.randint(6, 30))) + ".")
+        corpus.append("\n".join(lines))
+    return corpus
+
+
+def best_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scripts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.scripts)
+    chars = sum(len(text) for text in corpus)
+    print(f"Cleaning {len(corpus)} scripts, {chars / 1e6:.1f}M characters (best of {args.repeat})")
+    legacy_ms = best_ms(lambda: [legacy_clean(text) for text in corpus], args.repeat)
+    new_ms = best_ms(lambda: [clean_script_for_tts(text) for text in corpus], args.repeat)
+    print(f"  legacy: {legacy_ms:8.1f} ms")
+    print(f"  single-pass: {new_ms:8.1f} ms  ({legacy_ms / new_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
+
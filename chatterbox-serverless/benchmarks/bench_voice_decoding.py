@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark voice payload decoding: previous regex path vs strict fast path
+
+For 1-10 MB voice files, times and measures peak Python allocations of:
+
+- ``legacy``  - the previous ``fix_base64_padding`` + regex validation + b64decode
+- ``strict``  - ``decode_voice_file`` on well-formed base64 (fast path)
+- ``wrapped`` - ``decode_voice_file`` on MIME-style base64 with line breaks,
+                which falls back to the lenient path
+- ``raw``     - ``decode_voice_file`` on raw bytes (no base64 at all)
+
+Usage:
+    python benchmarks/bench_voice_decoding.py [--sizes-mb 1 2 5 10] [--repeat 5]
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from rp_handler import decode_voice_file
+
+
+def legacy_decode(voice_file_b64):
+    """The previous ``fix_base64_padding`` + ``decode_voice_file`` from rp_handler.py"""
+    base64_string = voice_file_b64.strip()
+    if base64_string.startswith('data:'):
+        base64_string = base64_string.split(',', 1)[1]
+    base64_string = re.sub(r'[^A-Za-z0-9+/=]', '', base64_string)
+    missing_padding = len(base64_string) % 4
+    if missing_padding:
+        base64_string += '=' * (4 - missing_padding)
+    if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', base64_string):
+        raise ValueError("Invalid base64 format")
+    return base64.b64decode(base64_string)
+
+
+def quiet_decode(payload):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return decode_voice_file(payload)
+
+
+def measure(fn, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Best of {args.repeat}; peak = Python allocations during one decode\n")
+    for size_mb in args.sizes_mb:
+        raw = b"RIFF" + os.urandom(int(size_mb * 1024 * 1024) - 4)
+        encoded = base64.b64encode(raw).decode("ascii")
+        wrapped = "\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+        cases = [
+            ("legacy", legacy_decode, encoded),
+            ("strict", quiet_decode, encoded),
+            ("wrapped", quiet_decode, wrapped),
+            ("raw", quiet_decode, raw),
+        ]
+        print(f"{size_mb:g} MB voice ({len(encoded) / 1e6:.1f}M base64 chars)")
+        for name, fn, payload in cases:
+            assert fn(payload) == raw, name
+            ms, peak_mb = measure(fn, payload, args.repeat)
+            print(f"  {name:>8}: {ms:8.2f} ms   peak {peak_mb:6.1f} MB")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Import shims for ChatterboxTTS
+
+The PyPI package installs the ``chatterbox`` module while some older builds
+exposed ``chatterbox_tts``. Everything in the worker imports the model through
+here so the fallback logic lives in one place. It also knows which checkpoint
+files the model loads, so the image build can pre-fetch them with nothing but
+this module (see prefetch_weights.py).
+"""
+
+import os
+
+
+def setup_chatterbox_path():
+    """Setup and verify ChatterboxTTS is available"""
+    try:
+        # Try to import the installed package
+        import chatterbox_tts
+        return True
+    except ImportError:
+        try:
+            # Fallback: try alternative import
+            import chatterbox
+            return True
+        except ImportError:
+            print("❌ ChatterboxTTS not found. Please install with: pip install chatterbox-tts")
+            return False
+
+
+def import_chatterbox_tts():
+    """Return the ChatterboxTTS class from whichever package is installed"""
+    try:
+        from chatterbox_tts import ChatterboxTTS
+    except ImportError:
+        from chatterbox.tts import ChatterboxTTS
+    return ChatterboxTTS
+
+# Files ``ChatterboxTTS.from_local`` reads; baked into the image by prefetch_weights.py
+CHECKPOINT_FILES = ("ve.safetensors", "t3_cfg.safetensors", "s3gen.safetensors", "tokenizer.json", "conds.pt")
+
+
+def baked_checkpoint_dir():
+    """Directory with pre-fetched weights (``CHATTERBOX_CKPT_DIR``), or None if incomplete"""
+    ckpt_dir = os.environ.get("CHATTERBOX_CKPT_DIR")
+    if not ckpt_dir:
+        return None
+    if all(os.path.exists(os.path.join(ckpt_dir, name)) for name in CHECKPOINT_FILES):
+        return ckpt_dir
+    print(f"Warning: {ckpt_dir} is missing checkpoint files, loading from the hub instead")
+    return None
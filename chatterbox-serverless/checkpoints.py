@@ -0,0 +1,132 @@
+"""
+Per-chunk job checkpoints for resumable long-form jobs
+
+With checkpointing on, every finished chunk's audio (raw float32) and metadata
+are written under a directory derived from the job key as soon as the chunk
+is generated. If the job fails part way and is resubmitted with the same key
+(RunPod retries keep the job id), the chunks already on disk are loaded and
+only the remaining ones are generated. A fingerprint of the chunk plan is
+stored alongside, so a resubmission with different text, voice or settings
+starts over instead of stitching mismatched audio together.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import torch
+
+
+def plan_fingerprint(chunk_keys: list) -> str:
+    """Identify a chunk plan by its ordered per-chunk content keys"""
+    return hashlib.sha256("\n".join(chunk_keys).encode("utf-8")).hexdigest()
+
+
+class JobCheckpoint:
+    """Checkpoint directory for one job key"""
+
+    def __init__(self, root: str, job_key: str, fingerprint: str):
+        self.job_key = job_key
+        self.fingerprint = fingerprint
+        # Job keys are caller-controlled, so never use them as file names directly
+        self.path = os.path.join(root, hashlib.sha256(str(job_key).encode()).hexdigest())
+        self._manifest_path = os.path.join(self.path, "manifest.json")
+        self._chunks = {}
+        self._lock = threading.Lock()
+        self.resumed = 0
+        self.saved = 0
+
+    def _chunk_path(self, index: int) -> str:
+        return os.path.join(self.path, f"chunk_{index:05d}.f32")
+
+    def _write_manifest(self):
+        manifest = {
+            "job_key": self.job_key,
+            "fingerprint": self.fingerprint,
+            "updated_at": time.time(),
+            "chunks": {str(i): meta for i, meta in sorted(self._chunks.items())},
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".part")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def load(self) -> dict:
+        """Return ``{chunk_index: wav}`` for every chunk already checkpointed"""
+        try:
+            with open(self._manifest_path) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = None
+
+        if manifest is None or manifest.get("fingerprint") != self.fingerprint:
+            if manifest is not None:
+                print(f"Checkpoint for {self.job_key} is for a different chunk plan, starting over")
+            self.clear()
+            os.makedirs(self.path, exist_ok=True)
+            return {}
+
+        wavs = {}
+        for index, meta in manifest["chunks"].items():
+            index = int(index)
+            try:
+                data = np.fromfile(self._chunk_path(index), dtype=np.float32)
+            except FileNotFoundError:
+                continue
+            if len(data) != meta["num_samples"]:
+                # Torn write from a crashed worker; regenerate this chunk
+                continue
+            wavs[index] = torch.from_numpy(data)
+            self._chunks[index] = meta
+        self.resumed = len(wavs)
+        return wavs
+
+    def save(self, index: int, wav, metadata: dict = None):
+        """Persist one finished chunk and record it in the manifest"""
+        data = wav.detach().reshape(-1).to("cpu", torch.float32).numpy()
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            data.tofile(f)
+        os.replace(tmp_path, self._chunk_path(index))
+        with self._lock:
+            self._chunks[index] = {**(metadata or {}), "num_samples": len(data)}
+            self._write_manifest()
+            self.saved += 1
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        return {
+            "key": self.job_key,
+            "resumed_chunks": self.resumed,
+            "saved_chunks": self.saved,
+        }
+
+
+def expire_checkpoints(root: str, max_age_seconds: float):
+    """Remove checkpoints of jobs that were never resubmitted"""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass
+
+
+def open_checkpoint(job_key: str, fingerprint: str) -> JobCheckpoint:
+    """Open (and load) the checkpoint for ``job_key`` under ``CHATTERBOX_CHECKPOINT_DIR``"""
+    root = os.environ.get("CHATTERBOX_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "chatterbox-checkpoints"))
+    expire_checkpoints(root, float(os.environ.get("CHATTERBOX_CHECKPOINT_TTL_HOURS", "24")) * 3600)
+    return JobCheckpoint(root, job_key, fingerprint)
@@ -0,0 +1,155 @@
+"""
+Token-aware, length-balanced chunk planner
+
+Splits a script into chunks measured in model text tokens rather than
+characters. The text is cut into sentences (and, for sentences that are too
+long on their own, clauses and then words), each piece is tokenized once, and
+a single greedy pass packs pieces into chunks while re-targeting the ideal
+chunk size from the tokens still left. That keeps chunk sizes even across the
+script - no tiny tail chunk paying full per-call overhead - and the whole plan
+is linear in the length of the text.
+"""
+
+import math
+import os
+import re
+
+DEFAULT_MAX_TOKENS_PER_CHUNK = int(os.environ.get("CHATTERBOX_MAX_TOKENS_PER_CHUNK", "60"))
+
+# Rough characters per token for the ChatterboxTTS text tokenizer, used when
+# the loaded model doesn't expose one
+CHARS_PER_TOKEN = 3
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+_CLAUSE_END_RE = re.compile(r'(?<=[,;:])\s+')
+
+
+def estimate_tokens(text: str) -> float:
+    # Proportional to length, so the estimate for joined pieces is exactly the
+    # sum of the pieces plus their separators
+    return len(text) / CHARS_PER_TOKEN
+
+
+def token_counter(model=None):
+    """Return ``count(text) -> int`` using the model's text tokenizer when it has one"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None and hasattr(tokenizer, "encode"):
+        def count(text):
+            return len(tokenizer.encode(text))
+        return count
+    return estimate_tokens
+
+
+# Boundary strength after a piece; chunks prefer to end on stronger ones
+WORD, CLAUSE, SENTENCE = 0, 1, 2
+
+
+def _iter_sentences(text):
+    """
+    Split a string, or an iterable of cleaned segments that would be joined
+    with single spaces, into sentences without building the joined text
+    """
+    if isinstance(text, str):
+        yield from _SENTENCE_END_RE.split(text)
+        return
+    carry = ""
+    for segment in text:
+        parts = _SENTENCE_END_RE.split(f"{carry} {segment}" if carry else segment)
+        carry = parts.pop()
+        yield from parts
+    if carry:
+        yield carry
+
+
+def _split_units(text, max_tokens, count_tokens):
+    """
+    Yield ``(piece, tokens, boundary)`` covering the text in order.
+
+    Sentences that fit are one piece; longer ones are broken into clauses and,
+    if a clause still doesn't fit, into words.
+    """
+    for sentence in _iter_sentences(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            yield sentence, tokens, SENTENCE
+            continue
+
+        clauses = [c for c in _CLAUSE_END_RE.split(sentence) if c.strip()]
+        for position, clause in enumerate(clauses):
+            end = SENTENCE if position == len(clauses) - 1 else CLAUSE
+            tokens = count_tokens(clause)
+            if tokens <= max_tokens:
+                yield clause, tokens, end
+                continue
+            words = clause.split()
+            for word_position, word in enumerate(words):
+                yield word, count_tokens(word), end if word_position == len(words) - 1 else WORD
+
+
+def plan_chunks(text, max_tokens: int = None, count_tokens=None) -> list:
+    """
+    Split ``text`` into chunks of at most ``max_tokens`` text tokens.
+
+    ``text`` may also be an iterable of segments (e.g. ``iter_clean_lines``)
+    that are treated as joined by single spaces.
+
+    Chunk sizes are balanced around ``remaining_tokens / remaining_chunks``.
+    Chunks end on sentence boundaries where possible; when the limit forces a
+    cut, it falls back to the last sentence end, then clause end, that still
+    leaves the chunk at least half the target size.
+    """
+    max_tokens = max(1, int(max_tokens or DEFAULT_MAX_TOKENS_PER_CHUNK))
+    count_tokens = count_tokens or estimate_tokens
+
+    units = list(_split_units(text, max_tokens, count_tokens))
+    if not units:
+        return []
+
+    # Joining two pieces adds a space
+    separator = count_tokens(" ")
+    remaining = sum(tokens for _, tokens, _ in units) + separator * (len(units) - 1)
+    chunks = []
+    # Pieces of the open chunk and the chunk size after each of them
+    current, sizes = [], []
+
+    def emit(cut):
+        nonlocal current, sizes, remaining
+        chunks.append(" ".join(piece for piece, _, _ in current[:cut]))
+        used = sizes[cut - 1] + separator
+        remaining -= used
+        current = current[cut:]
+        sizes = [size - used for size in sizes[cut:]]
+
+    def best_cut(target):
+        for strength in (SENTENCE, CLAUSE):
+            for cut in range(len(current), 0, -1):
+                if sizes[cut - 1] < target / 2:
+                    break
+                if current[cut - 1][2] >= strength:
+                    return cut
+        return len(current)
+
+    for unit in units:
+        tokens = unit[1]
+        if current:
+            # Ideal size for this chunk given what is left, never above the limit
+            target = remaining / max(1, math.ceil(remaining / max_tokens))
+            size = sizes[-1]
+            grown = size + separator + tokens
+            if grown > max_tokens:
+                # Cutting may leave a tail that still can't take the unit;
+                # keep cutting (or flush the tail) until it fits
+                while current and sizes[-1] + separator + tokens > max_tokens:
+                    emit(best_cut(remaining / max(1, math.ceil(remaining / max_tokens))))
+            elif current[-1][2] == SENTENCE and abs(target - size) <= abs(target - grown):
+                # Adding the next sentence would move us further from the target
+                emit(len(current))
+        sizes.append((sizes[-1] + separator if current else 0) + tokens)
+        current.append(unit)
+
+    while current:
+        emit(len(current))
+    return chunks
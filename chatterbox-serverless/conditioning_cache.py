@@ -0,0 +1,147 @@
+"""
+Speaker-conditioning cache
+
+``model.generate(..., audio_prompt_path=...)`` re-runs ``prepare_conditionals``
+(reference resampling, speech tokenizer, voice encoder, S3Gen ref embedding) on
+every call. The conditionals only depend on the voice audio and the
+exaggeration value, so we compute them once and keep them in a bounded LRU
+shared by every job in a warm worker.
+"""
+
+import copy
+import dataclasses
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from reference_audio import conditionals_from_voice
+
+
+def voice_content_hash(voice_data: bytes) -> str:
+    """SHA-256 of the decoded voice bytes"""
+    return hashlib.sha256(voice_data).hexdigest()
+
+
+def _tensor_bytes(obj) -> int:
+    """Approximate memory held by the tensors inside a conditionals object"""
+    if obj is None:
+        return 0
+    if hasattr(obj, "element_size") and hasattr(obj, "nelement"):
+        return obj.element_size() * obj.nelement()
+    if isinstance(obj, dict):
+        return sum(_tensor_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_tensor_bytes(v) for v in obj)
+    if dataclasses.is_dataclass(obj):
+        return sum(_tensor_bytes(getattr(obj, f.name)) for f in dataclasses.fields(obj))
+    if hasattr(obj, "__dict__"):
+        return sum(_tensor_bytes(v) for v in vars(obj).values())
+    return 0
+
+
+def prepare_speaker_conditioning(model, voice_data: bytes, exaggeration: float, timings: dict = None):
+    """Run the conditioning step once (in memory when possible) and return the result"""
+    return conditionals_from_voice(model, voice_data, exaggeration, timings if timings is not None else {})
+
+
+def use_speaker_conditioning(model, conds):
+    """
+    Install cached conditionals on the model for the next ``generate`` calls.
+
+    ``generate`` swaps ``conds.t3`` in place when the exaggeration differs, so
+    the model gets a shallow copy and the cached entry is never mutated.
+    """
+    model.conds = copy.copy(conds)
+
+
+class ConditioningCache:
+    """LRU of prepared conditionals bounded by entry count and tensor bytes"""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, callers] for conditionals being prepared right now
+        self._preparing = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(voice_hash: str, exaggeration: float, device: str = "") -> str:
+        return f"{voice_hash}:{float(exaggeration)!r}:{device}"
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, conds):
+        size = _tensor_bytes(conds)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Never cache something that would evict everything else
+                return
+            self._entries[key] = (conds, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_create(self, key: str, factory):
+        """
+        Return ``(conds, hit)``, calling ``factory()`` on a miss.
+
+        Concurrent callers for the same key (e.g. the items of a batch job)
+        wait for a single ``factory()`` call instead of each preparing it.
+        """
+        with self._lock:
+            preparing = self._preparing.setdefault(key, [threading.Lock(), 0])
+            preparing[1] += 1
+        try:
+            with preparing[0]:
+                conds = self.get(key)
+                if conds is not None:
+                    return conds, True
+                conds = factory()
+                self.put(key, conds)
+                return conds, False
+        finally:
+            with self._lock:
+                preparing[1] -= 1
+                if not preparing[1]:
+                    del self._preparing[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+conditioning_cache = ConditioningCache(
+    max_entries=int(os.environ.get("CHATTERBOX_COND_CACHE_ENTRIES", "32")),
+    max_bytes=int(os.environ.get("CHATTERBOX_COND_CACHE_MB", "512")) * 1024 * 1024,
+)
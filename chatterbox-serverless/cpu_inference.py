@@ -0,0 +1,156 @@
+"""
+CPU inference tuning
+
+Cheap CPU workers run short clips, where default threading and fp32 weights
+leave a lot on the table. Each knob is selected per deployment:
+
+- ``CHATTERBOX_CPU_THREADS`` / ``CHATTERBOX_CPU_INTEROP_THREADS`` - torch
+  intra/inter-op thread pools (default: torch's own choice)
+- ``CHATTERBOX_DTYPE=int8`` - dynamic int8 quantization of the ``nn.Linear``
+  layers in ``CHATTERBOX_CPU_QUANTIZE_MODULES`` (default ``t3``, the
+  autoregressive transformer that dominates CPU time)
+- ``CHATTERBOX_DTYPE=bfloat16`` - T3 token generation under bf16 autocast,
+  only where the CPU has native bf16 support; otherwise it stays fp32. The
+  S3Gen vocoder always runs in fp32
+- ``CHATTERBOX_CPU_COMPILE=1`` - ``torch.compile`` the T3 transformer, falling
+  back to eager for anything that fails to compile
+
+What was actually applied is recorded in the registry's load phases. When the
+model is served by the process pool, the optimizations are applied in each
+pool worker instead of the parent.
+"""
+
+import functools
+import os
+
+CPU_DTYPES = ("float32", "bfloat16", "int8")
+
+
+def cpu_config() -> dict:
+    threads = os.environ.get("CHATTERBOX_CPU_THREADS")
+    interop_threads = os.environ.get("CHATTERBOX_CPU_INTEROP_THREADS")
+    return {
+        "threads": int(threads) if threads else None,
+        "interop_threads": int(interop_threads) if interop_threads else None,
+        "quantize_modules": [
+            name.strip()
+            for name in os.environ.get("CHATTERBOX_CPU_QUANTIZE_MODULES", "t3").split(",")
+            if name.strip()
+        ],
+        "compile": os.environ.get("CHATTERBOX_CPU_COMPILE", "0") == "1",
+    }
+
+
+def configure_threads(config: dict) -> dict:
+    """Size torch's thread pools; must run before the model does any work"""
+    import torch
+
+    if config["threads"]:
+        torch.set_num_threads(config["threads"])
+    if config["interop_threads"]:
+        try:
+            torch.set_num_interop_threads(config["interop_threads"])
+        except RuntimeError as e:
+            # Only settable once, before any inter-op parallel work has started
+            print(f"Warning: could not set inter-op threads: {e}")
+    return {"threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()}
+
+
+def bf16_supported() -> bool:
+    """True when the CPU runs bf16 natively (AVX512-BF16/AMX) rather than emulating it"""
+    import torch
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def quantize_linear_layers(model, module_names) -> list:
+    """Swap ``nn.Linear`` layers of the named submodules for dynamic int8 versions"""
+    import torch
+
+    quantized = []
+    for name in module_names:
+        module = getattr(model, name, None)
+        if not isinstance(module, torch.nn.Module):
+            print(f"Warning: model has no '{name}' module to quantize")
+            continue
+        torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        quantized.append(name)
+    return quantized
+
+
+def _autocast_bf16(fn):
+    import torch
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def compile_transformer(model) -> bool:
+    """``torch.compile`` the T3 backbone; unsupported graphs fall back to eager"""
+    import torch
+
+    t3 = getattr(model, "t3", None)
+    tfmr = getattr(t3, "tfmr", None)
+    if tfmr is None:
+        print("Warning: model has no T3 transformer to compile")
+        return False
+    torch._dynamo.config.suppress_errors = True
+    # Decoding grows the sequence by one token per step
+    t3.tfmr = torch.compile(tfmr, dynamic=True)
+    return True
+
+
+def defer_cpu_optimizations(model, dtype: str, config: dict = None):
+    """
+    Record the optimizations for ``dtype`` without applying them.
+
+    Quantized and autocast-wrapped modules can't be moved to shared memory or
+    pickled, so a model headed for the process pool is sent as float32 and each
+    worker applies these after unpickling (see process_pool.py).
+    """
+    if dtype not in CPU_DTYPES:
+        raise ValueError(f"Unsupported CPU dtype: {dtype}")
+    model._deferred_cpu_optimizations = (dtype, config or cpu_config())
+
+
+def apply_deferred_cpu_optimizations(model):
+    """Apply what ``defer_cpu_optimizations`` recorded; None when nothing was deferred"""
+    deferred = getattr(model, "_deferred_cpu_optimizations", None)
+    if deferred is None:
+        return None
+    del model._deferred_cpu_optimizations
+    return optimize_for_cpu(model, *deferred)
+
+
+def optimize_for_cpu(model, dtype: str, config: dict = None) -> dict:
+    """Apply the CPU optimizations for ``dtype`` in place; returns what was applied"""
+    if dtype not in CPU_DTYPES:
+        raise ValueError(f"Unsupported CPU dtype: {dtype}")
+    config = config or cpu_config()
+    applied = {"dtype": dtype}
+
+    if dtype == "int8":
+        applied["quantized_modules"] = quantize_linear_layers(model, config["quantize_modules"])
+    elif dtype == "bfloat16":
+        t3 = getattr(model, "t3", None)
+        if not callable(getattr(t3, "inference", None)):
+            print("Warning: model has no T3 inference to autocast, running float32")
+            applied["autocast"] = None
+        elif bf16_supported():
+            # Only T3 token generation: the S3Gen/HiFT vocoder builds complex
+            # tensors, which bf16 can't represent
+            t3.inference = _autocast_bf16(t3.inference)
+            applied["autocast"] = "bfloat16"
+        else:
+            print("Warning: CPU has no native bf16 support, running float32")
+            applied["autocast"] = None
+
+    if config["compile"]:
+        applied["compiled"] = compile_transformer(model)
+    return applied
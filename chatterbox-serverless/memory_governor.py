@@ -0,0 +1,360 @@
+"""
+Memory governor for long-lived workers
+
+An OOM kill loses the warm model, so every job is admitted against a memory
+budget before it generates anything. The prediction is based on text length.
+It adds the host buffers the finished audio needs (assembly buffer, encoded
+output and its inline copy) to a per-batch-item working set for generation,
+which sits on the GPU or in host RAM depending on the device. Each pool tracks
+memory reserved by in-flight jobs. A job that doesn't fit is downgraded to
+smaller batches, down to sequential generation, and refused only when even that
+won't fit. Callers that ask to wait (batch jobs) are held until other running
+jobs release their reservations and are refused only once none are left.
+
+After each job the governor records the job's peak watermarks, updates its
+per-item estimate from the observed peak, and frees allocator caches. Above
+``CHATTERBOX_MEMORY_PRESSURE`` of a budget it also runs the registered pressure
+callbacks, such as clearing the conditioning cache.
+
+Budgets: ``CHATTERBOX_HOST_MEMORY_BUDGET_MB`` (default 90% of the cgroup limit
+or physical RAM) and ``CHATTERBOX_GPU_MEMORY_BUDGET_MB`` (default 90% of the
+device). ``0`` disables enforcement for that pool; watermarks are still reported.
+"""
+
+import ctypes
+import gc
+import os
+import resource
+import threading
+import time
+
+MB = 1024 * 1024
+DEFAULT_BUDGET_FRACTION = 0.9
+PRESSURE_FRACTION = float(os.environ.get("CHATTERBOX_MEMORY_PRESSURE", "0.8"))
+# Starting per-batch-item working set until real jobs have been observed
+DEFAULT_ITEM_MB = {
+    "host": float(os.environ.get("CHATTERBOX_HOST_MB_PER_ITEM", "768")),
+    "cuda": float(os.environ.get("CHATTERBOX_GPU_MB_PER_ITEM", "1024")),
+}
+# Finished audio is held as float32 samples, the encoded file and (inline) its base64
+AUDIO_BYTES_PER_SAMPLE = 4 + 4 + 4 * 4 / 3
+LEARNING_RATE = 0.3
+
+
+class MemoryBudgetExceeded(ValueError):
+    """The job is predicted to exceed the memory budget even when run sequentially"""
+
+
+def _proc_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _host_limit_mb():
+    """cgroup memory limit (v2, then v1), else physical RAM"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # v1 reports "no limit" as a huge page-aligned number
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) / MB
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / MB
+    except (ValueError, OSError):
+        return None
+
+
+def _budget_from_env(name: str, limit_mb):
+    value = os.environ.get(name)
+    if value is not None:
+        return float(value) or None
+    return limit_mb * DEFAULT_BUDGET_FRACTION if limit_mb else None
+
+
+def host_peak_mb() -> float:
+    """Process RSS high-water mark (VmHWM, resettable per job), else ru_maxrss"""
+    hwm = _proc_status_mb("VmHWM")
+    return hwm if hwm is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cuda_peak_mb() -> float:
+    import torch
+    return torch.cuda.max_memory_allocated() / MB
+
+
+def peak_memory(device: str):
+    """``(peak_mb, scope)`` since the current job was admitted"""
+    if device == "cuda":
+        return cuda_peak_mb(), "cuda_allocated"
+    return host_peak_mb(), "process_rss"
+
+
+class HostPool:
+    name = "host"
+
+    def __init__(self):
+        self.budget_mb = _budget_from_env("CHATTERBOX_HOST_MEMORY_BUDGET_MB", _host_limit_mb())
+
+    def usage_mb(self) -> float:
+        rss = _proc_status_mb("VmRSS")
+        return rss if rss is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def peak_mb(self) -> float:
+        return host_peak_mb()
+
+    def reset_peak(self) -> bool:
+        """Reset the RSS high-water mark (Linux >= 4.0); False where unsupported"""
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            return True
+        except OSError:
+            return False
+
+
+class CudaPool:
+    name = "cuda"
+
+    def __init__(self):
+        import torch
+
+        self.budget_mb = _budget_from_env(
+            "CHATTERBOX_GPU_MEMORY_BUDGET_MB", torch.cuda.get_device_properties(0).total_memory / MB
+        )
+
+    def usage_mb(self) -> float:
+        import torch
+        return torch.cuda.memory_allocated() / MB
+
+    def peak_mb(self) -> float:
+        return cuda_peak_mb()
+
+    def reset_peak(self) -> bool:
+        import torch
+        torch.cuda.reset_peak_memory_stats()
+        return True
+
+
+def free_allocator_caches():
+    """Return freed memory to the driver/OS between jobs"""
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+    try:
+        # glibc keeps freed arenas mapped; hand them back so RSS reflects reality
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class Admission:
+    """One admitted job: its (possibly reduced) batch size and memory reservations"""
+
+    def __init__(self, job_id, text_length, requested_batch_size, batch_size, predicted_mb, start_mb,
+                 work_pool, audio_mb, wait_ms=0.0):
+        self.job_id = job_id
+        self.wait_ms = wait_ms
+        self.work_pool = work_pool
+        self.audio_mb = audio_mb
+        self.text_length = text_length
+        self.requested_batch_size = requested_batch_size
+        self.batch_size = batch_size
+        self.predicted_mb = predicted_mb
+        self.start_mb = start_mb
+
+    @property
+    def downgraded(self) -> bool:
+        return self.batch_size < self.requested_batch_size
+
+
+class MemoryGovernor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Notified whenever a job releases its reservation
+        self._released = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._pools = None
+        self._reserved = {}
+        self._item_mb = dict(DEFAULT_ITEM_MB)
+        self._pressure_callbacks = []
+        self.refused = 0
+        self.downgraded = 0
+        self.waited = 0
+
+    def pools(self) -> dict:
+        if self._pools is None:
+            import torch
+            pools = [HostPool()]
+            if torch.cuda.is_available():
+                pools.append(CudaPool())
+            self._pools = {pool.name: pool for pool in pools}
+            self._reserved = {name: 0.0 for name in self._pools}
+        return self._pools
+
+    def on_pressure(self, callback):
+        """Register ``callback()`` to free memory when a pool nears its budget"""
+        self._pressure_callbacks.append(callback)
+
+    def _work_pool(self, device: str) -> str:
+        """Pool that holds the generation working set"""
+        return "cuda" if device == "cuda" and "cuda" in self.pools() else "host"
+
+    @staticmethod
+    def _audio_mb(text_length: int, sample_rate: int) -> float:
+        from audio_assembly import SECONDS_PER_CHAR
+        return text_length * SECONDS_PER_CHAR * sample_rate * AUDIO_BYTES_PER_SAMPLE / MB
+
+    def predict(self, text_length: int, batch_size: int, sample_rate: int, device: str) -> dict:
+        """Predicted extra MB per pool for a job of ``text_length`` characters"""
+        predicted = {name: 0.0 for name in self.pools()}
+        predicted["host"] += self._audio_mb(text_length, sample_rate)
+        work_pool = self._work_pool(device)
+        predicted[work_pool] += batch_size * self._item_mb[work_pool]
+        return predicted
+
+    def _fits(self, predicted: dict) -> bool:
+        for name, pool in self.pools().items():
+            if pool.budget_mb is None:
+                continue
+            if pool.usage_mb() + self._reserved[name] + predicted[name] > pool.budget_mb:
+                return False
+        return True
+
+    def admit(self, job_id, text_length: int, batch_size: int, sample_rate: int, device: str,
+              wait: bool = False) -> Admission:
+        """
+        Reserve memory for a job, halving ``batch_size`` until it fits.
+
+        Raises ``MemoryBudgetExceeded`` when even sequential generation won't fit.
+        With ``wait``, a job that doesn't fit while other jobs hold reservations
+        waits for them to finish instead of being refused.
+        """
+        requested = max(1, int(batch_size))
+        start = time.perf_counter()
+        waited = False
+        with self._lock:
+            pools = self.pools()
+            while True:
+                batch_size = requested
+                predicted = self.predict(text_length, batch_size, sample_rate, device)
+                while not self._fits(predicted) and batch_size > 1:
+                    batch_size //= 2
+                    predicted = self.predict(text_length, batch_size, sample_rate, device)
+                if self._fits(predicted) or not wait or not self._in_flight:
+                    break
+                if not waited:
+                    waited = True
+                    self.waited += 1
+                    print(f"Memory governor: job {job_id} waiting for {self._in_flight} running job(s) to finish")
+                self._released.wait()
+            if not self._fits(predicted):
+                self.refused += 1
+                summary = ", ".join(
+                    f"{name} {pool.usage_mb() + self._reserved[name] + predicted[name]:.0f}/{pool.budget_mb:.0f} MB"
+                    for name, pool in pools.items() if pool.budget_mb is not None
+                )
+                print(f"Memory governor: refusing job {job_id} ({text_length} chars): {summary}")
+                raise MemoryBudgetExceeded(
+                    f"Job is predicted to exceed the worker memory budget ({summary}); split the script"
+                )
+
+            for name, pool in pools.items():
+                self._reserved[name] += predicted[name]
+                # Peaks are per job; overlapping jobs share them
+                pool.reset_peak()
+            self._in_flight += 1
+            admission = Admission(
+                job_id, text_length, requested, batch_size, predicted,
+                {name: pool.usage_mb() for name, pool in pools.items()},
+                self._work_pool(device), self._audio_mb(text_length, sample_rate),
+                (time.perf_counter() - start) * 1000
+            )
+            if admission.downgraded:
+                self.downgraded += 1
+                print(f"Memory governor: job {job_id} batch size {requested} -> {batch_size}")
+            return admission
+
+    def release(self, admission: Admission, generated_items: int = 0, items_per_call: int = 1,
+                worker_host_mb: float = 0.0) -> dict:
+        """
+        Drop the job's reservation, learn from its peak and free caches; returns watermarks.
+
+        ``items_per_call`` is how many chunks were actually generated at once
+        (1 unless the model batched them), so the learned per-item working set
+        isn't divided by a batch size that never ran. ``worker_host_mb`` adds
+        host memory used outside this process, e.g. by process pool workers.
+        """
+        with self._lock:
+            pools = self.pools()
+            watermarks = {}
+            for name, pool in pools.items():
+                self._reserved[name] = max(0.0, self._reserved[name] - admission.predicted_mb[name])
+                peak = pool.peak_mb()
+                watermarks[name] = {
+                    "start_mb": round(admission.start_mb[name], 1),
+                    "peak_mb": round(peak, 1),
+                    "predicted_mb": round(admission.predicted_mb[name], 1),
+                    "budget_mb": round(pool.budget_mb, 1) if pool.budget_mb is not None else None,
+                }
+            if worker_host_mb:
+                watermarks["host"]["workers_peak_mb"] = round(worker_host_mb, 1)
+
+            # Learn the per-item working set from jobs that actually generated
+            work_pool = admission.work_pool
+            if generated_items:
+                used = watermarks[work_pool]["peak_mb"] - watermarks[work_pool]["start_mb"]
+                if work_pool == "host":
+                    used += worker_host_mb - admission.audio_mb
+                observed = max(0.0, used) / max(1, items_per_call)
+                self._item_mb[work_pool] += LEARNING_RATE * (observed - self._item_mb[work_pool])
+            self._in_flight -= 1
+            self._released.notify_all()
+
+        free_allocator_caches()
+        pressure = any(
+            pool.budget_mb is not None and pool.usage_mb() > pool.budget_mb * PRESSURE_FRACTION
+            for pool in pools.values()
+        )
+        if pressure:
+            print("Memory governor: above pressure threshold, clearing caches")
+            for callback in self._pressure_callbacks:
+                callback()
+            free_allocator_caches()
+        for name, pool in pools.items():
+            watermarks[name]["after_mb"] = round(pool.usage_mb(), 1)
+
+        print(f"Memory watermarks for job {admission.job_id}: {watermarks}")
+        return {
+            "batch_size": admission.batch_size,
+            "requested_batch_size": admission.requested_batch_size,
+            "downgraded": admission.downgraded,
+            "admission_wait_ms": round(admission.wait_ms, 1),
+            "pressure_relief": pressure,
+            "pools": watermarks,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "reserved_mb": {name: round(mb, 1) for name, mb in self._reserved.items()},
+                "item_mb": {name: round(mb, 1) for name, mb in self._item_mb.items()},
+                "refused": self.refused,
+                "downgraded": self.downgraded,
+                "waited": self.waited,
+            }
+
+
+governor = MemoryGovernor()
@@ -0,0 +1,189 @@
+"""
+Process-level registry of loaded ChatterboxTTS models
+
+RunPod keeps a worker process alive between jobs, so the model only needs to be
+loaded once per process. The registry loads lazily on first use (or eagerly at
+worker start via ``preload``), keys instances by device/dtype and reports
+readiness so health checks don't have to trigger a load themselves.
+"""
+
+import os
+import threading
+import time
+
+from chatterbox_compat import baked_checkpoint_dir, import_chatterbox_tts, setup_chatterbox_path
+from cpu_inference import CPU_DTYPES, configure_threads, cpu_config, defer_cpu_optimizations, optimize_for_cpu
+from process_pool import pool_configured
+
+SUPPORTED_DTYPES = ("float32",)
+
+
+def default_device():
+    """Pick the device the worker should run on"""
+    import torch
+
+    forced = os.environ.get("CHATTERBOX_DEVICE")
+    if forced:
+        return forced
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_dtype():
+    """Inference precision for this deployment (``CHATTERBOX_DTYPE``, see cpu_inference.py)"""
+    return os.environ.get("CHATTERBOX_DTYPE", "float32")
+
+
+def model_version() -> str:
+    """Identifier of the loaded weights, used to key caches of generated audio"""
+    forced = os.environ.get("CHATTERBOX_MODEL_VERSION")
+    if forced:
+        return forced
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        name = f"chatterbox-tts=={version('chatterbox-tts')}"
+    except PackageNotFoundError:
+        name = "chatterbox-tts"
+    # Quantized/bf16 weights produce different audio than float32
+    dtype = default_dtype()
+    return name if dtype == "float32" else f"{name}+{dtype}"
+
+
+def _load_model(device: str, dtype: str, phases: dict):
+    """Load ChatterboxTTS weights onto the requested device, timing each phase into ``phases``"""
+    if device.split(":")[0] not in ("cpu", "cuda"):
+        raise ValueError(f"Unsupported device: {device}. Use cpu or cuda[:index]")
+    if dtype not in (CPU_DTYPES if device == "cpu" else SUPPORTED_DTYPES):
+        raise ValueError(f"Unsupported model dtype for {device}: {dtype}")
+
+    start = time.perf_counter()
+    import torch
+    phases["torch_import_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    if not setup_chatterbox_path():
+        raise ImportError("ChatterboxTTS not found in container")
+
+    ChatterboxTTS = import_chatterbox_tts()
+    phases["chatterbox_import_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    print("Successfully imported ChatterboxTTS")
+    print(f"Using device: {device}")
+
+    if device == "cuda":
+        print(f"GPU: {torch.cuda.get_device_name()}")
+        gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
+        print(f"GPU Memory: {gpu_memory:.1f}GB")
+
+    if device == "cpu":
+        config = cpu_config()
+        phases["cpu_threads"] = configure_threads(config)
+
+    start = time.perf_counter()
+    ckpt_dir = baked_checkpoint_dir()
+    if ckpt_dir:
+        print(f"Loading ChatterboxTTS model from {ckpt_dir}...")
+        model = ChatterboxTTS.from_local(ckpt_dir, device)
+        phases["weights_source"] = "baked"
+    else:
+        print("Loading ChatterboxTTS model...")
+        model = ChatterboxTTS.from_pretrained(device=device)
+        phases["weights_source"] = "hub"
+    phases["weights_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    if device == "cpu" and pool_configured():
+        # Applied by each process pool worker once it has the shared weights
+        defer_cpu_optimizations(model, dtype, config)
+        phases["cpu_optimizations"] = {"dtype": dtype, "deferred_to_process_pool": True}
+    elif device == "cpu":
+        start = time.perf_counter()
+        phases["cpu_optimizations"] = optimize_for_cpu(model, dtype, config)
+        phases["cpu_optimize_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    print("Model loaded successfully")
+    return model
+
+
+class ModelRegistry:
+    """Loads each (device, dtype) model once and hands it out to every job"""
+
+    def __init__(self):
+        self._models = {}
+        self._load_ms = {}
+        self._load_phases = {}
+        self._lock = threading.Lock()
+        self._state = "cold"
+        self._error = None
+        self._warm_hits = 0
+        self._loads = 0
+
+    def get(self, device: str = None, dtype: str = None):
+        """
+        Return ``(model, model_load_ms)`` for the requested device/dtype.
+
+        ``model_load_ms`` is 0 when the model was already resident.
+        """
+        key = (device or default_device(), dtype or default_dtype())
+
+        model = self._models.get(key)
+        if model is not None:
+            self._warm_hits += 1
+            return model, 0.0
+
+        with self._lock:
+            # Another job may have finished loading while we waited
+            model = self._models.get(key)
+            if model is not None:
+                self._warm_hits += 1
+                return model, 0.0
+
+            self._state = "loading"
+            start = time.perf_counter()
+            phases = {}
+            try:
+                model = _load_model(*key, phases)
+            except Exception as e:
+                self._state = "error"
+                self._error = str(e)
+                raise
+
+            load_ms = (time.perf_counter() - start) * 1000
+            self._models[key] = model
+            self._load_ms[key] = load_ms
+            self._load_phases[key] = phases
+            self._loads += 1
+            self._state = "ready"
+            self._error = None
+            print(f"Model {key[0]}/{key[1]} ready in {load_ms:.0f}ms")
+            return model, load_ms
+
+    def preload(self, device: str = None, dtype: str = None):
+        """Warm the registry at worker start; failures are reported, not raised"""
+        try:
+            self.get(device, dtype)
+            return True
+        except Exception as e:
+            print(f"❌ Model preload failed: {e}")
+            return False
+
+    def is_ready(self) -> bool:
+        return bool(self._models)
+
+    def health(self) -> dict:
+        """Readiness snapshot suitable for returning from a health-check job"""
+        return {
+            "state": self._state,
+            "ready": self.is_ready(),
+            "error": self._error,
+            "models": [
+                {
+                    "device": device,
+                    "dtype": dtype,
+                    "load_ms": round(self._load_ms[(device, dtype)], 1),
+                    "load_phases": self._load_phases[(device, dtype)],
+                }
+                for device, dtype in self._models
+            ],
+            "loads": self._loads,
+            "warm_hits": self._warm_hits,
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,263 @@
+"""
+Output sinks: where the final audio goes
+
+- ``inline``     - base64 in the job result (previous behavior)
+- ``filesystem`` - written under ``CHATTERBOX_OUTPUT_DIR``; useful as a local
+                   stand-in for a bucket and on network volumes
+- ``s3``         - any S3-compatible store (AWS, MinIO, R2, or GCS through its
+                   S3 interoperability endpoint)
+
+Every sink is written through a ``SinkWriter`` that receives encoded bytes as
+the encoder produces them, so lossy formats start uploading while later
+chunks are still being generated. Writers return the location plus a SHA-256
+checksum and size when closed.
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# S3 multipart parts must be at least 5 MiB (except the last one)
+S3_PART_SIZE = int(os.environ.get("CHATTERBOX_S3_PART_MB", "8")) * 1024 * 1024
+
+
+class SinkWriter:
+    """Accepts encoded bytes incrementally; subclasses store them somewhere"""
+
+    def __init__(self, key: str, mime_type: str):
+        self.key = key
+        self.mime_type = mime_type
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        with self._lock:
+            self._sha256.update(data)
+            self.size += len(data)
+            self._write(data)
+
+    def close(self) -> dict:
+        """Finish the object and return its location fields for the job result"""
+        location = self._close()
+        location.update({
+            "checksum_sha256": self._sha256.hexdigest(),
+            "audio_size_bytes": self.size,
+        })
+        return location
+
+    def abort(self):
+        pass
+
+    def _write(self, data: bytes):
+        raise NotImplementedError
+
+    def _close(self) -> dict:
+        raise NotImplementedError
+
+
+class _InlineWriter(SinkWriter):
+    def __init__(self, key, mime_type):
+        super().__init__(key, mime_type)
+        self._parts = []
+        self._tail = b""
+
+    def _write(self, data):
+        # Base64-encode whole 3-byte groups as they arrive so only the last
+        # few bytes are left for close()
+        data = self._tail + data
+        cut = len(data) - len(data) % 3
+        self._tail = data[cut:]
+        if cut:
+            self._parts.append(base64.b64encode(memoryview(data)[:cut]))
+
+    def _close(self):
+        self._parts.append(base64.b64encode(self._tail))
+        return {"audio_base64": b"".join(self._parts).decode('ascii')}
+
+
+class InlineSink:
+    name = "inline"
+
+    def open(self, key: str, mime_type: str) -> SinkWriter:
+        return _InlineWriter(key, mime_type)
+
+
+class _FilesystemWriter(SinkWriter):
+    def __init__(self, key, mime_type, path, url):
+        super().__init__(key, mime_type)
+        self.path = path
+        self.url = url
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp name so readers never see a partial file
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def _close(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return {"audio_url": self.url, "audio_key": self.key}
+
+    def abort(self):
+        try:
+            self._file.close()
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+
+class FilesystemSink:
+    name = "filesystem"
+
+    def __init__(self, root: str, base_url: str = None):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/") if base_url else None
+
+    def open(self, key: str, mime_type: str) -> SinkWriter:
+        path = os.path.join(self.root, key)
+        url = f"{self.base_url}/{key}" if self.base_url else f"file://{path}"
+        return _FilesystemWriter(key, mime_type, path, url)
+
+
+class _S3Writer(SinkWriter):
+    def __init__(self, key, mime_type, sink):
+        super().__init__(key, mime_type)
+        self._sink = sink
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []
+        self._pending = []
+        # One background uploader keeps parts in order and overlaps with encoding
+        self._uploader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="s3-upload")
+
+    def _write(self, data):
+        self._buffer.extend(data)
+        if len(self._buffer) >= S3_PART_SIZE:
+            self._flush_part()
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            self._upload_id = self._sink.client.create_multipart_upload(
+                Bucket=self._sink.bucket, Key=self.key, ContentType=self.mime_type
+            )["UploadId"]
+        part_number = len(self._pending) + 1
+        body = bytes(self._buffer)
+        self._buffer.clear()
+        self._pending.append(self._uploader.submit(self._upload_part, part_number, body))
+
+    def _upload_part(self, part_number, body):
+        response = self._sink.client.upload_part(
+            Bucket=self._sink.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=body
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _close(self):
+        client, bucket = self._sink.client, self._sink.bucket
+        try:
+            if self._upload_id is None:
+                # Small object: a single PUT is cheaper than a multipart upload
+                client.put_object(Bucket=bucket, Key=self.key, Body=bytes(self._buffer), ContentType=self.mime_type)
+            else:
+                if self._buffer:
+                    self._flush_part()
+                parts = [future.result() for future in self._pending]
+                client.complete_multipart_upload(
+                    Bucket=bucket, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._uploader.shutdown(wait=False)
+        return {
+            "audio_url": self._sink.url_for(self.key),
+            "audio_key": self.key,
+            "audio_bucket": bucket,
+            "upload_parts": max(1, len(self._pending)),
+        }
+
+    def abort(self):
+        if self._upload_id is not None:
+            try:
+                self._sink.client.abort_multipart_upload(
+                    Bucket=self._sink.bucket, Key=self.key, UploadId=self._upload_id
+                )
+            except Exception as e:
+                print(f"Failed to abort multipart upload {self.key}: {e}")
+            self._upload_id = None
+        self._uploader.shutdown(wait=False)
+
+
+class S3Sink:
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str = None, region: str = None,
+                 public_base_url: str = None, url_expiry: int = 3600):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("The s3 output sink requires boto3. Please install with: pip install boto3")
+        self.bucket = bucket
+        self.public_base_url = public_base_url.rstrip("/") if public_base_url else None
+        self.url_expiry = url_expiry
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def open(self, key: str, mime_type: str) -> SinkWriter:
+        return _S3Writer(key, mime_type, self)
+
+    def url_for(self, key: str) -> str:
+        if self.public_base_url:
+            return f"{self.public_base_url}/{key}"
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.url_expiry
+        )
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def _create_sink(name: str):
+    if name == "inline":
+        return InlineSink()
+    if name == "filesystem":
+        return FilesystemSink(
+            os.environ.get("CHATTERBOX_OUTPUT_DIR", "/tmp/chatterbox-output"),
+            os.environ.get("CHATTERBOX_OUTPUT_BASE_URL"),
+        )
+    if name == "s3":
+        bucket = os.environ.get("CHATTERBOX_S3_BUCKET")
+        if not bucket:
+            raise ValueError("The s3 output sink requires CHATTERBOX_S3_BUCKET")
+        return S3Sink(
+            bucket,
+            endpoint_url=os.environ.get("CHATTERBOX_S3_ENDPOINT_URL"),
+            region=os.environ.get("CHATTERBOX_S3_REGION"),
+            public_base_url=os.environ.get("CHATTERBOX_S3_PUBLIC_BASE_URL"),
+            url_expiry=int(os.environ.get("CHATTERBOX_S3_URL_EXPIRY", "3600")),
+        )
+    raise ValueError(f"Unsupported output_sink '{name}'. Choose one of: inline, filesystem, s3")
+
+
+def get_output_sink(name: str = None):
+    """Return the (cached) sink for ``name``, defaulting to ``CHATTERBOX_OUTPUT_SINK``"""
+    name = name or os.environ.get("CHATTERBOX_OUTPUT_SINK", "inline")
+    with _sinks_lock:
+        if name not in _sinks:
+            _sinks[name] = _create_sink(name)
+        return _sinks[name]
+
+
+def object_key(job_id: str, extension: str) -> str:
+    prefix = os.environ.get("CHATTERBOX_OUTPUT_PREFIX", "voice/")
+    return f"{prefix}{job_id}.{extension}"
@@ -0,0 +1,145 @@
+"""
+Producer/consumer stages for chunk post-processing
+
+Generation runs on a background thread and hands finished chunks to the job
+thread through a bounded queue. While chunk i+1 generates, the job thread
+copies chunk i to the host, normalizes it into the assembly buffer, caches or
+checkpoints it and queues it for the encoder thread, which streams encoded
+bytes to the output sink. When the queue between two stages is full, the
+upstream stage waits (backpressure), so a slow encoder or upload can never
+pile up more than ``CHATTERBOX_PIPELINE_DEPTH`` chunks in memory.
+
+Every stage records busy and idle time. A stage that is mostly idle is
+waiting on the stage before it, and a producer that is mostly blocked is
+being held back by the stage after it.
+"""
+
+import os
+import queue
+import threading
+import time
+
+DEFAULT_DEPTH = int(os.environ.get("CHATTERBOX_PIPELINE_DEPTH", "2"))
+
+_DONE = object()
+
+
+class StageTimer:
+    """Busy/idle accounting for one pipeline stage"""
+
+    def __init__(self):
+        self.busy_s = 0.0
+        self.idle_s = 0.0
+        self.items = 0
+
+    def stats(self) -> dict:
+        total = self.busy_s + self.idle_s
+        return {
+            "busy_ms": round(self.busy_s * 1000, 1),
+            "idle_ms": round(self.idle_s * 1000, 1),
+            "utilization": round(self.busy_s / total, 3) if total else None,
+            "items": self.items,
+        }
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class BackgroundIterator:
+    """
+    Drive ``source`` on a background thread, at most ``depth`` items ahead of
+    the consumer.
+
+    ``producer`` times the thread (busy = inside ``source``, idle = blocked
+    on a full queue); ``consumer`` times the caller (idle = waiting for an
+    item, busy = the time between receiving one and asking for the next).
+    Exceptions from ``source`` are re-raised in the consumer.
+    """
+
+    def __init__(self, source, depth: int = None, name: str = "pipeline"):
+        self.producer = StageTimer()
+        self.consumer = StageTimer()
+        self._queue = queue.Queue(maxsize=max(1, depth or DEFAULT_DEPTH))
+        self._stop = threading.Event()
+        self._returned_at = None
+        self._held = None
+        self._thread = threading.Thread(target=self._run, args=(iter(source),), name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                self.producer.idle_s += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, source):
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(source)
+                except StopIteration:
+                    break
+                self.producer.busy_s += time.perf_counter() - start
+                self.producer.items += 1
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._put(_Failure(e))
+            return
+        self._put(_DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        now = time.perf_counter()
+        if self._returned_at is not None:
+            self.consumer.busy_s += now - self._returned_at
+        if self._held is not None:
+            item, self._held = self._held, None
+        else:
+            item = self._queue.get()
+        self.consumer.idle_s += time.perf_counter() - now
+        if item is _DONE:
+            self._returned_at = None
+            raise StopIteration
+        if isinstance(item, _Failure):
+            self._returned_at = None
+            raise item.error
+        self.consumer.items += 1
+        self._returned_at = time.perf_counter()
+        return item
+
+    def next_ready(self):
+        """The next item if one is already queued, else None (never blocks, never ends the iteration)"""
+        if self._held is not None:
+            return None
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            return None
+        if item is _DONE or isinstance(item, _Failure):
+            # Leave end-of-stream/errors for ``__next__`` to report
+            self._held = item
+            return None
+        self.consumer.items += 1
+        return item
+
+    def close(self):
+        """Stop the producer (e.g. after a consumer-side failure) and wait for it"""
+        self._stop.set()
+        # Unblock a producer waiting on a full queue
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self._thread.join()
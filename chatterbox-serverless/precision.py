@@ -0,0 +1,159 @@
+"""
+Generation precision and inference mode
+
+Every model call runs under ``torch.inference_mode()`` (no autograd
+bookkeeping) and, per job, optionally under autocast:
+
+- ``fp32`` - full precision (default, ``CHATTERBOX_PRECISION``)
+- ``fp16`` - float16 autocast, meant for CUDA
+- ``bf16`` - bfloat16 autocast, on CUDA or CPU
+
+Weights stay float32; only activations change, and only in T3 token
+generation. The S3Gen/HiFT vocoder builds complex spectra, which fp16/bf16
+autocast can't produce, so it always runs in float32. Jobs report their
+real-time factor and peak memory so the cheapest mode that still sounds right
+can be picked per deployment.
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+from memory_governor import peak_memory
+
+AUTOCAST_DTYPES = {"fp32": None, "fp16": "float16", "bf16": "bfloat16"}
+DEFAULT_PRECISION = os.environ.get("CHATTERBOX_PRECISION", "fp32")
+
+
+def validate_precision(precision: str):
+    if precision not in AUTOCAST_DTYPES:
+        raise ValueError(f"Unsupported precision: {precision}. Use one of: {', '.join(AUTOCAST_DTYPES)}")
+
+
+def device_type(model) -> str:
+    """``cuda``/``cpu`` for the model's device, as autocast expects it"""
+    return str(getattr(model, "device", "cpu")).split(":")[0]
+
+
+# (device, dtype) T3 autocasts to in the current generation context, if any
+_t3_autocast = contextvars.ContextVar("t3_autocast", default=None)
+_scope_lock = threading.Lock()
+
+
+def _to_float(value):
+    """Cast floating-point tensors in ``value`` (and nested dicts/lists) to float32"""
+    import torch
+
+    if isinstance(value, torch.Tensor):
+        return value.float() if value.is_floating_point() else value
+    if isinstance(value, dict):
+        return {key: _to_float(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_float(item) for item in value)
+    return value
+
+
+def _t3_stage(fn):
+    import torch
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        autocast = _t3_autocast.get()
+        if autocast is None:
+            return fn(*args, **kwargs)
+        device, dtype = autocast
+        with torch.autocast(device, dtype=dtype):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def _vocoder_stage(fn, device):
+    import torch
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with torch.autocast(device, enabled=False):
+            return fn(*_to_float(args), **_to_float(kwargs))
+    return wrapper
+
+
+def scope_autocast(model) -> bool:
+    """
+    Wrap the model's T3 and S3Gen entry points (once) so autocast applies to
+    T3 only. False when the model doesn't expose them.
+    """
+    t3, s3gen = getattr(model, "t3", None), getattr(model, "s3gen", None)
+    if not (callable(getattr(t3, "inference", None)) and callable(getattr(s3gen, "inference", None))):
+        return False
+    with _scope_lock:
+        if not getattr(model, "_autocast_scoped", False):
+            device = device_type(model)
+            t3.inference = _t3_stage(t3.inference)
+            for name in ("inference", "inference_batch"):
+                if callable(getattr(s3gen, name, None)):
+                    setattr(s3gen, name, _vocoder_stage(getattr(s3gen, name), device))
+            model._autocast_scoped = True
+    return True
+
+
+@contextlib.contextmanager
+def generation_context(precision: str = None, device: str = "cpu", model=None):
+    """
+    Inference mode plus autocast for ``precision`` (``None`` means fp32).
+
+    Given the ``model``, autocast covers its T3 calls only and S3Gen runs in
+    float32 (see ``scope_autocast``); models without those stages run
+    entirely under autocast.
+    """
+    import torch
+
+    autocast_dtype = AUTOCAST_DTYPES[precision or "fp32"]
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(torch.inference_mode())
+        if autocast_dtype:
+            dtype = getattr(torch, autocast_dtype)
+            if model is not None and scope_autocast(model):
+                token = _t3_autocast.set((device, dtype))
+                stack.callback(_t3_autocast.reset, token)
+            else:
+                stack.enter_context(torch.autocast(device, dtype=dtype))
+        yield
+
+
+class GenerationMeter:
+    """Per-job RTF (model wall time / generated audio) and peak memory"""
+
+    def __init__(self, precision: str, device: str, sample_rate: int):
+        self.precision = precision
+        self.device = device
+        self.sample_rate = sample_rate
+        self.generation_s = 0.0
+        self.generated_samples = 0
+
+    @contextlib.contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        yield
+        self.generation_s += time.perf_counter() - start
+
+    def add_audio(self, samples: int):
+        self.generated_samples += samples
+
+    def stats(self) -> dict:
+        # Peaks are reset when the memory governor admits the job
+        peak_mb, peak_scope = peak_memory(self.device)
+        audio_s = self.generated_samples / self.sample_rate
+        return {
+            "mode": self.precision,
+            "autocast": AUTOCAST_DTYPES[self.precision],
+            "inference_mode": True,
+            "device": self.device,
+            "generation_seconds": round(self.generation_s, 3),
+            "generated_audio_seconds": round(audio_s, 3),
+            "rtf": round(self.generation_s / audio_s, 4) if audio_s else None,
+            "peak_memory_mb": round(peak_mb, 1),
+            "peak_memory_scope": peak_scope,
+        }
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Pre-fetch ChatterboxTTS weights at image build time
+
+Downloads the checkpoint files ``ChatterboxTTS.from_local`` needs into
+``CHATTERBOX_CKPT_DIR`` so the worker loads them from the image without
+touching the network. Run from the Dockerfile; ``--verify`` re-opens every
+safetensors file to make sure the baked copy is complete.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from chatterbox_compat import CHECKPOINT_FILES
+
+REPO_ID = "ResembleAI/chatterbox"
+
+
+def prefetch(ckpt_dir: str, repo_id: str = REPO_ID, revision: str = None):
+    from huggingface_hub import hf_hub_download
+
+    os.makedirs(ckpt_dir, exist_ok=True)
+    for name in CHECKPOINT_FILES:
+        start = time.perf_counter()
+        path = hf_hub_download(repo_id=repo_id, filename=name, revision=revision, local_dir=ckpt_dir)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"✅ {name}: {size_mb:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+
+def verify(ckpt_dir: str):
+    from safetensors import safe_open
+
+    for name in CHECKPOINT_FILES:
+        path = os.path.join(ckpt_dir, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if name.endswith(".safetensors"):
+            with safe_open(path, framework="pt") as f:
+                print(f"✅ {name}: {len(list(f.keys()))} tensors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ckpt-dir", default=os.environ.get("CHATTERBOX_CKPT_DIR", "/app/weights"))
+    parser.add_argument("--repo-id", default=REPO_ID)
+    parser.add_argument("--revision", default=os.environ.get("CHATTERBOX_WEIGHTS_REVISION"))
+    parser.add_argument("--verify", action="store_true", help="only check an existing checkpoint directory")
+    args = parser.parse_args()
+
+    try:
+        if not args.verify:
+            prefetch(args.ckpt_dir, args.repo_id, args.revision)
+        verify(args.ckpt_dir)
+    except Exception as e:
+        print(f"❌ Weight prefetch failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Multi-process CPU generation pool
+
+On CPU-only nodes one process generates one chunk at a time, and torch's
+intra-op threading stops scaling well before all the cores are busy.
+``CHATTERBOX_PROCESS_POOL=N`` starts N spawned worker processes. The chunks of
+a job are sharded across them and come back in order for assembly.
+
+The weights are not loaded N times. The parent moves the loaded model's
+tensors into shared memory (``share_memory()``), and the workers receive it
+through torch.multiprocessing. That passes each storage as a file descriptor
+to the same shared pages instead of copying it. ``memory_report`` reads
+RSS/PSS for the parent and every worker from ``/proc/<pid>/smaps_rollup``. Shared
+weights are counted once in the PSS total, where a private copy per worker
+would show up as a multiple of the weight size.
+
+Shared memory and pickling only work for plain float32 modules. Int8
+quantization, bf16 autocast and ``torch.compile`` (cpu_inference.py) are
+therefore deferred when the registry loads a model for the pool, and each
+worker applies them after unpickling. Quantized layers are then private to
+each worker; everything else stays shared.
+
+Speaker conditionals are sent with each chunk (they are small), so workers
+stay stateless and any worker can take any chunk of any voice.
+"""
+
+import atexit
+import collections
+import multiprocessing
+import os
+import threading
+
+from batched_generation import seed_generation
+from conditioning_cache import use_speaker_conditioning
+from cpu_inference import apply_deferred_cpu_optimizations
+from precision import device_type, generation_context
+
+DEFAULT_PROCESSES = int(os.environ.get("CHATTERBOX_PROCESS_POOL", "0"))
+START_TIMEOUT_S = float(os.environ.get("CHATTERBOX_PROCESS_POOL_START_TIMEOUT", "300"))
+
+# Set in each worker process by ``_init_worker``
+_worker_model = None
+_worker_optimizations = None
+
+
+def pool_configured() -> bool:
+    """True when jobs will run on the pool: it is enabled and the handler is synchronous"""
+    return DEFAULT_PROCESSES > 0 and int(os.environ.get("CHATTERBOX_CONCURRENCY", "1")) == 1
+
+
+def _init_worker(model, threads: int):
+    import torch
+
+    global _worker_model, _worker_optimizations
+    torch.set_num_threads(threads)
+    _worker_optimizations = apply_deferred_cpu_optimizations(model)
+    _worker_model = model
+
+
+def _generate_in_worker(text, gen_kwargs, conds, seed, precision):
+    model = _worker_model
+    use_speaker_conditioning(model, conds)
+    seed_generation(seed)
+    with generation_context(precision, device_type(model), model):
+        wav = model.generate(text, **gen_kwargs)
+    return os.getpid(), wav
+
+
+def _ping():
+    return os.getpid(), _worker_optimizations
+
+
+def share_model_memory(model) -> int:
+    """Move every module's tensors into shared memory; returns the shared bytes"""
+    import torch
+
+    shared = 0
+    for value in vars(model).values():
+        if isinstance(value, torch.nn.Module):
+            value.share_memory()
+            # Only real tensors; a quantized module's state_dict also holds dtypes and packing metadata
+            shared += sum(t.numel() * t.element_size() for t in value.parameters())
+            shared += sum(t.numel() * t.element_size() for t in value.buffers())
+    return shared
+
+
+def _smaps_rollup_mb(pid) -> dict:
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0), 1),
+        "pss_mb": round(fields.get("Pss", 0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0), 1),
+    }
+
+
+def _status_mb(pid, field: str):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class ProcessPool:
+    """N spawned processes sharing one copy of the model weights"""
+
+    def __init__(self, model, processes: int, threads_per_process: int = None):
+        import torch.multiprocessing as torch_mp
+
+        total_threads = int(os.environ.get("CHATTERBOX_CPU_THREADS") or os.cpu_count() or 1)
+        self.processes = max(1, int(processes))
+        self.threads_per_process = threads_per_process or max(1, total_threads // self.processes)
+        self.shared_weight_bytes = share_model_memory(model)
+
+        ctx = torch_mp.get_context("spawn")
+        self._pool = ctx.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(model, self.threads_per_process),
+        )
+        self._chunks_by_pid = collections.Counter()
+        self._lock = threading.Lock()
+        # A worker that can't unpickle the model dies and is respawned forever,
+        # so make sure every worker actually came up before taking jobs
+        try:
+            pings = [self._pool.apply_async(_ping) for _ in range(self.processes)]
+            results = [ping.get(timeout=START_TIMEOUT_S) for ping in pings]
+        except Exception:
+            self.close()
+            raise
+        # Every worker applies the same deferred optimizations
+        self.worker_optimizations = results[0][1]
+        print(f"Process pool: {self.processes} workers x {self.threads_per_process} threads, "
+              f"{self.shared_weight_bytes / 1e6:.0f} MB of shared weights")
+
+    def iter_generate_chunks(self, chunks: list, gen_kwargs: dict, conds, seeds: list = None,
+                             precision: str = None, max_in_flight: int = None):
+        """
+        Yield ``(index, wav)`` in chunk order with up to ``max_in_flight`` chunks
+        (default: one per process) generating at once.
+        """
+        seeds = seeds or [None] * len(chunks)
+        max_in_flight = max(1, min(self.processes, max_in_flight or self.processes))
+        pending = collections.deque()
+        next_submit = 0
+        for index in range(len(chunks)):
+            while next_submit < len(chunks) and len(pending) < max_in_flight:
+                pending.append(self._pool.apply_async(
+                    _generate_in_worker,
+                    (chunks[next_submit], gen_kwargs, conds, seeds[next_submit], precision)
+                ))
+                next_submit += 1
+            try:
+                pid, wav = pending.popleft().get()
+            except Exception as chunk_error:
+                print(f"Chunk {index+1} failed: {chunk_error}")
+                raise
+            with self._lock:
+                self._chunks_by_pid[pid] += 1
+            print(f"Chunk {index+1}/{len(chunks)} completed in worker {pid}")
+            yield index, wav
+
+    def worker_pids(self) -> list:
+        return sorted(p.pid for p in multiprocessing.active_children() if p.name.startswith("SpawnPoolWorker"))
+
+    def memory_report(self) -> dict:
+        """RSS/PSS of the parent and each worker; PSS splits shared pages between them"""
+        workers = {pid: _smaps_rollup_mb(pid) for pid in self.worker_pids()}
+        parent = _smaps_rollup_mb(os.getpid())
+        return {
+            "shared_weights_mb": round(self.shared_weight_bytes / (1024 * 1024), 1),
+            "parent": parent,
+            "workers": workers,
+            "total_pss_mb": round(parent.get("pss_mb", 0) + sum(w.get("pss_mb", 0) for w in workers.values()), 1),
+        }
+
+    def reset_worker_peaks(self) -> dict:
+        """Reset every worker's RSS high-water mark; returns ``{pid: rss_mb}`` to measure from"""
+        start = {}
+        for pid in self.worker_pids():
+            try:
+                with open(f"/proc/{pid}/clear_refs", "w") as f:
+                    f.write("5")
+            except OSError:
+                # The peak then covers the worker's lifetime, which only overestimates
+                pass
+            rss = _status_mb(pid, "VmRSS")
+            if rss is not None:
+                start[pid] = rss
+        return start
+
+    def worker_peak_growth_mb(self, start: dict) -> float:
+        """How far the workers' RSS peaks rose above ``reset_worker_peaks``, summed"""
+        growth = 0.0
+        for pid, rss in start.items():
+            peak = _status_mb(pid, "VmHWM")
+            if peak is not None:
+                growth += max(0.0, peak - rss)
+        return growth
+
+    def stats(self) -> dict:
+        with self._lock:
+            chunks_by_pid = dict(self._chunks_by_pid)
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "chunks_by_worker": chunks_by_pid,
+            "cpu_optimizations": self.worker_optimizations,
+            "memory": self.memory_report(),
+        }
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+
+_pool = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(model, processes: int = None):
+    """
+    The worker's shared process pool, started on first use for a CPU model.
+
+    Returns None when the pool is disabled, the model isn't on CPU, or the
+    pool can't start (e.g. the model doesn't pickle); jobs then run in-process.
+    """
+    global _pool, _pool_failed
+    processes = DEFAULT_PROCESSES if processes is None else processes
+    if processes < 1 or device_type(model) != "cpu":
+        return None
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                _pool = ProcessPool(model, processes)
+            except Exception as e:
+                # Don't retry on every job
+                _pool_failed = True
+                print(f"❌ Process pool unavailable, generating in-process: {e}")
+                # The parent generates after all, so it needs the optimizations itself
+                applied = apply_deferred_cpu_optimizations(model)
+                if applied is not None:
+                    print(f"Applied deferred CPU optimizations in-process: {applied}")
+                return None
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,117 @@
+"""
+In-memory reference voice loading
+
+``prepare_conditionals`` takes a file path and loads it with librosa, so the
+handler used to write every decoded voice to a temp file first. Here the
+voice bytes are decoded once with soundfile straight from memory, resampled
+once to the rates the model needs (24 kHz for S3Gen, 16 kHz for the speech
+tokenizer and voice encoder) and turned into conditionals with the same steps
+``prepare_conditionals`` runs. Formats soundfile can't read, or model builds
+whose internals differ, fall back to the temp-file path.
+"""
+
+import importlib
+import io
+import os
+import tempfile
+import time
+
+S3GEN_SR = 24000
+S3_SR = 16000
+
+
+def decode_reference_audio(voice_data: bytes, timings: dict):
+    """Decode voice bytes to mono float32 at the S3Gen rate, timing each step"""
+    import librosa
+    import soundfile as sf
+
+    start = time.perf_counter()
+    wav, sample_rate = sf.read(io.BytesIO(voice_data), dtype="float32", always_2d=True)
+    # Same downmix librosa.load does
+    wav = wav.mean(axis=1)
+    timings["decode_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    timings["source_sample_rate"] = sample_rate
+
+    start = time.perf_counter()
+    if sample_rate != S3GEN_SR:
+        wav = librosa.resample(wav, orig_sr=sample_rate, target_sr=S3GEN_SR)
+    timings["resample_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return wav
+
+
+def conditionals_from_audio(model, wav, exaggeration: float, timings: dict):
+    """Mirror ``ChatterboxTTS.prepare_conditionals`` for an already-decoded 24 kHz waveform"""
+    import librosa
+    import torch
+
+    # Conditionals/T3Cond come from whichever package the model class lives in
+    tts_module = importlib.import_module(type(model).__module__)
+    Conditionals = tts_module.Conditionals
+    T3Cond = tts_module.T3Cond
+
+    start = time.perf_counter()
+    ref_16k_wav = librosa.resample(wav, orig_sr=S3GEN_SR, target_sr=S3_SR)
+    timings["resample_ms"] = round(timings.get("resample_ms", 0) + (time.perf_counter() - start) * 1000, 2)
+
+    start = time.perf_counter()
+    s3gen_ref_wav = wav[:model.DEC_COND_LEN]
+    s3gen_ref_dict = model.s3gen.embed_ref(s3gen_ref_wav, S3GEN_SR, device=model.device)
+
+    t3_cond_prompt_tokens = None
+    plen = model.t3.hp.speech_cond_prompt_len
+    if plen:
+        t3_cond_prompt_tokens, _ = model.s3gen.tokenizer.forward([ref_16k_wav[:model.ENC_COND_LEN]], max_len=plen)
+        t3_cond_prompt_tokens = torch.atleast_2d(t3_cond_prompt_tokens).to(model.device)
+
+    ve_embed = torch.from_numpy(model.ve.embeds_from_wavs([ref_16k_wav], sample_rate=S3_SR))
+    ve_embed = ve_embed.mean(axis=0, keepdim=True).to(model.device)
+
+    t3_cond = T3Cond(
+        speaker_emb=ve_embed,
+        cond_prompt_speech_tokens=t3_cond_prompt_tokens,
+        emotion_adv=exaggeration * torch.ones(1, 1, 1),
+    ).to(device=model.device)
+    timings["embed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return Conditionals(t3_cond, s3gen_ref_dict)
+
+
+def _conditionals_from_file(model, voice_data: bytes, exaggeration: float):
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_voice:
+        temp_voice.write(voice_data)
+        voice_path = temp_voice.name
+    try:
+        model.prepare_conditionals(voice_path, exaggeration=exaggeration)
+        return model.conds
+    finally:
+        try:
+            os.unlink(voice_path)
+        except OSError:
+            pass
+
+
+def conditionals_from_voice(model, voice_data: bytes, exaggeration: float, timings: dict):
+    """
+    Build speaker conditionals from voice bytes, in memory when possible.
+
+    ``timings`` is filled with ``path`` (``memory`` or ``temp_file``) plus
+    decode/resample/embed times for the in-memory path.
+    """
+    try:
+        wav = decode_reference_audio(voice_data, timings)
+    except Exception as e:
+        print(f"In-memory voice decode failed ({e}), falling back to temp file")
+    else:
+        try:
+            conds = conditionals_from_audio(model, wav, exaggeration, timings)
+            timings["path"] = "memory"
+            return conds
+        except (AttributeError, ImportError) as e:
+            # Model internals don't match what we mirror; let the model load it
+            print(f"In-memory conditioning unavailable ({e}), falling back to temp file")
+
+    start = time.perf_counter()
+    conds = _conditionals_from_file(model, voice_data, exaggeration)
+    timings.clear()
+    timings["path"] = "temp_file"
+    timings["prepare_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return conds
@@ -1,101 +1,61 @@
-import runpod
-import torch
-import torchaudio as ta
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import asyncio
 import base64
-import io
+import binascii
 import sys
 import os
 import traceback
 import re
 from pathlib import Path
-import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-# Setup ChatterboxTTS
-def setup_chatterbox_path():
-    """Setup and verify ChatterboxTTS is available"""
-    try:
-        # Try to import the installed package
-        import chatterbox_tts
-        return True
-    except ImportError:
-        try:
-            # Fallback: try alternative import
-            import chatterbox
-            return True
-        except ImportError:
-            print("❌ ChatterboxTTS not found. Please install with: pip install chatterbox-tts")
-            return False
-
-def clean_script_for_tts(text: str) -> str:
-    """Clean script text for TTS generation"""
-    # Remove stage directions and metrics
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'\(.*?\)', '', text)
-    
-    # Remove metrics/stats sections
-    lines = text.split('\n')
-    cleaned_lines = []
-    skip_section = False
-    
-    for line in lines:
-        line = line.strip()
-        
-        # Skip empty lines
-        if not line:
-            continue
-            
-        # Skip metrics sections
-        if any(keyword in line.lower() for keyword in ['views:', 'engagement:', 'metrics:', 'statistics:', 'performance:']):
-            skip_section = True
-            continue
-        
-        # Reset skip section on new paragraph
-        if skip_section and line and not line.startswith('-') and not line.startswith('•'):
-            skip_section = False
-        
-        if not skip_section:
-            cleaned_lines.append(line)
-    
-    # Join and clean up extra whitespace
-    cleaned_text = ' '.join(cleaned_lines)
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-    
-    return cleaned_text.strip()
+from audio_assembly import AudioAssembler, estimate_samples
+from audio_encoding import OUTPUT_FORMATS, IncrementalEncoder, encode_audio, validate_output_format
+from batch_jobs import expand_items, item_concurrency, item_job_id, iter_item_results
+from batched_generation import DEFAULT_MAX_BATCH_SIZE, iter_generate_chunks, supports_batching
+from checkpoints import open_checkpoint, plan_fingerprint
+from chunk_planner import DEFAULT_MAX_TOKENS_PER_CHUNK, plan_chunks, token_counter
+from conditioning_cache import (
+    conditioning_cache,
+    prepare_speaker_conditioning,
+    use_speaker_conditioning,
+    voice_content_hash,
+)
+from memory_governor import governor
+from model_registry import model_version, registry
+from output_sinks import get_output_sink, object_key
+from pipeline import DEFAULT_DEPTH as PIPELINE_DEPTH, BackgroundIterator
+from precision import DEFAULT_PRECISION, GenerationMeter, device_type, generation_context, validate_precision
+from process_pool import DEFAULT_PROCESSES, get_process_pool
+from scheduler import ChunkScheduler
+from staged_generation import DEFAULT_VOCODER_BATCH_SIZE, iter_generate_chunks as iter_staged_chunks, supports_staged
+from text_cleaning import iter_clean_lines
+from timing_track import DEFAULT_TIMING, TimingTrack, validate_timing
+from synthesis_cache import chunk_cache_key, chunk_seed, get_synthesis_cache
+from voice_preprocessing import get_processed_voice
+from voice_store import fetch_voice_data, voice_cache
+
+# Wall time spent importing the handler and its helper modules
+_IMPORT_MS = (time.perf_counter() - _IMPORT_START) * 1000
+
+# Jobs handled concurrently per worker (>1 switches to the async handler)
+MAX_CONCURRENCY = int(os.environ.get("CHATTERBOX_CONCURRENCY", "1"))
+
+# Shared model thread that batches chunks across concurrent jobs
+scheduler = ChunkScheduler(
+    lambda: registry.get()[0],
+    window_ms=float(os.environ.get("CHATTERBOX_BATCH_WINDOW_MS", "20")),
+    max_batch_size=int(os.environ.get("CHATTERBOX_SCHEDULER_BATCH_SIZE", "8"))
+)
+_job_executor = ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY), thread_name_prefix="job")
+
+# Cached speaker conditionals are the first thing to go when memory runs short
+governor.on_pressure(conditioning_cache.clear)
 
-def split_text_into_chunks(text: str, max_length: int = 150) -> list:
-    """Split text into manageable chunks for processing"""
-    if len(text) <= max_length:
-        return [text]
-    
-    # Split by sentences first
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    
-    for sentence in sentences:
-        if len(sentence) <= max_length:
-            # Try to combine with previous chunk
-            if chunks and len(chunks[-1] + " " + sentence) <= max_length:
-                chunks[-1] += " " + sentence
-            else:
-                chunks.append(sentence)
-        else:
-            # Split long sentences by words
-            words = sentence.split()
-            current_chunk = ""
-            
-            for word in words:
-                test_chunk = current_chunk + (" " if current_chunk else "") + word
-                if len(test_chunk) <= max_length:
-                    current_chunk = test_chunk
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = word
-            
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-    
-    return [chunk for chunk in chunks if chunk.strip()]
 
 def fix_base64_padding(base64_string):
     """Fix base64 padding issues"""
@@ -116,21 +76,53 @@ def fix_base64_padding(base64_string):
     
     return base64_string
 
-def decode_voice_file(voice_file_b64):
-    """Robust base64 decoding with validation"""
-    if not voice_file_b64:
+def _decode_base64_strict(voice_file_b64: str) -> bytes:
+    """Single strict pass for well-formed payloads; raises on anything unusual"""
+    voice_file_b64 = voice_file_b64.strip()
+    if voice_file_b64.startswith('data:'):
+        voice_file_b64 = voice_file_b64[voice_file_b64.index(',') + 1:]
+    return binascii.a2b_base64(voice_file_b64, strict_mode=True)
+
+def _decode_base64_lenient(voice_file_b64: str) -> bytes:
+    """Clean up stray characters and padding before decoding"""
+    # Line-wrapped (MIME-style) payloads only need their whitespace dropped
+    try:
+        return _decode_base64_strict("".join(voice_file_b64.split()))
+    except (binascii.Error, ValueError):
+        pass
+    
+    fixed_b64 = fix_base64_padding(voice_file_b64)
+    
+    # Validate base64 format
+    if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', fixed_b64):
+        raise ValueError("Invalid base64 format")
+    
+    return base64.b64decode(fixed_b64)
+
+def decode_voice_file(voice_file):
+    """
+    Robust voice payload decoding with validation
+    
+    Accepts base64 text or, where the transport can carry binary (in-process
+    calls, the voice store), raw audio bytes. Well-formed base64 is decoded in
+    one strict ``binascii`` pass without intermediate copies; only payloads
+    that fail it (whitespace, missing padding, stray characters) take the
+    lenient cleanup path.
+    """
+    if not voice_file:
         raise ValueError("Voice file base64 string is empty")
     
     try:
-        # Fix padding first
-        fixed_b64 = fix_base64_padding(voice_file_b64)
-        
-        # Validate base64 format
-        if not re.match(r'^[A-Za-z0-9+/]*={0,2}$', fixed_b64):
-            raise ValueError("Invalid base64 format")
-        
-        # Decode
-        voice_data = base64.b64decode(fixed_b64)
+        if isinstance(voice_file, (bytes, bytearray, memoryview)):
+            voice_data = bytes(voice_file)
+            decode_path = "raw"
+        else:
+            try:
+                voice_data = _decode_base64_strict(voice_file)
+                decode_path = "strict"
+            except (binascii.Error, ValueError):
+                voice_data = _decode_base64_lenient(voice_file)
+                decode_path = "lenient"
         
         # Validate minimum file size (should be at least a few hundred bytes for audio)
         if len(voice_data) < 100:
@@ -141,226 +133,696 @@ def decode_voice_file(voice_file_b64):
                 voice_data.startswith(b'\xff\xfb') or voice_data.startswith(b'\xff\xf3')):
             print("Warning: Voice file doesn't have recognized audio header")
         
+        print(f"Voice payload decoded via {decode_path} path")
         return voice_data
         
     except Exception as e:
         raise ValueError(f"Failed to decode voice file: {str(e)}")
 
-def handler(event):
+def load_voice_by_id(voice_id: str, voice_hash: str = None):
+    """Resolve ``voice_id`` through the disk cache, fetching from the voice store on a miss"""
+    voice_data, cached_hash = voice_cache.lookup(voice_id, voice_hash)
+    if voice_data is not None:
+        print(f"Voice {voice_id} served from disk cache ({cached_hash[:12]})")
+        return voice_data, cached_hash, "disk_cache"
+    
+    print(f"Voice {voice_id} not cached, fetching from voice store")
+    voice_data = decode_voice_file(fetch_voice_data(voice_id))
+    stored_hash = voice_cache.put(voice_data, voice_id)
+    if voice_hash and voice_hash.lower() != stored_hash:
+        print(f"Warning: voice {voice_id} hash {stored_hash[:12]} differs from requested {voice_hash[:12]}")
+    return voice_data, stored_hash, "voice_store"
+
+SAMPLE_RATE = 24000
+PAUSE_SECONDS = 0.2
+
+def synthesize(input_data, stream_chunks: bool = False, scheduler: ChunkScheduler = None, job_id: str = None,
+               wait_for_memory: bool = False):
     """
-    RunPod serverless handler for voice generation
+    Core voice generation shared by the plain and streaming handlers
     
-    Expected input:
-    {
-        "text": "Text to convert to speech",
-        "voice_file": "base64 encoded voice file",
-        "settings": {
-            "exaggeration": 0.5,
-            "cfg_weight": 0.5,
-            "temperature": 0.8,
-            "min_p": 0.05,
-            "top_p": 1.0,
-            "repetition_penalty": 1.2
-        }
-    }
+    Yields ``("chunk", event)`` for every chunk as soon as it is ready (only when
+    ``stream_chunks`` is set), followed by exactly one ``("result", output)``.
+    Input errors are reported as the result; unexpected errors are raised.
+    
+    With a ``scheduler`` every model call goes through its shared thread so
+    concurrent jobs can be batched together; without one the model is used
+    directly from the calling thread. ``job_id`` names the uploaded object
+    when the output sink stores audio by reference. With ``wait_for_memory``
+    the job waits for running jobs to free memory rather than being refused.
     """
+    import torch
+
+    print("=== Chatterbox TTS RunPod Handler ===")
+    print(f"PyTorch version: {torch.__version__}")
+    
+    text = input_data.get("text", "")
+    voice_file_b64 = input_data.get("voice_file", "")
+    voice_id = input_data.get("voice_id")
+    settings = input_data.get("settings", {})
+    
+    if not text or not (voice_file_b64 or voice_id):
+        yield "result", {
+            "error": "'text' and either 'voice_file' or 'voice_id' are required"
+        }
+        return
+    
+    print(f"Processing text: {len(text)} characters")
+    if voice_file_b64:
+        unit = "characters" if isinstance(voice_file_b64, str) else "raw bytes"
+        print(f"Voice file base64 length: {len(voice_file_b64)} {unit}")
+    else:
+        print(f"Voice id: {voice_id}")
     
+    # Get the resident model (loads on the first job if preload was skipped)
     try:
-        print("=== Chatterbox TTS RunPod Handler ===")
-        print(f"PyTorch version: {torch.__version__}")
-        
-        # Extract input data
-        input_data = event.get("input", {})
-        text = input_data.get("text", "")
-        voice_file_b64 = input_data.get("voice_file", "")
-        settings = input_data.get("settings", {})
-        
-        if not text or not voice_file_b64:
-            return {
-                "error": "Both 'text' and 'voice_file' are required"
-            }
-        
-        print(f"Processing text: {len(text)} characters")
-        print(f"Voice file base64 length: {len(voice_file_b64)} characters")
-        
-        # Setup ChatterboxTTS
-        if not setup_chatterbox_path():
-            return {
-                "error": "ChatterboxTTS not found in container"
-            }
-        
+        model, model_load_ms = registry.get()
+    except (ValueError, ImportError) as e:
+        yield "result", {
+            "error": str(e)
+        }
+        return
+    
+    # Clean text
+    # Cleaned lines go straight to the chunk planner, never joined into one string
+    clean_lines = list(iter_clean_lines(text))
+    clean_length = sum(len(line) for line in clean_lines) + max(0, len(clean_lines) - 1)
+    print(f"Cleaned text: {clean_length} characters")
+    if not clean_lines:
+        yield "result", {
+            "error": "No speakable text left after removing stage directions and metrics"
+        }
+        return
+    
+    # Resolve the voice by id through the disk cache
+    if not voice_file_b64:
         try:
-            from chatterbox_tts import ChatterboxTTS
-        except ImportError:
-            from chatterbox.tts import ChatterboxTTS
-        print("Successfully imported ChatterboxTTS")
-        
-        # Setup device
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Using device: {device}")
-        
-        if device == "cuda":
-            print(f"GPU: {torch.cuda.get_device_name()}")
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-            print(f"GPU Memory: {gpu_memory:.1f}GB")
-        
-        # Load model
-        print("Loading ChatterboxTTS model...")
-        model = ChatterboxTTS.from_pretrained(device=device)
-        print("Model loaded successfully")
-        
-        # Clean text
-        clean_text = clean_script_for_tts(text)
-        print(f"Cleaned text: {len(clean_text)} characters")
-        
-        # Decode voice file with robust error handling
+            voice_data, voice_hash, voice_source = load_voice_by_id(voice_id, input_data.get("voice_hash"))
+        except Exception as e:
+            print(f"Voice lookup error: {str(e)}")
+            yield "result", {
+                "error": f"Failed to load voice '{voice_id}': {str(e)}"
+            }
+            return
+    
+    # Decode voice file with robust error handling
+    else:
         try:
             voice_data = decode_voice_file(voice_file_b64)
             print(f"Voice file decoded: {len(voice_data)} bytes")
+            voice_hash = voice_content_hash(voice_data)
+            voice_source = "inline"
         except ValueError as e:
             print(f"Voice file decode error: {str(e)}")
-            return {
+            yield "result", {
                 "error": str(e),
                 "debug_info": {
                     "base64_length": len(voice_file_b64),
-                    "base64_preview": voice_file_b64[:50] + "..." if len(voice_file_b64) > 50 else voice_file_b64
+                    "base64_preview": (
+                        voice_file_b64[:50] + "..." if len(voice_file_b64) > 50 else voice_file_b64
+                    ) if isinstance(voice_file_b64, str) else repr(bytes(voice_file_b64[:50]))
                 }
             }
+            return
         except Exception as e:
             print(f"Unexpected voice file error: {str(e)}")
-            return {
+            yield "result", {
                 "error": f"Unexpected error decoding voice file: {str(e)}"
             }
+            return
         
-        # Save voice file temporarily
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_voice:
-            temp_voice.write(voice_data)
-            voice_path = temp_voice.name
+        # Remember inline voices so later requests can send just the id
+        if voice_id:
+            voice_cache.put(voice_data, voice_id, voice_hash)
+    
+    # Trim/normalize/cap the reference once per voice; the processed clip is
+    # cached under its own hash, which then keys conditioning and chunk audio
+    conditioning_voice_hash = voice_hash
+    voice_preprocessing = None
+    if settings.get("preprocess_voice", os.environ.get("CHATTERBOX_VOICE_PREPROCESS", "1") == "1"):
+        try:
+            voice_data, conditioning_voice_hash, voice_preprocessing = get_processed_voice(
+                voice_data, voice_hash, voice_cache
+            )
+            print(f"Voice preprocessing: {voice_preprocessing}")
+        except Exception as e:
+            print(f"Voice preprocessing failed, using the original clip: {str(e)}")
+            voice_preprocessing = {"error": str(e)}
+    
+    encoder = None
+    writer = None
+    admission = None
+    chunk_pipeline = None
+    # CPU workers can shard chunks across a pool of processes sharing the weights
+    pool = get_process_pool(model) if scheduler is None else None
+    try:
+        # Extract settings
+        exaggeration = settings.get("exaggeration", 0.5)
+        cfg_weight = settings.get("cfg_weight", 0.5)
+        temperature = settings.get("temperature", 0.8)
+        min_p = settings.get("min_p", 0.05)
+        top_p = settings.get("top_p", 1.0)
+        repetition_penalty = settings.get("repetition_penalty", 1.2)
+        output_format = settings.get("output_format", "wav")
+        bitrate_kbps = settings.get("bitrate_kbps")
+        seed = settings.get("seed", 0)
+        # T3 and the vocoder as overlapping stages (in-process generation only)
+        staged = (
+            scheduler is None and pool is None
+            and settings.get("staged", os.environ.get("CHATTERBOX_STAGED_GENERATION", "0") == "1")
+            and supports_staged(model)
+        )
+        precision = settings.get("precision", DEFAULT_PRECISION)
+        timing = settings.get("timing", DEFAULT_TIMING)
+        checkpoint_key = input_data.get("checkpoint_key")
+        if not checkpoint_key and settings.get("checkpoint", os.environ.get("CHATTERBOX_CHECKPOINTS") == "1"):
+            checkpoint_key = job_id
+        if staged:
+            # Both stages draw from the global RNG on different threads, so
+            # staged audio can't be reproduced and is never cached or resumed
+            checkpoint_key = None
         
         try:
-            # Extract settings
-            exaggeration = settings.get("exaggeration", 0.5)
-            cfg_weight = settings.get("cfg_weight", 0.5)
-            temperature = settings.get("temperature", 0.8)
-            min_p = settings.get("min_p", 0.05)
-            top_p = settings.get("top_p", 1.0)
-            repetition_penalty = settings.get("repetition_penalty", 1.2)
-            
-            print(f"Generation settings: exaggeration={exaggeration}, cfg_weight={cfg_weight}, temperature={temperature}")
-            
-            # Split text into chunks if needed
-            chunks = split_text_into_chunks(clean_text, max_length=150)
-            print(f"Split into {len(chunks)} chunks")
-            
-            all_wavs = []
-            
-            for i, chunk in enumerate(chunks):
-                print(f"Processing chunk {i+1}/{len(chunks)}: {len(chunk)} chars")
-                
-                try:
-                    chunk_wav = model.generate(
-                        chunk,
-                        audio_prompt_path=voice_path,
-                        exaggeration=exaggeration,
-                        cfg_weight=cfg_weight,
-                        temperature=temperature,
-                        min_p=min_p,
-                        top_p=top_p,
-                        repetition_penalty=repetition_penalty
-                    )
-                    
-                    all_wavs.append(chunk_wav)
-                    print(f"Chunk {i+1} completed successfully")
-                    
-                    # Add small pause between chunks
-                    if i < len(chunks) - 1:  # Don't add pause after last chunk
-                        pause_samples = int(0.2 * 24000)  # 0.2 second pause
-                        pause = torch.zeros(pause_samples, device=chunk_wav.device)
-                        all_wavs.append(pause)
-                        
-                except Exception as chunk_error:
-                    print(f"Chunk {i+1} failed: {chunk_error}")
-                    raise chunk_error
-            
-            # Concatenate all audio chunks
-            if len(all_wavs) > 1:
-                # Ensure all tensors have the same dimensions before concatenating
-                processed_wavs = []
-                for i, wav in enumerate(all_wavs):
-                    print(f"Chunk {i+1} original shape: {wav.shape}")
-                    
-                    # Ensure tensor is 1D
-                    if wav.dim() == 2:
-                        # If 2D, take the first channel or flatten
-                        if wav.shape[0] == 1:
-                            wav = wav.squeeze(0)  # Remove channel dimension
-                        elif wav.shape[1] == 1:
-                            wav = wav.squeeze(1)  # Remove channel dimension
-                        else:
-                            wav = wav.mean(dim=0)  # Average channels if multiple
-                    elif wav.dim() > 2:
-                        # Flatten higher dimensional tensors
-                        wav = wav.flatten()
-                    
-                    processed_wavs.append(wav)
-                    print(f"Chunk {i+1} processed shape: {wav.shape}")
-                
-                final_wav = torch.cat(processed_wavs, dim=0)
-                print("Successfully concatenated audio chunks")
+            validate_output_format(output_format, bitrate_kbps)
+            sink = get_output_sink(settings.get("output_sink"))
+            synth_cache = None if staged else get_synthesis_cache(settings.get("synthesis_cache"))
+            max_tokens_per_chunk = int(settings.get("max_tokens_per_chunk", DEFAULT_MAX_TOKENS_PER_CHUNK))
+            if max_tokens_per_chunk < 1:
+                raise ValueError("max_tokens_per_chunk must be at least 1")
+            validate_precision(precision)
+            validate_timing(timing)
+            # Reserve memory for the job, shrinking its batches if it wouldn't fit
+            if scheduler is not None:
+                requested_batch_size = scheduler.max_batch_size
+            elif pool is not None:
+                requested_batch_size = pool.processes
+            elif staged:
+                requested_batch_size = settings.get("vocoder_batch_size") or DEFAULT_VOCODER_BATCH_SIZE
             else:
-                final_wav = all_wavs[0]
-                # Ensure final output is 1D
-                if final_wav.dim() == 2:
-                    if final_wav.shape[0] == 1:
-                        final_wav = final_wav.squeeze(0)
-                    elif final_wav.shape[1] == 1:
-                        final_wav = final_wav.squeeze(1)
-                    else:
-                        final_wav = final_wav.mean(dim=0)
-            
-            # Move to CPU for conversion
-            final_wav = final_wav.cpu()
-            
-            # Convert to bytes
-            audio_bytes = io.BytesIO()
-            ta.save(audio_bytes, final_wav.unsqueeze(0), 24000, format="wav")
-            audio_data = audio_bytes.getvalue()
-            
-            # Encode to base64
-            audio_b64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            duration = len(final_wav) / 24000
+                requested_batch_size = settings.get("batch_size") or DEFAULT_MAX_BATCH_SIZE
+            admission = governor.admit(
+                job_id, clean_length, requested_batch_size, SAMPLE_RATE, device_type(model), wait=wait_for_memory
+            )
+        except (ValueError, ImportError) as e:
+            yield "result", {
+                "error": str(e)
+            }
+            return
+        
+        print(f"Generation settings: exaggeration={exaggeration}, cfg_weight={cfg_weight}, temperature={temperature}, "
+              f"precision={precision}")
+        
+        # Speaker conditionals depend only on the voice and exaggeration,
+        # so prepare them at most once per job and reuse across jobs
+        # The voice is decoded and resampled in memory (timings reported below)
+        cond_key = conditioning_cache.make_key(conditioning_voice_hash, exaggeration, str(getattr(model, "device", "")))
+        reference_timings = {}
+        if scheduler is not None:
+            prepare = lambda: scheduler.run_exclusive(
+                lambda m: prepare_speaker_conditioning(m, voice_data, exaggeration, reference_timings)
+            )
+        else:
+            def prepare():
+                with generation_context(None, device_type(model)):
+                    return prepare_speaker_conditioning(model, voice_data, exaggeration, reference_timings)
+        conds, cond_hit = conditioning_cache.get_or_create(cond_key, prepare)
+        if scheduler is None:
+            use_speaker_conditioning(model, conds)
+        print(f"Speaker conditioning {'cache hit' if cond_hit else 'prepared'} ({voice_hash[:12]})")
+        
+        # Plan token-balanced chunks along sentence boundaries
+        chunks = plan_chunks(clean_lines, max_tokens_per_chunk, token_counter(model))
+        print(f"Split into {len(chunks)} chunks")
+        
+        pause_samples = int(PAUSE_SECONDS * SAMPLE_RATE)
+        batch_stats = {}
+        # Caption timings come from the chunk text and where its audio lands
+        timing_track = TimingTrack(SAMPLE_RATE) if timing != "off" else None
+        assembler = AudioAssembler(SAMPLE_RATE, estimate_samples(clean_length, SAMPLE_RATE))
+        # Encodes each chunk on a background thread while the next one generates,
+        # streaming the encoded bytes into the output sink as they are produced
+        writer = sink.open(
+            object_key(job_id or uuid.uuid4().hex, OUTPUT_FORMATS[output_format]["extension"]),
+            OUTPUT_FORMATS[output_format]["mime_type"]
+        )
+        # Bounded so a slow encoder/upload holds back post-processing (a chunk and its pause per slot)
+        encoder = IncrementalEncoder(
+            output_format, SAMPLE_RATE, bitrate_kbps, stream_to=writer, max_pending=2 * PIPELINE_DEPTH
+        )
+        
+        gen_kwargs = {
+            "exaggeration": exaggeration,
+            "cfg_weight": cfg_weight,
+            "temperature": temperature,
+            "min_p": min_p,
+            "top_p": top_p,
+            "repetition_penalty": repetition_penalty
+        }
+        
+        # Every chunk gets a content-addressed key and a seed derived from it,
+        # so cached audio is exactly what regeneration would produce
+        version = model_version()
+        # Autocast changes the audio, so it is part of the key (fp32 keys are unchanged)
+        key_settings = gen_kwargs if precision == "fp32" else {**gen_kwargs, "precision": precision}
+        chunk_keys = [chunk_cache_key(chunk, conditioning_voice_hash, key_settings, seed, version) for chunk in chunks]
+        
+        # Resume from chunks a previous attempt of this job already finished
+        checkpoint = None
+        resumed = {}
+        if checkpoint_key:
+            checkpoint = open_checkpoint(checkpoint_key, plan_fingerprint(chunk_keys))
+            resumed = checkpoint.load()
+            print(f"Checkpoint {checkpoint_key}: resuming with {len(resumed)}/{len(chunks)} chunks done")
+        
+        cached = dict(resumed)
+        synth_hits = 0
+        if synth_cache is not None:
+            for i, key in enumerate(chunk_keys):
+                if i in cached:
+                    continue
+                wav = synth_cache.get(key)
+                if wav is not None:
+                    cached[i] = wav
+                    synth_hits += 1
+        missing = [i for i in range(len(chunks)) if i not in cached]
+        print(f"Synthesis cache: {synth_hits} hits, {len(missing)} misses")
+        
+        # Generate the missing chunks (batched when possible) in original order
+        missing_chunks = [chunks[i] for i in missing]
+        missing_seeds = [chunk_seed(chunk_keys[i]) for i in missing]
+        if not missing:
+            generated = iter(())
+        elif scheduler is not None:
+            generated = scheduler.iter_generate_chunks(
+                missing_chunks, gen_kwargs, conds, cond_key, missing_seeds, precision, admission.batch_size
+            )
+        elif staged:
+            generated = iter_staged_chunks(
+                model, missing_chunks, gen_kwargs,
+                seeds=missing_seeds,
+                precision=precision,
+                vocoder_batch_size=admission.batch_size,
+                stats=batch_stats
+            )
+        elif pool is not None:
+            pool_start_mb = pool.reset_worker_peaks()
+            generated = pool.iter_generate_chunks(
+                missing_chunks, gen_kwargs, conds, missing_seeds, precision, max_in_flight=admission.batch_size
+            )
+        else:
+            generated = iter_generate_chunks(
+                model, missing_chunks, gen_kwargs,
+                max_batch_size=admission.batch_size,
+                stats=batch_stats,
+                seeds=missing_seeds,
+                precision=precision
+            )
+        
+        meter = GenerationMeter(precision, device_type(model), SAMPLE_RATE)
+        
+        def merged_chunks():
+            # Generated chunks arrive in order, so interleave them with the hits
+            for i in range(len(chunks)):
+                if i in cached:
+                    yield i, cached.pop(i), False
+                    continue
+                with meter.measure():
+                    _, wav = next(generated)
+                meter.add_audio(wav.shape[-1])
+                yield i, wav, True
+            # Run the generator to completion so its stats are filled in
+            next(generated, None)
+        
+        # Generation runs ahead on its own thread while this one post-processes,
+        # at most PIPELINE_DEPTH chunks ahead
+        chunk_pipeline = BackgroundIterator(merged_chunks(), PIPELINE_DEPTH, name="generate")
+        for i, chunk_wav, fresh in chunk_pipeline:
+            if fresh and synth_cache is not None:
+                synth_cache.put(chunk_keys[i], chunk_wav)
+            if checkpoint is not None and i not in resumed:
+                checkpoint.save(i, chunk_wav, {"text": chunks[i], "chunk_key": chunk_keys[i]})
             
-            print(f"Generation completed successfully")
-            print(f"Duration: {duration:.2f} seconds")
-            print(f"Audio data size: {len(audio_data)} bytes")
+            # Normalize and copy straight into the shared output buffer
+            sample_offset = assembler.append(chunk_wav)
+            num_samples = assembler.length - sample_offset
+            chunk_view = assembler.view(sample_offset, num_samples)
+            encoder.write(chunk_view)
+            chunk_timing = timing_track.add_chunk(chunks[i], sample_offset, chunk_view) if timing_track else None
             
-            return {
-                "audio_base64": audio_b64,
-                "message": "Voice generation completed successfully",
-                "processing_time": duration,
-                "text_length": len(clean_text),
-                "chunk_count": len(chunks),
-                "sample_rate": 24000,
-                "duration": duration,
-                "audio_size_bytes": len(audio_data)
-            }
+            if stream_chunks:
+                chunk_audio = encode_audio(chunk_view, SAMPLE_RATE, output_format, bitrate_kbps)
+                yield "chunk", {
+                    "chunk_index": i,
+                    "chunk_count": len(chunks),
+                    "text": chunks[i],
+                    "sample_rate": SAMPLE_RATE,
+                    "sample_offset": sample_offset,
+                    "num_samples": num_samples,
+                    "offset_seconds": sample_offset / SAMPLE_RATE,
+                    "duration": num_samples / SAMPLE_RATE,
+                    "mime_type": encoder.mime_type,
+                    "audio_base64": base64.b64encode(chunk_audio).decode('utf-8'),
+                    "timing": chunk_timing
+                }
             
-        finally:
-            # Cleanup temporary voice file
-            try:
-                os.unlink(voice_path)
-            except:
-                pass
+            # Add small pause between chunks
+            if i < len(chunks) - 1:  # Don't add pause after last chunk
+                pause_offset = assembler.append_silence(pause_samples)
+                encoder.write(assembler.view(pause_offset, pause_samples))
+        
+        if scheduler is not None:
+            batch_stats = {"mode": "scheduled", **scheduler.metrics()}
+        elif pool is not None:
+            batch_stats = {"mode": "process_pool", **pool.stats()}
+        
+        final_wav = assembler.finish()
+        print(f"Assembled {len(chunks)} chunks into {len(final_wav)} samples")
+        
+        # Flush the background encoder and finish the upload/inline payload
+        encoder.finish()
+        encode_stats = encoder.stats()
+        pipeline_stats = {
+            "depth": PIPELINE_DEPTH,
+            "generate": chunk_pipeline.producer.stats(),
+            "postprocess": chunk_pipeline.consumer.stats(),
+            "encode": encoder.stage_stats(),
+        }
+        print(f"Encoded {output_format}: {encoder.encoded_bytes} bytes ({encode_stats['encode_ms']}ms encoding, "
+              f"{encode_stats['encode_wait_ms']}ms waited)")
+        
+        location = writer.close()
+        writer = None
+        
+        # The job is complete, so its checkpoint is no longer needed
+        if checkpoint is not None:
+            checkpoint_stats = checkpoint.stats()
+            checkpoint.clear()
+        
+        duration = len(final_wav) / SAMPLE_RATE
+        precision_stats = meter.stats()
+        # Chunks resident at once, so the governor learns a per-chunk working set
+        if pool is not None:
+            items_per_call = min(admission.batch_size, pool.processes, len(missing))
+        elif staged:
+            batched_vocoder = callable(getattr(getattr(model, "s3gen", None), "inference_batch", None))
+            items_per_call = max(1, batch_stats.get("max_vocoder_batch", 1)) if batched_vocoder else 1
+        elif scheduler is not None:
+            items_per_call = admission.batch_size if supports_batching(model) else 1
+        else:
+            items_per_call = min(admission.batch_size, len(missing)) if batch_stats.get("batched_calls") else 1
+        worker_host_mb = pool.worker_peak_growth_mb(pool_start_mb) if pool is not None and missing else 0.0
+        memory_stats = governor.release(admission, len(missing), items_per_call, worker_host_mb)
+        admission = None
+        
+        print(f"Generation completed successfully")
+        print(f"Duration: {duration:.2f} seconds")
+        print(f"Audio data size: {location['audio_size_bytes']} bytes ({sink.name} sink)")
+        
+        yield "result", {
+            **location,
+            "output_sink": sink.name,
+            "message": "Voice generation completed successfully",
+            "processing_time": duration,
+            "text_length": clean_length,
+            "chunk_count": len(chunks),
+            "sample_rate": SAMPLE_RATE,
+            "duration": duration,
+            "mime_type": encoder.mime_type,
+            "encoded_size_bytes": encoder.encoded_bytes,
+            **encode_stats,
+            "model_load_ms": round(model_load_ms, 1),
+            "model_warm": model_load_ms == 0,
+            "voice_hash": voice_hash,
+            "voice_source": voice_source,
+            "voice_preprocessing": voice_preprocessing,
+            "conditioning_cache_hit": cond_hit,
+            "reference_audio": reference_timings or None,
+            "conditioning_cache": conditioning_cache.stats(),
+            "synthesis_cache": {
+                "backend": synth_cache.name if synth_cache is not None else "off",
+                "hits": synth_hits,
+                "misses": len(missing)
+            },
+            "checkpoint": checkpoint_stats if checkpoint is not None else None,
+            "batching": batch_stats,
+            "precision": precision_stats,
+            "memory": memory_stats,
+            "pipeline": pipeline_stats,
+            "assembly": assembler.stats(),
+            "timing": timing_track.to_json() if timing_track else None,
+            "srt": timing_track.to_srt() if timing == "srt" else None
+        }
+        
+    finally:
+        if chunk_pipeline is not None:
+            # Waits for an in-flight chunk so the model is idle before the next job
+            chunk_pipeline.close()
+        if admission is not None:
+            governor.release(admission)
+        if encoder is not None:
+            encoder.abort()
+        if writer is not None:
+            writer.abort()
+
+def _error_result(e):
+    print(f"Handler error: {str(e)}")
+    print("Traceback:", traceback.format_exc())
+    return {
+        "error": str(e),
+        "traceback": traceback.format_exc()
+    }
+
+def synthesize_batch(input_data, stream_items: bool = False, job_id: str = None):
+    """
+    Generate every script in ``input.items`` in one job (see ``batch_jobs``)
+
+    Yields ``("item", result)`` as each item finishes (only when
+    ``stream_items`` is set), followed by exactly one ``("result", output)``
+    whose ``items`` list holds the per-item results in input order. A failed
+    item gets an ``error`` result and doesn't stop the others.
+    """
+    start = time.perf_counter()
+    try:
+        items, voice_stats = expand_items(input_data, decode_voice_file)
+        concurrency = item_concurrency(input_data.get("concurrency"))
+        model, model_load_ms = registry.get()
+    except (ValueError, ImportError) as e:
+        yield "result", {
+            "error": str(e)
+        }
+        return
+
+    # Items share the scheduler's batches, unless a CPU process pool is
+    # sharding each item's chunks instead
+    item_scheduler = scheduler if get_process_pool(model) is None else None
+    if item_scheduler is None:
+        concurrency = 1
+    print(f"Batch job: {len(items)} items, {voice_stats['voices_decoded']} distinct inline voices, "
+          f"{concurrency} at a time")
+
+    def run_item(index, item):
+        try:
+            for kind, payload in synthesize(
+                item, scheduler=item_scheduler, job_id=item_job_id(job_id, index), wait_for_memory=True
+            ):
+                if kind == "result":
+                    return payload
+        except Exception as e:
+            return _error_result(e)
+
+    results = [None] * len(items)
+    for index, result in iter_item_results(items, run_item, concurrency):
+        result = {"item_index": index, "item_id": items[index].get("id"), **result}
+        results[index] = result
+        if stream_items:
+            yield "item", result
+
+    wall_s = time.perf_counter() - start
+    audio_s = sum(result.get("duration", 0) for result in results)
+    failed = sum(1 for result in results if "error" in result)
+    if stream_items:
+        # Audio already went out with each streamed item
+        results = [{k: v for k, v in result.items() if k != "audio_base64"} for result in results]
+
+    yield "result", {
+        "message": f"Batch completed: {len(items) - failed} of {len(items)} items succeeded",
+        "items": results,
+        "item_count": len(items),
+        "failed_count": failed,
+        "batch": {
+            "concurrency": concurrency,
+            **voice_stats,
+            "wall_seconds": round(wall_s, 3),
+            "audio_seconds": round(audio_s, 3),
+            "audio_seconds_per_second": round(audio_s / wall_s, 3) if wall_s else None,
+            "model_load_ms": round(model_load_ms, 1),
+            "scheduler": item_scheduler.metrics() if item_scheduler is not None else None
+        }
+    }
+
+def _synthesize_job(input_data, stream: bool = False, job_scheduler: ChunkScheduler = None, job_id: str = None):
+    """``synthesize_batch`` for jobs with ``items``, ``synthesize`` otherwise"""
+    if "items" in input_data:
+        return synthesize_batch(input_data, stream_items=stream, job_id=job_id)
+    return synthesize(input_data, stream_chunks=stream, scheduler=job_scheduler, job_id=job_id)
+
+def handler(event):
+    """
+    RunPod serverless handler for voice generation
+    
+    Expected input:
+    {
+        "text": "Text to convert to speech",
+        "voice_file": "base64 encoded voice file",
+        "voice_id": "voice_files id (alternative to voice_file)",
+        "voice_hash": "optional SHA-256 of the decoded voice",
+        "settings": {
+            "exaggeration": 0.5,
+            "cfg_weight": 0.5,
+            "temperature": 0.8,
+            "min_p": 0.05,
+            "top_p": 1.0,
+            "repetition_penalty": 1.2,
+            "batch_size": 1,
+            "max_tokens_per_chunk": 60,
+            "precision": "fp32",
+            "preprocess_voice": true,
+            "staged": false,
+            "vocoder_batch_size": 1,
+            "timing": "off",
+            "checkpoint": false
+        },
+        "checkpoint_key": "optional key that checkpoints chunks so a failed job can resume"
+    }
+    
+    Batch jobs send ``items`` (a list of the inputs above, optionally naming a
+    voice from ``voices``) instead, and get one result per item.
+    """
+    
+    try:
+        # Extract input data
+        input_data = event.get("input", {})
+        
+        # Readiness probe: report registry state without generating audio
+        if input_data.get("health_check"):
+            return registry.health()
+        
+        for kind, payload in _synthesize_job(input_data, job_id=event.get("id")):
+            if kind == "result":
+                return payload
     
     except Exception as e:
-        print(f"Handler error: {str(e)}")
-        print("Traceback:", traceback.format_exc())
-        return {
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        }
+        return _error_result(e)
+
+def stream_handler(event):
+    """
+    Generator variant of ``handler`` for RunPod streaming
+    
+    Accepts the same input plus ``"stream": true|false`` (default true). When
+    streaming, each chunk is yielded as soon as it is generated with its
+    ``chunk_index``, ``sample_offset``, ``num_samples``, ``duration`` and
+    WAV ``audio_base64``; the last item is always the same final result that
+    ``handler`` returns. With ``"stream": false`` only the final result is
+    yielded, so ``/run`` clients get it as the single aggregate entry.
+    Batch jobs stream each item's result as it finishes instead of chunks.
+    """
+    
+    try:
+        input_data = event.get("input", {})
+        
+        if input_data.get("health_check"):
+            yield registry.health()
+            return
+        
+        for kind, payload in _synthesize_job(input_data, stream=input_data.get("stream", True), job_id=event.get("id")):
+            yield payload
+    
+    except Exception as e:
+        yield _error_result(e)
+
+def concurrency_modifier(current_concurrency):
+    """Take several jobs at once only after the model is resident"""
+    return MAX_CONCURRENCY if registry.is_ready() else 1
+
+def _run_scheduled(input_data, job_id):
+    try:
+        for kind, payload in _synthesize_job(input_data, job_scheduler=scheduler, job_id=job_id):
+            if kind == "result":
+                return payload
+    except Exception as e:
+        return _error_result(e)
+
+async def async_handler(event):
+    """
+    Concurrency-aware variant of ``handler``
+    
+    Each job runs on its own thread while chunk generation is funnelled through
+    the shared scheduler, which batches chunks from concurrent jobs.
+    """
+    input_data = event.get("input", {})
+    
+    if input_data.get("health_check"):
+        return {**registry.health(), "scheduler": scheduler.metrics()}
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_job_executor, _run_scheduled, input_data, event.get("id"))
+
+async def async_stream_handler(event):
+    """Concurrency-aware variant of ``stream_handler``"""
+    input_data = event.get("input", {})
+    
+    if input_data.get("health_check"):
+        yield {**registry.health(), "scheduler": scheduler.metrics()}
+        return
+    
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    done = object()
+    
+    def produce():
+        try:
+            for kind, payload in _synthesize_job(
+                input_data,
+                stream=input_data.get("stream", True),
+                job_scheduler=scheduler,
+                job_id=event.get("id")
+            ):
+                loop.call_soon_threadsafe(events.put_nowait, payload)
+        except Exception as e:
+            loop.call_soon_threadsafe(events.put_nowait, _error_result(e))
+        finally:
+            loop.call_soon_threadsafe(events.put_nowait, done)
+    
+    producer = loop.run_in_executor(_job_executor, produce)
+    while True:
+        item = await events.get()
+        if item is done:
+            break
+        yield item
+    await producer
 
 # Start the RunPod serverless function
 if __name__ == "__main__":
-    runpod.serverless.start({"handler": handler}) 
\ No newline at end of file
+    if "--measure-startup" in sys.argv:
+        import json
+        from startup_profile import measure_startup
+        print(json.dumps(measure_startup(_IMPORT_MS), indent=2))
+        sys.exit(0)
+    
+    import runpod
+    
+    # Load weights before accepting jobs so the first request is warm too
+    if os.environ.get("CHATTERBOX_PRELOAD", "1") != "0":
+        if registry.preload() and DEFAULT_PROCESSES and MAX_CONCURRENCY == 1:
+            get_process_pool(registry.get()[0])
+    
+    streaming = os.environ.get("CHATTERBOX_STREAMING", "0") == "1"
+    config = {"handler": stream_handler if streaming else handler}
+    if streaming:
+        config["return_aggregate_stream"] = True
+    
+    if MAX_CONCURRENCY > 1:
+        config["handler"] = async_stream_handler if streaming else async_handler
+        config["concurrency_modifier"] = concurrency_modifier
+    
+    runpod.serverless.start(config)
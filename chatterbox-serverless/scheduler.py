@@ -0,0 +1,265 @@
+"""
+Cross-request chunk scheduler
+
+With ``concurrency_modifier`` RunPod hands a worker several jobs at once. The
+model itself is not thread-safe (speaker conditionals live on the model), so
+every model call goes through one scheduler thread. Jobs submit their chunks
+to a shared queue; the scheduler waits up to ``window_ms`` for more work,
+groups compatible chunks (same voice conditioning and generation settings)
+from any job into batches and routes each result back through a future.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from batched_generation import is_out_of_memory, release_memory, seed_generation, supports_batching
+from conditioning_cache import use_speaker_conditioning
+from precision import device_type, generation_context
+
+QUEUE_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; the last bucket collects everything above the top bound"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.total,
+            "mean": round(self.sum / self.total, 3) if self.total else 0.0,
+        }
+
+
+class _ChunkRequest:
+    __slots__ = ("text", "gen_kwargs", "conds", "group_key", "seed", "precision", "max_batch_size", "future",
+                 "enqueued_at")
+
+    def __init__(self, text, gen_kwargs, conds, cond_key, seed=None, precision=None, max_batch_size=None):
+        self.text = text
+        self.seed = seed
+        self.precision = precision
+        self.max_batch_size = max_batch_size
+        self.gen_kwargs = gen_kwargs
+        self.conds = conds
+        self.group_key = (cond_key, tuple(sorted(gen_kwargs.items())), precision, max_batch_size)
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class _Task:
+    __slots__ = ("fn", "future", "enqueued_at")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ChunkScheduler:
+    """Single model thread that batches chunk requests across concurrent jobs"""
+
+    def __init__(self, model_getter, window_ms: float = 20, max_batch_size: int = 8):
+        self.model_getter = model_getter
+        self.window_ms = window_ms
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.batch_sizes = Histogram(range(1, self.max_batch_size + 1))
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.sequential_chunks = 0
+        self.oom_fallbacks = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chunk-scheduler", daemon=True)
+                self._thread.start()
+
+    # --- job-facing API -------------------------------------------------
+
+    def run_exclusive(self, fn):
+        """Run ``fn(model)`` on the scheduler thread (e.g. conditioning prep) and wait"""
+        self._ensure_started()
+        task = _Task(fn)
+        self._queue.put(task)
+        return task.future.result()
+
+    def submit_chunks(self, texts, gen_kwargs: dict, conds, cond_key: str, seeds: list = None,
+                      precision: str = None, max_batch_size: int = None) -> list:
+        """
+        Queue every chunk of a job at once and return one future per chunk.
+
+        ``max_batch_size`` caps the batches this job's chunks join (the memory
+        governor lowers it for jobs that wouldn't fit at full size).
+        """
+        self._ensure_started()
+        seeds = seeds or [None] * len(texts)
+        requests = [
+            _ChunkRequest(text, gen_kwargs, conds, cond_key, seed, precision, max_batch_size)
+            for text, seed in zip(texts, seeds)
+        ]
+        for request in requests:
+            self._queue.put(request)
+        return [request.future for request in requests]
+
+    def iter_generate_chunks(self, chunks: list, gen_kwargs: dict, conds, cond_key: str, seeds: list = None,
+                             precision: str = None, max_batch_size: int = None):
+        """Yield ``(index, wav)`` in chunk order while other jobs share the batches"""
+        futures = self.submit_chunks(chunks, gen_kwargs, conds, cond_key, seeds, precision, max_batch_size)
+        for index, future in enumerate(futures):
+            try:
+                wav = future.result()
+            except Exception as chunk_error:
+                print(f"Chunk {index+1} failed: {chunk_error}")
+                for pending in futures[index + 1:]:
+                    pending.cancel()
+                raise
+            print(f"Chunk {index+1}/{len(chunks)} completed successfully")
+            yield index, wav
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            return {
+                "window_ms": self.window_ms,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self._queue.qsize(),
+                # Only calls that really ran several chunks at once
+                "batch_size": self.batch_sizes.snapshot(),
+                "sequential_chunks": self.sequential_chunks,
+                "queue_wait_ms": self.queue_wait_ms.snapshot(),
+                "oom_fallbacks": self.oom_fallbacks,
+            }
+
+    # --- scheduler thread -----------------------------------------------
+
+    def _collect(self, first):
+        """Gather requests arriving within the batching window"""
+        pending = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            if isinstance(item, _Task):
+                # Don't hold up conditioning prep behind the window
+                break
+        return pending
+
+    @staticmethod
+    def _fail(items, error):
+        for item in items:
+            try:
+                if not item.future.done():
+                    item.future.set_exception(error)
+            except InvalidStateError:
+                # Cancelled by its job in the meantime
+                pass
+
+    def _run(self):
+        # Failures are handed to the affected futures; the thread itself must
+        # never die, or every later job would wait on its futures forever
+        while True:
+            pending = self._collect(self._queue.get())
+            try:
+                model = self.model_getter()
+            except Exception as e:
+                print(f"Scheduler could not get the model: {e}")
+                self._fail(pending, e)
+                continue
+
+            groups = {}
+            for item in pending:
+                if isinstance(item, _Task):
+                    self._run_task(model, item)
+                elif item.future.set_running_or_notify_cancel():
+                    groups.setdefault(item.group_key, []).append(item)
+
+            for requests in groups.values():
+                size = min(self.max_batch_size, requests[0].max_batch_size or self.max_batch_size)
+                for start in range(0, len(requests), size):
+                    batch = requests[start:start + size]
+                    try:
+                        self._run_batch(model, batch)
+                    except Exception as e:
+                        print(f"Scheduled batch of {len(batch)} failed: {e}")
+                        self._fail(batch, e)
+
+    def _run_task(self, model, task):
+        if not task.future.set_running_or_notify_cancel():
+            return
+        try:
+            with generation_context(None, device_type(model)):
+                result = task.fn(model)
+            task.future.set_result(result)
+        except Exception as e:
+            task.future.set_exception(e)
+
+    def _run_batch(self, model, requests):
+        now = time.perf_counter()
+        with self._metrics_lock:
+            for request in requests:
+                self.queue_wait_ms.observe((now - request.enqueued_at) * 1000)
+
+        use_speaker_conditioning(model, requests[0].conds)
+        gen_kwargs = requests[0].gen_kwargs
+        with generation_context(requests[0].precision, device_type(model), model):
+            self._generate(model, requests, gen_kwargs)
+
+    def _generate(self, model, requests, gen_kwargs):
+        if len(requests) > 1 and supports_batching(model):
+            try:
+                wavs = model.generate_batch(
+                    [r.text for r in requests], seeds=[r.seed for r in requests], **gen_kwargs
+                )
+            except Exception as batch_error:
+                if not is_out_of_memory(batch_error):
+                    for request in requests:
+                        request.future.set_exception(batch_error)
+                    return
+                with self._metrics_lock:
+                    self.oom_fallbacks += 1
+                print(f"Scheduled batch of {len(requests)} ran out of memory, running sequentially")
+                release_memory()
+            else:
+                with self._metrics_lock:
+                    self.batch_sizes.observe(len(requests))
+                for request, wav in zip(requests, wavs):
+                    request.future.set_result(wav)
+                return
+
+        with self._metrics_lock:
+            self.sequential_chunks += len(requests)
+        for request in requests:
+            try:
+                seed_generation(request.seed)
+                request.future.set_result(model.generate(request.text, **gen_kwargs))
+            except Exception as e:
+                request.future.set_exception(e)
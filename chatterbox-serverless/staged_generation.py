@@ -0,0 +1,173 @@
+"""
+Staged generation: T3 speech tokens and S3Gen vocoding as separate stages
+
+``ChatterboxTTS.generate`` runs the T3 text-to-speech-token model and the S3Gen
+token-to-waveform vocoder back to back for every chunk. Here the same steps run
+as two stages. A background thread produces speech tokens for chunk i+1 (and
+up to ``CHATTERBOX_PIPELINE_DEPTH`` chunks ahead) while the calling thread
+vocodes chunk i. When several token sequences are ready at once and the
+vocoder exposes ``inference_batch(tokens_list, ref_dict=...)``, they are
+rendered in one call of up to ``vocoder_batch_size`` chunks. Otherwise they
+are rendered one after another.
+
+The steps mirror upstream ``generate`` (exaggeration update, punctuation
+normalization, CFG token doubling, invalid-token filtering, watermarking).
+``supports_staged`` checks the model exposes what they need, and the handler
+falls back to ``generate`` when it doesn't.
+
+Chunks are still seeded individually, but T3 sampling and the vocoder's
+noise both draw from torch's global RNG on different threads. Which stage
+draws first depends on timing, so staged audio - T3 tokens included - is not
+reproducible, and the handler neither caches nor checkpoints it.
+"""
+
+import importlib
+import os
+import time
+
+from batched_generation import seed_generation
+from pipeline import BackgroundIterator, StageTimer
+from precision import device_type, generation_context
+
+DEFAULT_VOCODER_BATCH_SIZE = int(os.environ.get("CHATTERBOX_VOCODER_BATCH_SIZE", "1"))
+# ``generate``'s cap on speech tokens per chunk
+MAX_NEW_TOKENS = 1000
+# Tokens at or above this id are special tokens, not speech
+SPEECH_VOCAB_SIZE = 6561
+
+
+def _tts_module(model):
+    return importlib.import_module(type(model).__module__)
+
+
+def supports_staged(model) -> bool:
+    """True when the model exposes the T3/S3Gen internals the stages call"""
+    try:
+        module = _tts_module(model)
+    except ImportError:
+        return False
+    return all((
+        callable(getattr(getattr(model, "t3", None), "inference", None)),
+        callable(getattr(getattr(model, "s3gen", None), "inference", None)),
+        callable(getattr(getattr(model, "tokenizer", None), "text_to_tokens", None)),
+        callable(getattr(module, "punc_norm", None)),
+        callable(getattr(module, "drop_invalid_tokens", None)),
+        hasattr(module, "T3Cond"),
+    ))
+
+
+def speech_tokens(model, text: str, gen_kwargs: dict):
+    """T3 stage: text to speech tokens, as ``generate`` does before vocoding"""
+    import torch
+    import torch.nn.functional as F
+
+    module = _tts_module(model)
+    exaggeration = gen_kwargs.get("exaggeration", 0.5)
+    cfg_weight = gen_kwargs.get("cfg_weight", 0.5)
+
+    conds = model.conds
+    if exaggeration != conds.t3.emotion_adv[0, 0, 0]:
+        _cond = conds.t3
+        conds.t3 = module.T3Cond(
+            speaker_emb=_cond.speaker_emb,
+            cond_prompt_speech_tokens=_cond.cond_prompt_speech_tokens,
+            emotion_adv=exaggeration * torch.ones(1, 1, 1),
+        ).to(device=model.device)
+
+    text_tokens = model.tokenizer.text_to_tokens(module.punc_norm(text)).to(model.device)
+    if cfg_weight > 0.0:
+        # Two sequences for classifier-free guidance
+        text_tokens = torch.cat([text_tokens, text_tokens], dim=0)
+    text_tokens = F.pad(text_tokens, (1, 0), value=model.t3.hp.start_text_token)
+    text_tokens = F.pad(text_tokens, (0, 1), value=model.t3.hp.stop_text_token)
+
+    tokens = model.t3.inference(
+        t3_cond=conds.t3,
+        text_tokens=text_tokens,
+        max_new_tokens=MAX_NEW_TOKENS,
+        temperature=gen_kwargs.get("temperature", 0.8),
+        cfg_weight=cfg_weight,
+        repetition_penalty=gen_kwargs.get("repetition_penalty", 1.2),
+        min_p=gen_kwargs.get("min_p", 0.05),
+        top_p=gen_kwargs.get("top_p", 1.0),
+    )
+    # Only the conditional sequence is vocoded
+    tokens = module.drop_invalid_tokens(tokens[0])
+    return tokens[tokens < SPEECH_VOCAB_SIZE].to(model.device)
+
+
+def _finish_wav(model, wav):
+    import torch
+
+    wav = wav.squeeze(0).detach().cpu().numpy()
+    watermarker = getattr(model, "watermarker", None)
+    if watermarker is not None:
+        wav = watermarker.apply_watermark(wav, sample_rate=model.sr)
+    return torch.from_numpy(wav).unsqueeze(0)
+
+
+def vocode(model, tokens_list: list, ref_dict) -> list:
+    """S3Gen stage: speech tokens to watermarked ``(1, samples)`` waveforms"""
+    batch_fn = getattr(model.s3gen, "inference_batch", None)
+    if len(tokens_list) > 1 and callable(batch_fn):
+        wavs = batch_fn(tokens_list, ref_dict=ref_dict)
+    else:
+        wavs = [model.s3gen.inference(speech_tokens=tokens, ref_dict=ref_dict)[0] for tokens in tokens_list]
+    return [_finish_wav(model, wav) for wav in wavs]
+
+
+def iter_generate_chunks(model, chunks: list, gen_kwargs: dict, seeds: list = None, precision: str = None,
+                         vocoder_batch_size: int = None, stats: dict = None):
+    """
+    Yield ``(index, wav)`` in chunk order, with T3 running ahead on its own thread.
+
+    ``stats`` (if given) is filled in with per-stage busy/idle times and the
+    vocoder call sizes.
+    """
+    vocoder_batch_size = max(1, int(vocoder_batch_size or DEFAULT_VOCODER_BATCH_SIZE))
+    device = device_type(model)
+    ref_dict = model.conds.gen
+
+    def token_stage():
+        for index, text in enumerate(chunks):
+            print(f"T3 chunk {index+1}/{len(chunks)}: {len(text)} chars")
+            seed_generation(seeds[index] if seeds else None)
+            with generation_context(precision, device, model):
+                tokens = speech_tokens(model, text, gen_kwargs)
+            yield index, tokens
+
+    t3 = BackgroundIterator(token_stage(), name="t3")
+    vocoder = StageTimer()
+    call_sizes = []
+    try:
+        for index, tokens in t3:
+            batch = [(index, tokens)]
+            # Vocode whatever else T3 already finished, without waiting for more
+            while len(batch) < vocoder_batch_size:
+                ready = t3.next_ready()
+                if ready is None:
+                    break
+                batch.append(ready)
+
+            start = time.perf_counter()
+            with generation_context(precision, device, model):
+                wavs = vocode(model, [tokens for _, tokens in batch], ref_dict)
+            vocoder.busy_s += time.perf_counter() - start
+            vocoder.items += len(batch)
+            call_sizes.append(len(batch))
+            for (chunk_index, _), wav in zip(batch, wavs):
+                print(f"Chunk {chunk_index+1} completed successfully")
+                yield chunk_index, wav
+    finally:
+        t3.close()
+        if stats is not None:
+            # The vocoder is idle exactly while it waits for T3
+            vocoder.idle_s = t3.consumer.idle_s
+            stats.update({
+                "mode": "staged",
+                "vocoder_batch_size": vocoder_batch_size,
+                "vocoder_calls": len(call_sizes),
+                "max_vocoder_batch": max(call_sizes, default=0),
+                "t3": t3.producer.stats(),
+                "vocoder": vocoder.stats(),
+            })
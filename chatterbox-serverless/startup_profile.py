@@ -0,0 +1,98 @@
+"""
+Cold-start profiling
+
+``python rp_handler.py --measure-startup`` loads the handler exactly as a
+worker would, then reports where the time to ready went:
+
+- ``process_start_ms`` - interpreter start up to the first handler import
+- ``handler_import_ms`` - importing rp_handler and its helper modules
+- ``import_profile`` - slowest direct imports of rp_handler (``-X importtime``)
+- ``model_load`` - the registry's load phases (torch/chatterbox imports,
+  weight source and load time)
+- ``first_generate_ms`` - one short generation with the built-in voice
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+
+def process_age_seconds():
+    """Seconds since this process was started, from /proc; None where unavailable"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, in clock ticks since boot); fields after
+            # the ")" that closes the command name start at field 3
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def import_profile(module: str = "rp_handler", top: int = 15):
+    """
+    Import ``module`` in a fresh interpreter with ``-X importtime`` and return
+    its slowest direct imports as ``[{"module", "cumulative_ms"}]``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(parts[1])))
+
+    # importtime prints children before their parent, so the direct imports of
+    # ``module`` are the depth-1 entries between it and the previous top-level one
+    children = []
+    for depth, name, cumulative_us in entries:
+        if depth == 0:
+            if name == module:
+                break
+            children = []
+        elif depth == 1:
+            children.append({"module": name, "cumulative_ms": round(cumulative_us / 1000, 1)})
+    children.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return children[:top]
+
+
+def measure_startup(handler_import_ms: float, first_generate: bool = True) -> dict:
+    """Load the model the way a worker does and report time to ready by phase"""
+    from model_registry import registry
+
+    report = {}
+    age = process_age_seconds()
+    if age is not None:
+        # Everything before the handler started importing
+        report["process_start_ms"] = round(age * 1000 - handler_import_ms, 1)
+    report["handler_import_ms"] = round(handler_import_ms, 1)
+
+    start = time.perf_counter()
+    ready = registry.preload()
+    report["model_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    health = registry.health()
+    report["model_load"] = health["models"][0]["load_phases"] if health["models"] else {"error": health.get("error")}
+
+    if ready and first_generate:
+        model, _ = registry.get()
+        if getattr(model, "conds", None) is not None:
+            start = time.perf_counter()
+            model.generate("Warm up.")
+            report["first_generate_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    age = process_age_seconds()
+    if age is not None:
+        report["time_to_ready_ms"] = round(age * 1000, 1)
+    report["ready"] = ready
+    report["import_profile"] = import_profile()
+    return report
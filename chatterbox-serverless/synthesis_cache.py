@@ -0,0 +1,158 @@
+"""
+Content-addressed cache of generated chunk audio
+
+Scripts share intros/outros and RunPod retries whole jobs, so the same chunk
+is often synthesized more than once. Chunk audio is cached under a key made
+of the normalized chunk text, the voice hash, every generation setting, the
+seed and the model version. Each chunk is generated with a seed derived from
+that key, so a cache hit returns exactly what regeneration would produce.
+
+Backends: ``memory`` (in-process LRU) or ``disk`` (float32 files with LRU
+eviction by mtime); ``off`` disables caching.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+def normalize_chunk_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def chunk_cache_key(text: str, voice_hash: str, gen_settings: dict, seed: int, model_version: str) -> str:
+    payload = json.dumps(
+        {
+            "text": normalize_chunk_text(text),
+            "voice": voice_hash,
+            "settings": gen_settings,
+            "seed": seed,
+            "model": model_version,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunk_seed(key: str) -> int:
+    """Deterministic 31-bit seed for a chunk key"""
+    return int(key[:8], 16) & 0x7FFFFFFF
+
+
+def _as_cpu_1d(wav):
+    return wav.detach().reshape(-1).to("cpu", torch.float32)
+
+
+class MemorySynthesisCache:
+    """In-process LRU of chunk audio bounded by bytes"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            wav = self._entries.get(key)
+            if wav is not None:
+                self._entries.move_to_end(key)
+            return wav
+
+    def put(self, key: str, wav):
+        wav = _as_cpu_1d(wav).clone()
+        size = wav.numel() * 4
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).numel() * 4
+            self._entries[key] = wav
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.numel() * 4
+
+
+class DiskSynthesisCache:
+    """Chunk audio as raw float32 files, evicted least-recently-used by mtime"""
+
+    name = "disk"
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.f32")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            data = np.fromfile(path, dtype=np.float32)
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return torch.from_numpy(data)
+
+    def put(self, key: str, wav):
+        data = _as_cpu_1d(wav).numpy()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            data.tofile(f)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".f32"):
+                continue
+            stat = os.stat(os.path.join(self.root, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.unlink(os.path.join(self.root, name))
+            total -= size
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_synthesis_cache(backend: str = None):
+    """Return the shared cache for ``backend`` (default ``CHATTERBOX_SYNTH_CACHE``) or None when off"""
+    backend = backend or os.environ.get("CHATTERBOX_SYNTH_CACHE", "memory")
+    if backend == "off":
+        return None
+    max_bytes = int(os.environ.get("CHATTERBOX_SYNTH_CACHE_MB", "256")) * 1024 * 1024
+    with _caches_lock:
+        if backend not in _caches:
+            if backend == "memory":
+                _caches[backend] = MemorySynthesisCache(max_bytes)
+            elif backend == "disk":
+                _caches[backend] = DiskSynthesisCache(
+                    os.environ.get(
+                        "CHATTERBOX_SYNTH_CACHE_DIR",
+                        os.path.join(tempfile.gettempdir(), "chatterbox-synthesis"),
+                    ),
+                    max_bytes,
+                )
+            else:
+                raise ValueError(f"Unsupported synthesis_cache '{backend}'. Choose one of: memory, disk, off")
+        return _caches[backend]
@@ -0,0 +1,124 @@
+"""
+Shared fixtures for the worker tests
+
+The tests run without chatterbox-tts or its weights. ``FakeModel`` stands in
+for ``ChatterboxTTS``: it has the same ``prepare_conditionals``/``generate``
+surface and returns audio that depends only on the text and the torch RNG,
+so seeding and caching behave as they do with the real model.
+"""
+
+import base64
+import io
+import math
+import os
+import struct
+import sys
+import wave
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SAMPLE_RATE = 24000
+
+
+class FakeConds:
+    def __init__(self, exaggeration):
+        import torch
+
+        self.t3 = torch.ones(1, 1, 1) * exaggeration
+        self.gen = {"ref": torch.zeros(10)}
+
+
+class FakeModel:
+    device = "cpu"
+    sr = SAMPLE_RATE
+
+    def __init__(self):
+        self.conds = None
+        self.generated = []
+
+    def prepare_conditionals(self, path, exaggeration=0.5):
+        self.conds = FakeConds(exaggeration)
+
+    def generate(self, text, **kwargs):
+        import torch
+
+        assert self.conds is not None
+        self.generated.append(text)
+        return torch.rand(1, 2400 + 10 * len(text)) * 0.2 - 0.1
+
+
+class FakeT3:
+    """T3 stand-in: a linear layer producing speech tokens; records its activation dtypes"""
+
+    def __init__(self):
+        import torch
+
+        self.proj = torch.nn.Linear(8, 8)
+        self.dtypes = []
+
+    def inference(self, text_tokens, **kwargs):
+        import torch
+
+        hidden = self.proj(torch.ones(text_tokens.shape[-1], 8))
+        self.dtypes.append(hidden.dtype)
+        return (hidden.float().abs() * 100).long().reshape(1, -1)
+
+
+class FakeS3Gen:
+    """S3Gen/HiFT stand-in: like HiFT it builds a complex spectrum, which bf16 can't be"""
+
+    def __init__(self):
+        import torch
+
+        self.proj = torch.nn.Linear(8, 8)
+
+    def inference(self, speech_tokens, ref_dict=None):
+        import torch
+
+        hidden = self.proj(torch.ones(speech_tokens.shape[-1], 8) + ref_dict["ref"][:8])
+        spectrum = torch.complex(hidden, hidden)
+        return spectrum.abs().reshape(1, -1).repeat(1, 100) * 1e-3, None
+
+
+class VocodingModel(FakeModel):
+    """``FakeModel`` whose ``generate`` runs T3 then S3Gen, as ``ChatterboxTTS.generate`` does"""
+
+    def __init__(self):
+        super().__init__()
+        self.t3 = FakeT3()
+        self.s3gen = FakeS3Gen()
+
+    def generate(self, text, **kwargs):
+        import torch
+
+        self.generated.append(text)
+        tokens = self.t3.inference(text_tokens=torch.ones(1, len(text), dtype=torch.long))
+        wav, _ = self.s3gen.inference(speech_tokens=tokens[0], ref_dict=self.conds.gen)
+        return wav
+
+
+def wav_bytes(samples: int = 4000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(b"".join(struct.pack("<h", int(3000 * math.sin(i / 10))) for i in range(samples)))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def voice_b64():
+    return base64.b64encode(wav_bytes()).decode()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """A ``FakeModel`` served by the model registry in place of ChatterboxTTS"""
+    from model_registry import registry
+
+    model = FakeModel()
+    monkeypatch.setattr(registry, "get", lambda *args, **kwargs: (model, 0.0))
+    return model
@@ -0,0 +1,40 @@
+import pytest
+
+import batch_jobs
+import rp_handler
+
+
+@pytest.mark.parametrize("value, expected", [(None, batch_jobs.DEFAULT_ITEM_CONCURRENCY), (1, 1), (3, 3), (10**9, batch_jobs.MAX_ITEMS)])
+def test_concurrency_is_clamped(value, expected):
+    assert batch_jobs.item_concurrency(value) == expected
+
+
+@pytest.mark.parametrize("value", [0, -2, 2.5, "4", True, [4]])
+def test_invalid_concurrency_is_rejected(value):
+    with pytest.raises(ValueError):
+        batch_jobs.item_concurrency(value)
+
+
+def test_batch_job_reports_invalid_concurrency(fake_model, voice_b64):
+    result = rp_handler.handler({
+        "input": {"items": [{"text": "Hello there."}], "voice_file": voice_b64, "concurrency": -1},
+    })
+    assert "concurrency" in result["error"]
+    assert fake_model.generated == []
+
+
+@pytest.mark.parametrize("item_id", ["../../../escaped", "a/b", ".hidden", "", "x" * 65, 1.5, None, True])
+def test_unsafe_item_ids_are_rejected(item_id):
+    with pytest.raises(ValueError, match="invalid id"):
+        batch_jobs.expand_items({"items": [{"id": item_id, "text": "Hi."}]}, lambda payload: b"")
+
+
+def test_duplicate_item_ids_are_rejected():
+    with pytest.raises(ValueError, match="repeats id"):
+        batch_jobs.expand_items({"items": [{"id": "dup", "text": "A."}, {"id": "dup", "text": "B."}]}, lambda p: b"")
+
+
+def test_item_storage_keys_come_from_the_position():
+    items, _ = batch_jobs.expand_items({"items": [{"id": "story-1", "text": "A."}, {"id": 7, "text": "B."}]}, lambda p: b"")
+    assert [batch_jobs.item_job_id("job", index) for index in range(len(items))] == ["job-0", "job-1"]
+    assert batch_jobs.item_job_id(None, 0) is None
@@ -0,0 +1,71 @@
+import pytest
+import torch
+
+from batched_generation import iter_generate_chunks
+
+
+class BatchingModel:
+    """Batched model that samples each row from its own seed, as the contract requires"""
+
+    device = "cpu"
+
+    def generate(self, text, **kwargs):
+        return torch.rand(1, 100) + len(text)
+
+    def generate_batch(self, texts, seeds=None, **kwargs):
+        wavs = []
+        for text, seed in zip(texts, seeds):
+            generator = torch.Generator().manual_seed(seed)
+            wavs.append(torch.rand(1, 100, generator=generator) + len(text))
+        return wavs
+
+
+def test_chunks_come_back_in_order():
+    chunks = ["a much longer chunk of text", "short", "a medium chunk", "tiny"]
+    stats = {}
+    out = list(iter_generate_chunks(BatchingModel(), chunks, {}, max_batch_size=2, stats=stats, seeds=[1, 2, 3, 4]))
+    assert [index for index, _ in out] == [0, 1, 2, 3]
+    assert stats["mode"] == "batched"
+    assert stats["batched_calls"] == 2
+
+
+def test_chunk_audio_does_not_depend_on_batch_mates():
+    model = BatchingModel()
+    alone = dict(iter_generate_chunks(model, ["hello", "x"], {}, max_batch_size=2, seeds=[7, 8]))
+    together = dict(iter_generate_chunks(model, ["hello", "another text", "y"], {}, max_batch_size=3, seeds=[7, 9, 10]))
+    assert torch.equal(alone[0], together[0])
+
+
+def test_stock_model_runs_sequentially():
+    class StockModel:
+        device = "cpu"
+
+        def generate(self, text, **kwargs):
+            return torch.rand(1, 10)
+
+    stats = {}
+    out = list(iter_generate_chunks(StockModel(), ["a", "b", "c"], {}, max_batch_size=4, stats=stats, seeds=[1, 2, 3]))
+    assert len(out) == 3
+    assert stats["mode"] == "sequential"
+    assert stats["batched_calls"] == 0
+
+
+def test_out_of_memory_batch_falls_back_to_sequential():
+    class OomModel(BatchingModel):
+        def generate_batch(self, texts, seeds=None, **kwargs):
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+
+    stats = {}
+    out = list(iter_generate_chunks(OomModel(), ["aa", "b", "ccc"], {}, max_batch_size=2, stats=stats, seeds=[1, 2, 3]))
+    assert [index for index, _ in out] == [0, 1, 2]
+    assert stats["oom_fallbacks"] == 1
+    assert stats["batched_calls"] == 0
+
+
+def test_other_batch_errors_are_raised():
+    class BrokenModel(BatchingModel):
+        def generate_batch(self, texts, seeds=None, **kwargs):
+            raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        list(iter_generate_chunks(BrokenModel(), ["aa", "b"], {}, max_batch_size=2, seeds=[1, 2]))
@@ -0,0 +1,59 @@
+import pytest
+
+import rp_handler
+
+SENTENCES = [f"Line number {n} here." for n in range(1, 13)]
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHATTERBOX_CHECKPOINT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def run_job(voice_b64):
+    return rp_handler.handler({
+        "id": "job-resume",
+        "input": {
+            "text": " ".join(SENTENCES),
+            "voice_file": voice_b64,
+            "settings": {
+                "checkpoint": True,
+                "synthesis_cache": "off",
+                "preprocess_voice": False,
+                # One sentence per chunk
+                "max_tokens_per_chunk": 12,
+            },
+        },
+    })
+
+
+def test_resume_regenerates_only_the_remaining_chunks(fake_model, voice_b64, checkpoint_dir, monkeypatch):
+    generate = fake_model.generate
+    failing = {"text": SENTENCES[7]}
+
+    def generate_or_fail(text, **kwargs):
+        if text == failing["text"]:
+            raise RuntimeError("injected failure")
+        return generate(text, **kwargs)
+
+    monkeypatch.setattr(fake_model, "generate", generate_or_fail)
+
+    first = run_job(voice_b64)
+    assert "injected failure" in first["error"]
+    assert fake_model.generated == SENTENCES[:7]
+
+    # The retry (same job id) must pick up after the last finished chunk
+    failing["text"] = None
+    fake_model.generated.clear()
+    second = run_job(voice_b64)
+    assert "error" not in second
+    assert second["chunk_count"] == 12
+    assert second["checkpoint"]["resumed_chunks"] == 7
+    assert fake_model.generated == SENTENCES[7:]
+
+    # A successful job clears its checkpoint, so a third run starts over
+    fake_model.generated.clear()
+    third = run_job(voice_b64)
+    assert third["checkpoint"]["resumed_chunks"] == 0
+    assert fake_model.generated == SENTENCES
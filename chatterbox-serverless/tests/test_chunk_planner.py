@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from chunk_planner import estimate_tokens, plan_chunks
+
+WORDS = ["a", "ok?", "x;", "b.", "world,", "hello", "this.", "barbazqux", "longerwordhere", "end!"]
+
+
+def assert_within_limit(text, max_tokens):
+    chunks = plan_chunks(text, max_tokens)
+    assert " ".join(chunks) == " ".join(text.split())
+    for chunk in chunks:
+        # Only a single word longer than the limit may exceed it
+        assert estimate_tokens(chunk) <= max_tokens or len(chunk.split()) == 1, (text, max_tokens, chunk)
+
+
+def test_tail_that_cannot_take_the_next_unit_is_cut_again():
+    assert_within_limit("world, a a this. hello world, longerwordhere this. a a b. x;", 10)
+    assert_within_limit("world, a this. hello world, barbazqux this. a world, ok?", 9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunks_never_exceed_max_tokens(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 40)))
+        assert_within_limit(text, rng.randint(1, 20))
@@ -0,0 +1,17 @@
+import torch
+
+import cpu_inference
+from conftest import FakeConds, VocodingModel
+
+
+def test_bf16_autocast_covers_t3_only(monkeypatch):
+    monkeypatch.setattr(cpu_inference, "bf16_supported", lambda: True)
+    model = VocodingModel()
+    model.conds = FakeConds(0.5)
+
+    applied = cpu_inference.optimize_for_cpu(model, "bfloat16", {"compile": False, "quantize_modules": []})
+    wav = model.generate("hello world")
+
+    assert applied["autocast"] == "bfloat16"
+    assert model.t3.dtypes == [torch.bfloat16]
+    assert wav.dtype == torch.float32
@@ -0,0 +1,64 @@
+import pytest
+
+import memory_governor
+
+
+class FakeHostPool:
+    name = "host"
+    budget_mb = None
+
+    def __init__(self):
+        self.usage = 1000.0
+        self.peak = 1000.0
+
+    def usage_mb(self):
+        return self.usage
+
+    def peak_mb(self):
+        return self.peak
+
+    def reset_peak(self):
+        self.peak = self.usage
+        return True
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    governor = memory_governor.MemoryGovernor()
+    pool = FakeHostPool()
+    governor._pools = {"host": pool}
+    governor._reserved = {"host": 0.0}
+    monkeypatch.setattr(memory_governor, "free_allocator_caches", lambda: None)
+    return governor, pool
+
+
+# Watermarks are rounded to 0.1 MB before learning
+def learned_after(governor, pool, used_mb, **release_kwargs):
+    admission = governor.admit("job", 10, 8, 24000, "cpu")
+    pool.peak = pool.usage + admission.audio_mb + used_mb
+    before = governor._item_mb["host"]
+    governor.release(admission, generated_items=4, **release_kwargs)
+    return before, governor._item_mb["host"]
+
+
+def test_sequential_job_is_not_divided_by_the_requested_batch_size(governor):
+    governor, pool = governor
+    before, after = learned_after(governor, pool, 800.0)
+    # One chunk at a time: the whole 800 MB is one item's working set
+    assert after == pytest.approx(before + memory_governor.LEARNING_RATE * (800.0 - before), abs=0.1)
+
+
+def test_batched_job_learns_per_item(governor):
+    governor, pool = governor
+    before, after = learned_after(governor, pool, 800.0, items_per_call=8)
+    assert after == pytest.approx(before + memory_governor.LEARNING_RATE * (100.0 - before), abs=0.1)
+
+
+def test_pool_workers_count_towards_host_usage(governor):
+    governor, pool = governor
+    admission = governor.admit("job", 10, 2, 24000, "cpu")
+    pool.peak = pool.usage + admission.audio_mb
+    before = governor._item_mb["host"]
+    stats = governor.release(admission, generated_items=2, items_per_call=2, worker_host_mb=1200.0)
+    assert stats["pools"]["host"]["workers_peak_mb"] == 1200.0
+    assert governor._item_mb["host"] == pytest.approx(before + memory_governor.LEARNING_RATE * (600.0 - before), abs=0.1)
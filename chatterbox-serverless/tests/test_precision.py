@@ -0,0 +1,44 @@
+import pytest
+import torch
+
+import rp_handler
+import staged_generation
+from conftest import FakeConds, VocodingModel
+from precision import generation_context
+
+
+@pytest.fixture
+def vocoding_model(monkeypatch):
+    from model_registry import registry
+
+    model = VocodingModel()
+    monkeypatch.setattr(registry, "get", lambda *args, **kwargs: (model, 0.0))
+    return model
+
+
+def test_bf16_chunk_runs_end_to_end_on_cpu(vocoding_model, voice_b64):
+    result = rp_handler.handler({
+        "input": {
+            "text": "One short chunk in bf16.",
+            "voice_file": voice_b64,
+            "settings": {"precision": "bf16", "synthesis_cache": "off", "preprocess_voice": False},
+        },
+    })
+    assert "error" not in result, result.get("error")
+    assert result["chunk_count"] == 1
+    assert result["precision"]["mode"] == "bf16"
+    # Autocast reached T3 and stopped there
+    assert vocoding_model.t3.dtypes == [torch.bfloat16]
+
+
+def test_staged_vocoder_runs_float32_under_bf16():
+    model = VocodingModel()
+    model.conds = FakeConds(0.5)
+    with generation_context("bf16", "cpu", model):
+        tokens = model.t3.inference(text_tokens=torch.ones(1, 5, dtype=torch.long))
+    # The vocoder stage casts bf16 inputs back to float32
+    ref_dict = {"ref": model.conds.gen["ref"].bfloat16()}
+    with generation_context("bf16", "cpu", model):
+        wavs = staged_generation.vocode(model, [tokens[0]], ref_dict)
+    assert model.t3.dtypes == [torch.bfloat16]
+    assert wavs[0].dtype == torch.float32
@@ -0,0 +1,52 @@
+import pytest
+import torch
+
+import cpu_inference
+import process_pool
+from conftest import FakeConds
+
+CONFIG = {"threads": None, "interop_threads": None, "quantize_modules": ["t3"], "compile": False}
+
+
+class QuantizableModel:
+    """Picklable stand-in whose ``t3`` has linear layers for int8 quantization"""
+
+    device = "cpu"
+    sr = 24000
+
+    def __init__(self):
+        self.t3 = torch.nn.Sequential(torch.nn.Linear(8, 8), torch.nn.Linear(8, 8))
+        self.conds = None
+
+    def generate(self, text, **kwargs):
+        quantized = not isinstance(self.t3[0], torch.nn.Linear)
+        hidden = self.t3(torch.ones(1, 8))
+        return torch.full((1, 100 + len(text)), float(quantized)) + hidden.sum() * 0
+
+
+def test_shared_bytes_skip_quantization_metadata():
+    model = QuantizableModel()
+    cpu_inference.quantize_linear_layers(model, ["t3"])
+    # Quantized weights are packed params, not parameters; only real tensors count
+    assert process_pool.share_model_memory(model) == 0
+
+
+@pytest.mark.parametrize("dtype", ["int8", "bfloat16"])
+def test_pool_applies_deferred_optimizations_in_workers(dtype):
+    model = QuantizableModel()
+    cpu_inference.defer_cpu_optimizations(model, dtype, CONFIG)
+    pool = process_pool.ProcessPool(model, 2, threads_per_process=1)
+    try:
+        assert pool.worker_optimizations["dtype"] == dtype
+        start_mb = pool.reset_worker_peaks()
+        wavs = list(pool.iter_generate_chunks(["a", "bb", "ccc"], {}, FakeConds(0.5), seeds=[1, 2, 3]))
+        assert sorted(start_mb) == pool.worker_pids()
+        assert pool.worker_peak_growth_mb(start_mb) >= 0
+    finally:
+        pool.close()
+
+    assert [index for index, _ in wavs] == [0, 1, 2]
+    assert [wav.shape[-1] for _, wav in wavs] == [101, 102, 103]
+    # int8 layers exist only in the workers; the parent keeps the shared float32 weights
+    assert all(bool(wav[0, 0]) == (dtype == "int8") for _, wav in wavs)
+    assert isinstance(model.t3[0], torch.nn.Linear)
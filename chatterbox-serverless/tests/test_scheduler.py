@@ -0,0 +1,50 @@
+import torch
+
+from scheduler import ChunkScheduler
+
+
+class FlakyModel:
+    """Fails any chunk whose text contains "boom" """
+
+    device = "cpu"
+    conds = None
+
+    def generate(self, text, **kwargs):
+        if "boom" in text:
+            raise RuntimeError("generation failed")
+        return torch.zeros(1, 10)
+
+
+def test_failed_chunk_does_not_stop_the_scheduler():
+    scheduler = ChunkScheduler(lambda: FlakyModel(), window_ms=1)
+    failed = scheduler.submit_chunks(["boom"], {}, None, "voice")
+    assert isinstance(failed[0].exception(timeout=5), RuntimeError)
+
+    ok = scheduler.submit_chunks(["fine", "also fine"], {}, None, "voice")
+    assert [f.result(timeout=5).shape[-1] for f in ok] == [10, 10]
+
+
+def test_model_load_failure_is_reported_to_the_job():
+    attempts = []
+
+    def model_getter():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ImportError("ChatterboxTTS not found in container")
+        return FlakyModel()
+
+    scheduler = ChunkScheduler(model_getter, window_ms=1)
+    first = scheduler.submit_chunks(["hello"], {}, None, "voice")
+    assert isinstance(first[0].exception(timeout=5), ImportError)
+    second = scheduler.submit_chunks(["hello"], {}, None, "voice")
+    assert second[0].result(timeout=5).shape[-1] == 10
+
+
+def test_sequential_groups_are_not_counted_as_batches():
+    scheduler = ChunkScheduler(lambda: FlakyModel(), window_ms=50)
+    futures = scheduler.submit_chunks(["a", "b", "c"], {}, None, "voice")
+    for future in futures:
+        future.result(timeout=5)
+    metrics = scheduler.metrics()
+    assert metrics["batch_size"]["count"] == 0
+    assert metrics["sequential_chunks"] == 3
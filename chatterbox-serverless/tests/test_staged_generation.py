@@ -0,0 +1,39 @@
+import torch
+
+import rp_handler
+
+TEXT = "Staged audio is never cached."
+
+
+def run_job(voice_b64, staged, job_id=None):
+    return rp_handler.handler({
+        "id": job_id,
+        "input": {
+            "text": TEXT,
+            "voice_file": voice_b64,
+            "settings": {"staged": staged, "synthesis_cache": "memory", "checkpoint": True, "preprocess_voice": False},
+        },
+    })
+
+
+def test_staged_chunks_skip_cache_and_checkpoints(fake_model, voice_b64, tmp_path, monkeypatch):
+    staged_calls = []
+
+    def fake_staged(model, chunks, gen_kwargs, seeds=None, stats=None, **kwargs):
+        staged_calls.extend(chunks)
+        for index, _ in enumerate(chunks):
+            yield index, torch.zeros(1, 2400)
+
+    monkeypatch.setenv("CHATTERBOX_CHECKPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(rp_handler, "supports_staged", lambda model: True)
+    monkeypatch.setattr(rp_handler, "iter_staged_chunks", fake_staged)
+
+    # Plain audio for the same text and settings is cached...
+    assert run_job(voice_b64, staged=False)["synthesis_cache"]["misses"] == 1
+    # ...but a staged job neither reads nor writes the cache
+    first = run_job(voice_b64, staged=True, job_id="staged-job")
+    second = run_job(voice_b64, staged=True, job_id="staged-job")
+    assert first["synthesis_cache"]["backend"] == second["synthesis_cache"]["backend"] == "off"
+    assert first["checkpoint"] is None
+    assert staged_calls == [TEXT, TEXT]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,85 @@
+import random
+import re
+
+import pytest
+
+from text_cleaning import clean_script_for_tts, iter_clean_lines
+
+
+def legacy_clean(text: str) -> str:
+    """The previous ``clean_script_for_tts`` from rp_handler.py"""
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'\(.*?\)', '', text)
+    lines = text.split('\n')
+    cleaned_lines = []
+    skip_section = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if any(keyword in line.lower() for keyword in ['views:', 'engagement:', 'metrics:', 'statistics:', 'performance:']):
+            skip_section = True
+            continue
+        if skip_section and line and not line.startswith('-') and not line.startswith('•'):
+            skip_section = False
+        if not skip_section:
+            cleaned_lines.append(line)
+    cleaned_text = ' '.join(cleaned_lines)
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+    return cleaned_text.strip()
+
+
+GOLDEN_CASES = [
+    "",
+    "   \n\n  ",
+    "Hello world.",
+    "[Intro music] Hello (softly) world.",
+    "(a [b) c]",
+    "(a[)]b) tail",
+    "[unclosed bracket\nacross lines] still here",
+    "(unclosed paren\nacross) lines",
+    "Views: 1.2M\n- likes 3k\n• shares 100\nBack to the script.",
+    "VIEWS: 10\nENGAGEMENT: high\n-still skipped\nNot skipped",
+    "Performance:\n\n- a\n\n- b\nDone",
+    "Stats\tand\ttabs   and  spaces\r\nwindows line\r\n",
+    "line with\u2028line separator and\xa0nbsp\x1f unit separator",
+    "Stat\u0130stics: dotted capital I\nkept?",
+    "view\u017f: long s\nkelvin \u212a",
+    "metrics:[x]\nafter",
+    "[views:] hidden keyword\nvisible",
+    "(engagement:) also hidden\nvisible",
+    "Trailing colon only:\nnext line",
+    "- dash first line\n• bullet",
+]
+
+ALPHABET = ["word", "Views:", "metrics:", "[", "]", "(", ")", "-", "\u2022", " ", "  ", "\t", "\n", "\n\n",
+            "\r", ".", ":", "\u0130", "\u2028", "\xa0", "\x85", "\u017f", "Engagement:", "x", "Stage", "PERFORMANCE:"]
+
+
+def random_script(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 80)))
+
+
+def random_pieces(text: str, rng: random.Random):
+    pieces, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 16)
+        pieces.append(text[i:i + n])
+        i += n
+    return pieces
+
+
+@pytest.mark.parametrize("text", GOLDEN_CASES)
+def test_matches_legacy_cleaner(text):
+    assert clean_script_for_tts(text) == legacy_clean(text)
+    assert " ".join(iter_clean_lines([text])) == legacy_clean(text)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fuzzed_whole_and_streamed_match_legacy(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        text = random_script(rng)
+        expected = legacy_clean(text)
+        assert clean_script_for_tts(text) == expected, repr(text)
+        assert " ".join(iter_clean_lines(random_pieces(text, rng))) == expected, repr(text)
@@ -0,0 +1,23 @@
+import rp_handler
+
+
+def run_job(voice_b64, **settings):
+    return rp_handler.handler({
+        "input": {
+            "text": "Captions are opt in. They cost response size.",
+            "voice_file": voice_b64,
+            "settings": {"synthesis_cache": "off", "preprocess_voice": False, **settings},
+        },
+    })
+
+
+def test_timing_is_off_by_default(fake_model, voice_b64):
+    result = run_job(voice_b64)
+    assert result["timing"] is None
+    assert result["srt"] is None
+
+
+def test_timing_on_request(fake_model, voice_b64):
+    result = run_job(voice_b64, timing="srt")
+    assert [text for _, _, text in result["timing"]["sentences"]] == ["Captions are opt in.", "They cost response size."]
+    assert result["srt"].startswith("1\n00:00:")
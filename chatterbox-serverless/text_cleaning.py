@@ -0,0 +1,75 @@
+"""
+Script cleaning for TTS
+
+Removes stage directions (``[...]`` and ``(...)``) and metrics/stats sections
+and collapses whitespace. Neither bracket pattern can match across a newline,
+so everything is done line by line in a single pass with precompiled
+patterns. ``iter_clean_lines`` also works over a stream of text pieces (e.g.
+a file read in blocks), so long scripts can be fed to the chunk planner
+without building the intermediate full-text copies.
+"""
+
+import re
+
+_STAGE_DIRECTION_RE = re.compile(r'\[.*?\]')
+_PARENTHETICAL_RE = re.compile(r'\(.*?\)')
+_METRICS_RE = re.compile(r'views:|engagement:|metrics:|statistics:|performance:')
+
+
+def _remove_stage_directions(text: str) -> str:
+    # Brackets are removed before parentheses, as they always have been
+    if '[' in text:
+        text = _STAGE_DIRECTION_RE.sub('', text)
+    if '(' in text:
+        text = _PARENTHETICAL_RE.sub('', text)
+    return text
+
+
+def _iter_raw_lines(pieces):
+    """Split a string or an iterable of string pieces on ``\\n``, minus stage directions"""
+    if isinstance(pieces, str):
+        # Neither pattern crosses a newline, so one pass over the whole text
+        # is the same as one per line, and cheaper
+        yield from _remove_stage_directions(pieces).split('\n')
+        return
+    pending = ""
+    for piece in pieces:
+        lines = (pending + piece).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield _remove_stage_directions(line)
+    yield _remove_stage_directions(pending)
+
+
+def iter_clean_lines(pieces):
+    """
+    Yield the cleaned, non-empty lines of a script.
+
+    ``' '.join`` of the result is exactly ``clean_script_for_tts`` of the
+    concatenated input.
+    """
+    skip_section = False
+    for line in _iter_raw_lines(pieces):
+        # str.split() and re's \s agree on what whitespace is, so this both
+        # strips the line and collapses internal runs to single spaces
+        words = line.split()
+        if not words:
+            continue
+        line = ' '.join(words)
+
+        # Every keyword ends with ':', so most lines skip the lower() copy
+        if ':' in line and _METRICS_RE.search(line.lower()):
+            skip_section = True
+            continue
+
+        # Reset skip section on new paragraph
+        if skip_section and not line.startswith('-') and not line.startswith('•'):
+            skip_section = False
+
+        if not skip_section:
+            yield line
+
+
+def clean_script_for_tts(text: str) -> str:
+    """Clean script text for TTS generation"""
+    return ' '.join(iter_clean_lines(text))
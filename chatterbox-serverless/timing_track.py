@@ -0,0 +1,183 @@
+"""
+Caption timing track
+
+The handler knows the text of every chunk and exactly where its audio sits in
+the output, so captions can be timed without a transcription pass:
+
+- chunks: exact, from the assembly offsets
+- sentences: estimated inside each chunk
+- words: estimated inside each sentence
+
+Within a chunk, the speech region is found from the waveform's energy, so
+leading and trailing silence is left out. The words are spread over it in
+proportion to their syllable count, with extra time for the pause after
+punctuation. Sentence boundaries are then snapped to the nearest silent gap
+in the audio when there is one close by. Word times are estimates, normally
+within a syllable or two, which is close enough for short on-screen captions.
+
+All times are seconds into the final audio.
+"""
+
+import os
+import re
+
+TIMING_MODES = ("off", "json", "srt")
+# Off unless asked for: the word track adds tens of KB to long responses
+DEFAULT_TIMING = os.environ.get("CHATTERBOX_TIMING", "off")
+CAPTION_MAX_WORDS = int(os.environ.get("CHATTERBOX_CAPTION_MAX_WORDS", "6"))
+
+FRAME_SECONDS = 0.02
+# Frames this far below the chunk's loudest frame count as silence
+SILENCE_DB = float(os.environ.get("CHATTERBOX_TIMING_SILENCE_DB", "35"))
+MIN_PAUSE_SECONDS = 0.12
+# How far a sentence boundary may move to land on a pause
+SNAP_SECONDS = 0.4
+# Pause after a word, in syllables
+PUNCTUATION_PAUSE = {",": 1.0, ";": 1.0, ":": 1.0, ".": 2.0, "!": 2.0, "?": 2.0}
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+_VOWEL_GROUP_RE = re.compile(r'[aeiouy]+')
+
+
+def validate_timing(mode: str):
+    if mode not in TIMING_MODES:
+        raise ValueError(f"Unsupported timing mode: {mode}. Use one of: {', '.join(TIMING_MODES)}")
+
+
+def word_weight(word: str) -> tuple:
+    """``(speech, pause)`` length of a word in syllables"""
+    letters = word.lower()
+    # Digits are read out as whole words
+    speech = max(1, len(_VOWEL_GROUP_RE.findall(letters))) + sum(c.isdigit() for c in letters)
+    stripped = word.rstrip("\"')]")
+    return float(speech), PUNCTUATION_PAUSE.get(stripped[-1:], 0.0)
+
+
+def speech_region(samples, sample_rate: int) -> tuple:
+    """
+    ``(start, end, pauses)`` in seconds from the start of a chunk.
+
+    ``pauses`` are the silent gaps of at least ``MIN_PAUSE_SECONDS`` between
+    ``start`` and ``end``.
+    """
+    import numpy as np
+
+    samples = samples.numpy() if hasattr(samples, "numpy") else np.asarray(samples)
+    frame = max(1, int(FRAME_SECONDS * sample_rate))
+    frames = len(samples) // frame
+    duration = len(samples) / sample_rate
+    if not frames:
+        return 0.0, duration, []
+    energy = np.square(samples[:frames * frame].reshape(frames, frame), dtype=np.float64).mean(axis=1)
+    peak = energy.max()
+    if peak <= 0:
+        return 0.0, duration, []
+    voiced = energy > peak * 10 ** (-SILENCE_DB / 10)
+    voiced_frames = np.flatnonzero(voiced)
+    first, last = voiced_frames[0], voiced_frames[-1]
+
+    pauses = []
+    run_start = None
+    for i in range(first, last + 1):
+        if not voiced[i]:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            if (i - run_start) * FRAME_SECONDS >= MIN_PAUSE_SECONDS:
+                pauses.append((run_start * FRAME_SECONDS, i * FRAME_SECONDS))
+            run_start = None
+    return first * FRAME_SECONDS, min(duration, (last + 1) * FRAME_SECONDS), pauses
+
+
+def _spread_words(words: list, start: float, end: float) -> list:
+    """``[start, end, word]`` for each word, proportional to its weight"""
+    weights = [word_weight(word) for word in words]
+    # No pause after the last word, the sentence ends there
+    total = sum(speech for speech, _ in weights) + sum(pause for _, pause in weights[:-1])
+    scale = (end - start) / total
+    timed = []
+    t = start
+    for word, (speech, pause) in zip(words, weights):
+        timed.append([t, t + speech * scale, word])
+        t += (speech + pause) * scale
+    return timed
+
+
+def _srt_time(seconds: float) -> str:
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+class TimingTrack:
+    """Chunk, sentence and word timings, built up one chunk at a time"""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.chunks = []
+        self.sentences = []
+        # Sentences as lists of [start, end, word], for caption cues
+        self._sentence_words = []
+
+    def add_chunk(self, text: str, sample_offset: int, samples) -> dict:
+        """Time a chunk placed at ``sample_offset``; returns its own part of the track"""
+        offset = sample_offset / self.sample_rate
+        duration = len(samples) / self.sample_rate
+        start, end, pauses = speech_region(samples, self.sample_rate)
+
+        sentences = [s.split() for s in _SENTENCE_END_RE.split(text.strip())]
+        sentences = [words for words in sentences if words]
+        weights = [sum(sum(word_weight(word)) for word in words) for words in sentences]
+
+        # Proportional sentence boundaries, moved onto nearby pauses where possible
+        spans = []
+        sentence_start = start
+        done = 0.0
+        total = sum(weights) or 1.0
+        for k, weight in enumerate(weights):
+            done += weight
+            if k == len(weights) - 1:
+                spans.append((sentence_start, end))
+                break
+            boundary = start + (end - start) * done / total
+            candidates = [p for p in pauses if p[0] > sentence_start and abs((p[0] + p[1]) / 2 - boundary) <= SNAP_SECONDS]
+            if candidates:
+                pause = min(candidates, key=lambda p: abs((p[0] + p[1]) / 2 - boundary))
+                spans.append((sentence_start, pause[0]))
+                sentence_start = pause[1]
+            else:
+                spans.append((sentence_start, boundary))
+                sentence_start = boundary
+
+        chunk_track = {"chunk": [_round(offset), _round(offset + duration), text], "sentences": [], "words": []}
+        for words, (s_start, s_end) in zip(sentences, spans):
+            timed = [[_round(offset + a), _round(offset + b), word] for a, b, word in _spread_words(words, s_start, s_end)]
+            sentence = [_round(offset + s_start), _round(offset + s_end), " ".join(words)]
+            chunk_track["sentences"].append(sentence)
+            chunk_track["words"].extend(timed)
+            self._sentence_words.append(timed)
+        self.chunks.append(chunk_track["chunk"])
+        self.sentences.extend(chunk_track["sentences"])
+        return chunk_track
+
+    def to_json(self) -> dict:
+        return {
+            "format": ["start", "end", "text"],
+            "chunks": self.chunks,
+            "sentences": self.sentences,
+            "words": [word for words in self._sentence_words for word in words],
+        }
+
+    def to_srt(self, max_words: int = None) -> str:
+        """SubRip captions of up to ``max_words`` words, never spanning two sentences"""
+        max_words = max(1, max_words or CAPTION_MAX_WORDS)
+        cues = []
+        for words in self._sentence_words:
+            for i in range(0, len(words), max_words):
+                group = words[i:i + max_words]
+                cues.append(f"{len(cues) + 1}\n{_srt_time(group[0][0])} --> {_srt_time(group[-1][1])}\n"
+                            f"{' '.join(word for _, _, word in group)}\n")
+        return "\n".join(cues)
+
+
+def _round(seconds: float) -> float:
+    return round(float(seconds), 3)
@@ -3,6 +3,7 @@
 Upload voice files to Supabase for easy testing
 """
 
+import argparse
 import base64
 import os
 import wave
@@ -84,16 +85,14 @@ def get_audio_duration(file_path):
     except:
         return None
 
-def upload_voice_to_supabase(file_path, name, description):
+def upload_voice_to_supabase(file_path, name, description, preprocess=False):
     """Upload a voice file to Supabase"""
     try:
-        # Read and encode file
+        # Read file
         with open(file_path, 'rb') as f:
             file_data = f.read()
-            voice_b64 = base64.b64encode(file_data).decode('utf-8')
         
         # Get file info
-        file_size = len(file_data)
         duration = get_audio_duration(file_path)
         
         # Detect file type
@@ -105,6 +104,19 @@ def upload_voice_to_supabase(file_path, name, description):
             '.flac': 'audio/flac'
         }.get(file_ext, 'audio/wav')
         
+        # Trim silence, normalize loudness and cap length before uploading
+        # (the same processing the worker applies on first use)
+        if preprocess:
+            from voice_preprocessing import preprocess_voice_bytes
+            file_data, stats = preprocess_voice_bytes(file_data, subtype='PCM_16')
+            duration = stats['output_seconds']
+            mime_type = 'audio/wav'
+            print(f"🎚️  Preprocessed {name}: {stats['input_seconds']:.1f}s -> {duration:.1f}s, "
+                  f"gain {stats['gain_db']:+.1f} dB")
+        
+        voice_b64 = base64.b64encode(file_data).decode('utf-8')
+        file_size = len(file_data)
+        
         # Prepare data for Supabase
         data = {
             'name': name,
@@ -172,6 +184,11 @@ def list_existing_voices():
         return []
 
 def main():
+    parser = argparse.ArgumentParser(description="Upload voice files to Supabase")
+    parser.add_argument('--preprocess', action='store_true',
+                        help='trim silence, normalize loudness and cap length before uploading')
+    args = parser.parse_args()
+    
     print("🎵 Voice Files Upload to Supabase")
     print("=" * 50)
     
@@ -229,7 +246,8 @@ def main():
             result = upload_voice_to_supabase(
                 voice['file'],
                 voice['name'],
-                voice['description']
+                voice['description'],
+                preprocess=args.preprocess
             )
             if result:
                 uploaded_count += 1
@@ -0,0 +1,132 @@
+"""
+Reference-voice preprocessing
+
+Uploaded reference clips range from a couple of seconds to minutes, often with
+leading/trailing silence and inconsistent loudness. Before conditioning, each
+voice is downmixed to mono, resampled to 24 kHz, trimmed of silence, capped to
+``CHATTERBOX_VOICE_MAX_SECONDS`` and loudness-normalized - all as whole-array
+numpy operations. The result is stored (as a float WAV) in the voice disk cache
+under a key derived from the original content hash and the preprocessing
+settings, so it runs once per voice rather than once per job.
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from reference_audio import S3GEN_SR, decode_reference_audio
+
+# ~21 ms analysis frames at 24 kHz
+FRAME_SAMPLES = 512
+
+
+def preprocess_config() -> dict:
+    """Current preprocessing settings; part of every cache key derived from them"""
+    return {
+        "sample_rate": S3GEN_SR,
+        "trim_top_db": float(os.environ.get("CHATTERBOX_VOICE_TRIM_DB", "40")),
+        "trim_pad_seconds": float(os.environ.get("CHATTERBOX_VOICE_TRIM_PAD_SECONDS", "0.1")),
+        "max_seconds": float(os.environ.get("CHATTERBOX_VOICE_MAX_SECONDS", "10")),
+        "target_dbfs": float(os.environ.get("CHATTERBOX_VOICE_TARGET_DBFS", "-20")),
+        "max_gain_db": 30.0,
+        "peak": 0.99,
+    }
+
+
+def config_fingerprint(config: dict) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def processed_voice_hash(voice_hash: str, config: dict) -> str:
+    """Content key of the processed voice: the original hash plus the settings"""
+    return hashlib.sha256(f"{voice_hash}:{config_fingerprint(config)}".encode()).hexdigest()
+
+
+def _frame_rms(wav):
+    n_frames = max(1, -(-len(wav) // FRAME_SAMPLES))
+    padded = np.zeros(n_frames * FRAME_SAMPLES, dtype=np.float32)
+    padded[:len(wav)] = wav
+    frames = padded.reshape(n_frames, FRAME_SAMPLES)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def preprocess_waveform(wav, config: dict, stats: dict):
+    """Trim, cap and normalize a mono float32 waveform already at ``config['sample_rate']``"""
+    sample_rate = config["sample_rate"]
+    stats["input_seconds"] = round(len(wav) / sample_rate, 3)
+
+    # Silence trimming: keep everything between the first and last frame
+    # within ``trim_top_db`` of the loudest one
+    rms = _frame_rms(wav)
+    threshold = rms.max() * 10 ** (-config["trim_top_db"] / 20)
+    active = np.flatnonzero(rms > threshold)
+    if len(active):
+        pad = int(config["trim_pad_seconds"] * sample_rate)
+        start = max(0, active[0] * FRAME_SAMPLES - pad)
+        end = min(len(wav), (active[-1] + 1) * FRAME_SAMPLES + pad)
+        stats["trimmed_leading_seconds"] = round(float(start) / sample_rate, 3)
+        stats["trimmed_trailing_seconds"] = round(float(len(wav) - end) / sample_rate, 3)
+        wav = wav[start:end]
+        active_rms = rms[active]
+    else:
+        active_rms = rms
+
+    # Length cap: conditioning only uses the first few seconds anyway
+    max_samples = int(config["max_seconds"] * sample_rate)
+    if len(wav) > max_samples:
+        wav = wav[:max_samples]
+        stats["capped"] = True
+
+    # Loudness normalization on the RMS of the non-silent frames, limited so
+    # the peak never clips and near-silence isn't blown up
+    loudness = float(np.sqrt(np.mean(active_rms * active_rms)))
+    peak = float(np.abs(wav).max()) if len(wav) else 0.0
+    gain = 1.0
+    if loudness > 0 and peak > 0:
+        gain = 10 ** (config["target_dbfs"] / 20) / loudness
+        gain = min(gain, 10 ** (config["max_gain_db"] / 20), config["peak"] / peak)
+        wav = wav * np.float32(gain)
+    stats["gain_db"] = round(float(20 * np.log10(gain)), 2)
+    stats["output_seconds"] = round(len(wav) / sample_rate, 3)
+    return wav.astype(np.float32, copy=False)
+
+
+def encode_wav(wav, sample_rate: int, subtype: str = "FLOAT") -> bytes:
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, wav, sample_rate, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+
+def preprocess_voice_bytes(voice_data: bytes, config: dict = None, subtype: str = "FLOAT"):
+    """Decode, preprocess and re-encode a voice file; returns ``(wav_bytes, stats)``"""
+    config = config or preprocess_config()
+    stats = {}
+    start = time.perf_counter()
+    wav = decode_reference_audio(voice_data, stats)
+    wav = preprocess_waveform(wav, config, stats)
+    processed = encode_wav(wav, config["sample_rate"], subtype)
+    stats["preprocess_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return processed, stats
+
+
+def get_processed_voice(voice_data: bytes, voice_hash: str, cache):
+    """
+    Return ``(processed_bytes, processed_hash, stats)`` for a voice, from ``cache``
+    (a ``VoiceDiskCache``) when it was already processed with these settings.
+    """
+    config = preprocess_config()
+    processed_hash = processed_voice_hash(voice_hash, config)
+    processed, _ = cache.lookup(voice_hash=processed_hash)
+    if processed is not None:
+        return processed, processed_hash, {"cached": True}
+
+    processed, stats = preprocess_voice_bytes(voice_data, config)
+    cache.put(processed, voice_hash=processed_hash)
+    stats["cached"] = False
+    return processed, processed_hash, stats
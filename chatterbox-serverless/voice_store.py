@@ -0,0 +1,176 @@
+"""
+Voice lookup by ID with a worker-local disk cache
+
+Requests can send ``voice_id`` (plus an optional ``voice_hash``) instead of the
+whole reference voice as base64. The worker keeps decoded voices on disk,
+content-addressed by SHA-256, with a small index from voice ID to hash, and
+only fetches from the ``voice_files`` table in Supabase on a miss. Least
+recently used voices are evicted once the cache exceeds its byte budget.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+
+from conditioning_cache import voice_content_hash
+
+
+_HASH_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def validate_voice_hash(voice_hash: str) -> str:
+    """Hashes become file names, so only accept lowercase hex SHA-256"""
+    voice_hash = str(voice_hash).strip().lower()
+    if not _HASH_RE.fullmatch(voice_hash):
+        raise ValueError("voice_hash must be a hex SHA-256 digest")
+    return voice_hash
+
+
+class VoiceDiskCache:
+    """Content-addressed voice blobs on local disk with LRU eviction by mtime"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._blobs = os.path.join(root, "blobs")
+        self._ids = os.path.join(root, "ids")
+        self._lock = threading.Lock()
+        self._ready = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ensure_dirs(self):
+        if not self._ready:
+            os.makedirs(self._blobs, exist_ok=True)
+            os.makedirs(self._ids, exist_ok=True)
+            self._ready = True
+
+    def _blob_path(self, voice_hash: str) -> str:
+        return os.path.join(self._blobs, voice_hash)
+
+    def _id_path(self, voice_id: str) -> str:
+        # IDs are caller-controlled, so never use them as file names directly
+        return os.path.join(self._ids, hashlib.sha256(str(voice_id).encode()).hexdigest())
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_blob(self, voice_hash: str):
+        path = self._blob_path(voice_hash)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # Mark as recently used
+        os.utime(path)
+        return data
+
+    def hash_for_id(self, voice_id: str):
+        try:
+            with open(self._id_path(voice_id)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, voice_id: str = None, voice_hash: str = None):
+        """
+        Return ``(voice_data, voice_hash)`` or ``(None, None)`` on a miss.
+
+        A caller-supplied hash wins over the ID index, so a voice that was
+        re-uploaded under the same ID is fetched again instead of served stale.
+        """
+        if voice_hash:
+            voice_hash = validate_voice_hash(voice_hash)
+        with self._lock:
+            self._ensure_dirs()
+            candidate = voice_hash or (self.hash_for_id(voice_id) if voice_id else None)
+            data = self._read_blob(candidate) if candidate else None
+            if data is None:
+                self.misses += 1
+                return None, None
+            if voice_id and voice_hash and self.hash_for_id(voice_id) != voice_hash:
+                self._atomic_write(self._id_path(voice_id), voice_hash.encode())
+            self.hits += 1
+            return data, candidate
+
+    def put(self, voice_data: bytes, voice_id: str = None, voice_hash: str = None) -> str:
+        """Store decoded voice bytes (and the ID→hash mapping); returns the hash"""
+        voice_hash = voice_hash or voice_content_hash(voice_data)
+        with self._lock:
+            self._ensure_dirs()
+            path = self._blob_path(voice_hash)
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                self._atomic_write(path, voice_data)
+            if voice_id:
+                self._atomic_write(self._id_path(voice_id), voice_hash.encode())
+            self._evict(keep=voice_hash)
+        return voice_hash
+
+    def _evict(self, keep: str):
+        entries = []
+        total = 0
+        for name in os.listdir(self._blobs):
+            if name.endswith(".part"):
+                continue
+            stat = os.stat(os.path.join(self._blobs, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            os.unlink(os.path.join(self._blobs, name))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def fetch_voice_data(voice_id: str) -> str:
+    """Fetch a voice's base64 ``voice_data`` from the Supabase ``voice_files`` table"""
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_ANON_KEY")
+    if not supabase_url or not supabase_key:
+        raise ValueError("voice_id requires SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_ANON_KEY)")
+
+    query = urllib.parse.urlencode({"id": f"eq.{voice_id}", "select": "voice_data"})
+    request = urllib.request.Request(
+        f"{supabase_url.rstrip('/')}/rest/v1/voice_files?{query}",
+        headers={
+            "Authorization": f"Bearer {supabase_key}",
+            "apikey": supabase_key,
+            "Accept": "application/json",
+        },
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        rows = json.loads(response.read())
+
+    if not rows or not rows[0].get("voice_data"):
+        raise ValueError(f"Voice '{voice_id}' not found in voice store")
+    return rows[0]["voice_data"]
+
+
+voice_cache = VoiceDiskCache(
+    os.environ.get("CHATTERBOX_VOICE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "chatterbox-voices")),
+    int(os.environ.get("CHATTERBOX_VOICE_CACHE_MB", "512")) * 1024 * 1024,
+)